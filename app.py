@@ -1,8 +1,20 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request, stream_with_context
 from flask_cors import CORS
+from auth import TokenAuthority, require_auth
+from changes import CHANGE_FEED_LIMIT, change_stream, parse_cursor, sse_event
 from database import db
+from events import ChangeRelay, EventHub, HubFull
+from http_cache import conditional, init_compression, serve_assets
+import contextvars
+import json
 import logging
+import math
+import metrics
+from rate_limit import RateLimit, SQLiteRateStore
+from werkzeug.exceptions import HTTPException
+from werkzeug.test import EnvironBuilder
 
 app = Flask(__name__)
 
@@ -10,16 +22,108 @@ app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Switch to True to batch question/contact inserts through a background writer
+USE_WRITE_BEHIND = False
+
+if USE_WRITE_BEHIND:
+    db.enable_write_behind()
+
+# Log statements that scan whole tables every 10 minutes
+db.tracer.start_reporting(600)
+
+# Signed session tokens (set PPZ_AUTH_SECRET so they survive restarts)
+authority = TokenAuthority(db)
+
+# Switch to True to share login/signup rate limits between worker processes
+SHARED_RATE_LIMITS = False
+
+rate_store = SQLiteRateStore(db.db_path.with_name("rate_limits.db")) if SHARED_RATE_LIMITS else None
+LOGIN_LIMITS = (RateLimit("login-ip", 20, 60, rate_store),
+                RateLimit("login-user", 10, 300, rate_store))
+SIGNUP_LIMITS = (RateLimit("signup-ip", 10, 3600, rate_store),)
+
+# Live answer notifications: subscribers wait on "question:<id>" topics,
+# fed by this process's answers and (via the change feed) other processes'
+# answers. Streams send a keep-alive comment every 15 s and end after 10
+# minutes (EventSource reconnects).
+events = EventHub()
+NOTIFY_HEARTBEAT_SECONDS = 15.0
+NOTIFY_MAX_SECONDS = 600.0
+
+
+def publish_answers(changes):
+    """Publish the answered questions in a change-feed batch"""
+    for question in changes["questions"]:
+        if question["is_answered"]:
+            # Same fields as db.get_question; leases are admin-only
+            events.publish(f"question:{question['question_id']}",
+                           {key: value for key, value in question.items()
+                            if not key.startswith("claim")})
+
+
+answer_relay = ChangeRelay(db.get_changes, publish_answers)
+
+# Most changes accepted by one bulk user update
+BULK_UPDATE_MAX = 1000
+
+# Most message IDs / ID ranges accepted by one mark-as-read request
+MARK_READ_MAX_IDS = 10000
+MARK_READ_MAX_RANGES = 100
+
+# Batch endpoint: most sub-requests per call, and the threads that run
+# them. Event streams and static files cannot be batched.
+BATCH_MAX_REQUESTS = 20
+BATCH_EXCLUDED_ENDPOINTS = {"batch", "stream_changes", "question_events",
+                            "static_asset", "static_page"}
+batch_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="batch")
+
 # Configure CORS to allow requests from frontend
 CORS(app, resources={
     r"/api/*": {
         "origins": ["*"],
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"],
+        "allow_headers": ["Content-Type", "Authorization", "If-None-Match"],
+        "expose_headers": ["ETag"],
         "supports_credentials": True
     }
 })
 
+# Per-route latency and DB usage, exposed at /metrics
+metrics.init_app(app)
+
+# gzip/brotli for larger responses; GET routes below marked @conditional
+# send ETags from table versions and answer If-None-Match with 304
+init_compression(app)
+
+# Front end built by build_assets.py: fingerprinted, immutable assets
+serve_assets(app, Path(__file__).parent / "dist")
+
+
+@app.after_request
+def expire_table_versions(response):
+    """After a write here, the next ETag check re-reads table versions"""
+    if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        db.versions.expire()
+    return response
+
+
+def json_bytes(body: bytes, status: int = 200):
+    """Response for a body that is already encoded JSON (see json_rows)"""
+    return Response(body, status=status, mimetype="application/json")
+
+
+def too_many_attempts(*checks):
+    """
+    Count an attempt against each (RateLimit, key) pair; a 429 response if
+    any of them is over its limit, else None
+    """
+    retry_after = max([limit.hit(key) for limit, key in checks if key], default=0)
+    if not retry_after:
+        return None
+    response = jsonify({"message": "Too many attempts, please try again later"})
+    response.headers["Retry-After"] = str(math.ceil(retry_after))
+    return response, 429
+
 
 @app.route("/")
 def root() -> str:
@@ -34,18 +138,25 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "message": "Backend is running",
-        "stats": stats
+        "stats": stats,
+        "event_streams": events.stats()
     }), 200
 
 
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    """Request and database metrics in Prometheus text format"""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
 # ========== QUESTION ENDPOINTS ==========
 
 @app.route("/api/questions", methods=["GET"])
+@conditional(db.table_versions, "Change_Log")
 def get_questions():
     """Return the list of stored questions with answers."""
     try:
-        questions = db.get_all_questions()
-        return jsonify(questions), 200
+        return json_bytes(db.get_all_questions(as_json=True))
     except Exception as e:
         logger.error(f"Error fetching questions: {str(e)}")
         return jsonify({"error": "Failed to fetch questions"}), 500
@@ -84,11 +195,11 @@ def submit_question():
 
 
 @app.route("/api/questions/<int:question_id>", methods=["GET"])
+@conditional(db.table_versions, "Change_Log")
 def get_question(question_id):
     """Get a specific question"""
     try:
-        questions = db.get_all_questions()
-        question = next((q for q in questions if q['question_id'] == question_id), None)
+        question = db.get_question(question_id)
         
         if question:
             return jsonify(question), 200
@@ -99,6 +210,58 @@ def get_question(question_id):
         return jsonify({"error": "Failed to fetch question"}), 500
 
 
+@app.route("/api/questions/<int:question_id>/events", methods=["GET"])
+def question_events(question_id):
+    """
+    Server-Sent Events stream that sends one "answered" event, with the
+    question and its answer, as soon as the question is answered.
+    """
+    try:
+        answer_relay.start()
+        subscription = events.subscribe(f"question:{question_id}")
+    except HubFull:
+        response = jsonify({"message": "Too many open event streams, try again later"})
+        response.headers["Retry-After"] = "30"
+        return response, 503
+    except Exception as e:
+        logger.error(f"Error subscribing to question events: {str(e)}")
+        return jsonify({"error": "Failed to open event stream"}), 500
+    
+    try:
+        # Subscribed first, so an answer committed from here on is not missed
+        question = db.get_question(question_id)
+    except Exception as e:
+        events.unsubscribe(subscription)
+        logger.error(f"Error fetching question: {str(e)}")
+        return jsonify({"error": "Failed to fetch question"}), 500
+    if question is None:
+        events.unsubscribe(subscription)
+        return jsonify({"error": "Question not found"}), 404
+    
+    def stream():
+        try:
+            yield "retry: 5000\n\n"
+            if question["is_answered"]:
+                yield sse_event(question, "answered")
+                return
+            waited = 0.0
+            while waited < NOTIFY_MAX_SECONDS:
+                answered = subscription.get(timeout=NOTIFY_HEARTBEAT_SECONDS)
+                if answered is not None:
+                    yield sse_event(answered, "answered")
+                    return
+                if subscription.overflowed:
+                    yield sse_event({"question_id": question_id}, "resync")
+                    return
+                waited += NOTIFY_HEARTBEAT_SECONDS
+                yield ": keep-alive\n\n"
+        finally:
+            events.unsubscribe(subscription)
+    
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 # ========== CONTACT ENDPOINTS ==========
 
 @app.route("/api/contact", methods=["POST"])
@@ -134,16 +297,71 @@ def handle_contact():
 
 
 @app.route("/api/messages", methods=["GET"])
+@require_auth(authority, admin=True)
+@conditional(db.table_versions, "Change_Log", private=True)
 def get_messages():
     """Get all contact messages (admin only)"""
     try:
-        messages = db.get_all_messages()
-        return jsonify(messages), 200
+        return json_bytes(db.get_all_messages(as_json=True))
     except Exception as e:
         logger.error(f"Error fetching messages: {str(e)}")
         return jsonify({"error": "Failed to fetch messages"}), 500
 
 
+@app.route("/api/messages/unread", methods=["GET"])
+@require_auth(authority, admin=True)
+@conditional(db.table_versions, "Change_Log", private=True)
+def get_unread_messages():
+    """Get the newest unread contact messages (admin only)"""
+    try:
+        limit = request.args.get("limit", default=100, type=int)
+        return json_bytes(db.get_unread_messages(max(1, min(limit, 1000)), as_json=True))
+    except Exception as e:
+        logger.error(f"Error fetching unread messages: {str(e)}")
+        return jsonify({"error": "Failed to fetch unread messages"}), 500
+
+
+@app.route("/api/messages/read", methods=["POST"])
+@require_auth(authority, admin=True)
+def mark_messages_read():
+    """
+    Mark messages as read (admin only). Body: {"ids": [1, 2], "ranges":
+    [[10, 200]], "sent_before": "2026-10-01 00:00:00"}, any combination.
+    """
+    try:
+        payload = request.get_json(silent=True) or {}
+        ids = payload.get("ids") or []
+        ranges = payload.get("ranges") or []
+        sent_before = payload.get("sent_before")
+        
+        if not isinstance(ids, list) or not all(
+                isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            return jsonify({"message": "ids must be a list of integers"}), 400
+        if not isinstance(ranges, list) or not all(
+                isinstance(r, list) and len(r) == 2
+                and all(isinstance(i, int) and not isinstance(i, bool) for i in r)
+                and r[0] <= r[1] for r in ranges):
+            return jsonify({"message": "ranges must be [first, last] pairs of integers"}), 400
+        if sent_before is not None and not isinstance(sent_before, str):
+            return jsonify({"message": "sent_before must be a timestamp string"}), 400
+        if not (ids or ranges or sent_before):
+            return jsonify({"message": "ids, ranges or sent_before is required"}), 400
+        if len(ids) > MARK_READ_MAX_IDS or len(ranges) > MARK_READ_MAX_RANGES:
+            return jsonify({"message": f"At most {MARK_READ_MAX_IDS} ids and "
+                                       f"{MARK_READ_MAX_RANGES} ranges per request"}), 400
+        
+        result = db.mark_messages_as_read(ids, [tuple(r) for r in ranges], sent_before)
+        
+        if result["success"]:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 500
+    
+    except Exception as e:
+        logger.error(f"Error marking messages as read: {str(e)}")
+        return jsonify({"error": "Failed to mark messages as read"}), 500
+
+
 # ========== USER ENDPOINTS ==========
 
 @app.route("/api/users/signup", methods=["POST"])
@@ -159,6 +377,10 @@ def signup():
         phone = (payload.get("phone") or "").strip()
         address = (payload.get("address") or "").strip()
         
+        limited = too_many_attempts((SIGNUP_LIMITS[0], request.remote_addr))
+        if limited:
+            return limited
+        
         if not (username and email and password):
             return jsonify({
                 "message": "username, email, and password are required"
@@ -191,12 +413,22 @@ def login():
         if not (username and password):
             return jsonify({"message": "username and password are required"}), 400
         
+        # Checked before any password hashing or Users lookup
+        limited = too_many_attempts((LOGIN_LIMITS[0], request.remote_addr),
+                                    (LOGIN_LIMITS[1], username.lower()))
+        if limited:
+            return limited
+        
         user = db.authenticate_user(username, password)
         
         if user:
+            LOGIN_LIMITS[1].reset(username.lower())
+            token, claims = authority.issue(user)
             return jsonify({
                 "message": "Login successful",
-                "user": user
+                "user": user,
+                "token": token,
+                "expires_at": claims.expires_at
             }), 200
         else:
             return jsonify({"message": "Invalid username or password"}), 401
@@ -206,7 +438,20 @@ def login():
         return jsonify({"error": "Login failed"}), 500
 
 
+@app.route("/api/users/logout", methods=["POST"])
+@require_auth(authority)
+def logout():
+    """Revoke the token the request was made with"""
+    try:
+        authority.revoke(g.auth)
+        return jsonify({"message": "Logged out"}), 200
+    except Exception as e:
+        logger.error(f"Error during logout: {str(e)}")
+        return jsonify({"error": "Logout failed"}), 500
+
+
 @app.route("/api/users/<int:user_id>", methods=["GET"])
+@conditional(db.table_versions, "Users")
 def get_user(user_id):
     """Get user by ID"""
     try:
@@ -223,9 +468,13 @@ def get_user(user_id):
 
 
 @app.route("/api/users/<int:user_id>", methods=["PUT"])
+@require_auth(authority)
 def update_user(user_id):
-    """Update user information"""
+    """Update user information (the user themselves or an admin)"""
     try:
+        if g.auth.user_id != user_id and not g.auth.is_admin:
+            return jsonify({"message": "Not allowed to update this user"}), 403
+        
         payload = request.get_json(silent=True) or {}
         
         result = db.update_user(user_id, **payload)
@@ -243,17 +492,18 @@ def update_user(user_id):
 # ========== PRODUCT ENDPOINTS ==========
 
 @app.route("/api/products", methods=["GET"])
+@conditional(db.table_versions, "Products")
 def get_products():
     """Get all products"""
     try:
         category = request.args.get("category")
         
         if category:
-            products = db.get_products_by_category(category)
+            products = db.get_products_by_category(category, as_json=True)
         else:
-            products = db.get_all_products()
+            products = db.get_all_products(as_json=True)
         
-        return jsonify(products), 200
+        return json_bytes(products)
     except Exception as e:
         logger.error(f"Error fetching products: {str(e)}")
         return jsonify({"error": "Failed to fetch products"}), 500
@@ -262,25 +512,214 @@ def get_products():
 # ========== GYM LOCATION ENDPOINTS ==========
 
 @app.route("/api/locations", methods=["GET"])
+@conditional(db.table_versions, "Gym_Locations")
 def get_locations():
     """Get all gym locations"""
     try:
         city = request.args.get("city")
         
         if city:
-            locations = db.get_locations_by_city(city)
+            locations = db.get_locations_by_city(city, as_json=True)
         else:
-            locations = db.get_all_locations()
+            locations = db.get_all_locations(as_json=True)
         
-        return jsonify(locations), 200
+        return json_bytes(locations)
     except Exception as e:
         logger.error(f"Error fetching locations: {str(e)}")
         return jsonify({"error": "Failed to fetch locations"}), 500
 
 
+@app.route("/api/locations/nearby", methods=["GET"])
+@conditional(db.table_versions, "Gym_Locations")
+def get_nearby_locations():
+    """Get the gym locations nearest to a point"""
+    try:
+        latitude = request.args.get("lat", type=float)
+        longitude = request.args.get("lon", type=float)
+        k = request.args.get("k", default=5, type=int)
+        
+        if latitude is None or longitude is None:
+            return jsonify({"message": "lat and lon are required numbers"}), 400
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return jsonify({"message": "lat/lon out of range"}), 400
+        
+        locations = db.get_nearby_locations(latitude, longitude, max(1, min(k, 50)))
+        return jsonify(locations), 200
+    except Exception as e:
+        logger.error(f"Error fetching nearby locations: {str(e)}")
+        return jsonify({"error": "Failed to fetch nearby locations"}), 500
+
+
+# ========== WORKOUT ENDPOINTS ==========
+
+@app.route("/api/workouts", methods=["GET"])
+@conditional(db.table_versions, "Workouts", "Exercises")
+def get_workouts():
+    """Get workouts with their exercises"""
+    try:
+        category = request.args.get("category")
+        difficulty = request.args.get("difficulty")
+        
+        workouts = db.get_workouts(category, difficulty)
+        return jsonify(workouts), 200
+    except Exception as e:
+        logger.error(f"Error fetching workouts: {str(e)}")
+        return jsonify({"error": "Failed to fetch workouts"}), 500
+
+
+# ========== EQUIPMENT ENDPOINTS ==========
+
+@app.route("/api/equipment/<int:equipment_id>/ratings", methods=["POST"])
+@require_auth(authority, optional=True)
+def rate_equipment(equipment_id):
+    """Rate a piece of gym equipment (as the token's user, else anonymously)"""
+    try:
+        payload = request.get_json(silent=True) or {}
+        rating = payload.get("rating")
+        
+        if not isinstance(rating, int) or not 1 <= rating <= 5:
+            return jsonify({"message": "rating must be an integer from 1 to 5"}), 400
+        
+        result = db.add_equipment_rating(
+            equipment_id,
+            rating,
+            user_id=g.auth.user_id if g.auth else None,
+            review_text=(payload.get("review") or "").strip()
+        )
+        
+        if result["success"]:
+            return jsonify(result), 201
+        else:
+            return jsonify(result), 400
+    
+    except Exception as e:
+        logger.error(f"Error rating equipment: {str(e)}")
+        return jsonify({"error": "Failed to rate equipment"}), 500
+
+
+# ========== CHANGE FEED ==========
+
+@app.route("/api/changes", methods=["GET"])
+@require_auth(authority, admin=True)
+def get_changes():
+    """
+    Questions and contact messages changed since ?since=<cursor> (admin).
+    Without since, only the current cursor: load the full lists once, then
+    follow the feed from there.
+    """
+    try:
+        limit = request.args.get("limit", default=CHANGE_FEED_LIMIT, type=int)
+        return jsonify(db.get_changes(request.args.get("since"),
+                                      max(1, min(limit, CHANGE_FEED_LIMIT)))), 200
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error fetching changes: {str(e)}")
+        return jsonify({"error": "Failed to fetch changes"}), 500
+
+
+@app.route("/api/changes/stream", methods=["GET"])
+@require_auth(authority, admin=True, query_token=True)
+def stream_changes():
+    """
+    The change feed as Server-Sent Events (admin). Resumes from
+    Last-Event-ID or ?since=, else starts from now.
+    """
+    try:
+        cursor = request.headers.get("Last-Event-ID") or request.args.get("since")
+        if cursor is None:
+            cursor = db.change_cursor()
+        parse_cursor(cursor)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error starting change stream: {str(e)}")
+        return jsonify({"error": "Failed to start change stream"}), 500
+    
+    return Response(
+        stream_with_context(change_stream(db.get_changes, cursor)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# ========== BATCH ENDPOINT ==========
+
+def dispatch_subrequest(environ, conn) -> Response:
+    """Serve one batched GET on the batch's snapshot connection"""
+    with db.joined_snapshot(conn), app.request_context(environ):
+        return app.full_dispatch_request()
+
+
+@app.route("/api/batch", methods=["POST"])
+def batch():
+    """
+    Several GET requests in one round trip, e.g. everything a page needs
+    on load. Body: {"requests": [{"id": "products", "path": "/api/products",
+    "if_none_match": optional ETag}, ...]}. The Authorization header applies
+    to each. They run concurrently against one read snapshot, and come back
+    in order as {"responses": [{"id", "status", "etag", "body"}, ...]}.
+    """
+    try:
+        items = (request.get_json(silent=True) or {}).get("requests")
+        if not isinstance(items, list) or not items:
+            return jsonify({"message": "requests must be a non-empty list"}), 400
+        if len(items) > BATCH_MAX_REQUESTS:
+            return jsonify({"message": f"At most {BATCH_MAX_REQUESTS} requests per batch"}), 400
+        
+        adapter = app.url_map.bind_to_environ(request.environ)
+        environs = []
+        for item in items:
+            path = item.get("path") if isinstance(item, dict) else None
+            if not isinstance(path, str) or not path.startswith("/api/"):
+                return jsonify({"message": "Each request needs a path under /api/"}), 400
+            try:
+                endpoint = adapter.match(path.partition("?")[0], method="GET")[0]
+            except HTTPException:
+                # Unknown paths get their 404/405 in the responses
+                endpoint = None
+            if endpoint in BATCH_EXCLUDED_ENDPOINTS:
+                return jsonify({"message": f"{path} cannot be batched"}), 400
+            
+            headers = {}
+            if request.headers.get("Authorization"):
+                headers["Authorization"] = request.headers["Authorization"]
+            if item.get("if_none_match"):
+                headers["If-None-Match"] = str(item["if_none_match"])
+            environs.append(EnvironBuilder(
+                path=path, method="GET", base_url=request.host_url, headers=headers,
+                environ_overrides={"REMOTE_ADDR": request.remote_addr}
+            ).get_environ())
+        
+        with db.snapshot() as conn:
+            # A fresh context each, so sub-requests share nothing but the snapshot
+            futures = [batch_pool.submit(contextvars.Context().run, dispatch_subrequest,
+                                         environ, conn)
+                       for environ in environs]
+            responses = [future.result() for future in futures]
+        
+        # Sub-request bodies are spliced in as they are, not decoded and re-encoded
+        parts = []
+        for item, response in zip(items, responses):
+            body = response.get_data()
+            if not body:
+                body = b"null"
+            elif not response.is_json:
+                body = json.dumps(body.decode("utf-8", "replace")).encode()
+            parts.append(b'{"id":%s,"status":%d,"etag":%s,"body":%s}' % (
+                json.dumps(item.get("id"), default=str).encode(), response.status_code,
+                json.dumps(response.headers.get("ETag")).encode(), body))
+        return json_bytes(b'{"responses":[' + b",".join(parts) + b"]}")
+    
+    except Exception as e:
+        logger.error(f"Error running batch: {str(e)}")
+        return jsonify({"error": "Failed to run batch"}), 500
+
+
 # ========== ADMIN ENDPOINTS ==========
 
 @app.route("/api/admin/stats", methods=["GET"])
+@require_auth(authority, admin=True)
 def get_stats():
     """Get dashboard statistics (admin)"""
     try:
@@ -291,32 +730,142 @@ def get_stats():
         return jsonify({"error": "Failed to fetch statistics"}), 500
 
 
+@app.route("/api/admin/write-queue", methods=["GET"])
+@require_auth(authority, admin=True)
+def get_write_queue_stats():
+    """Get write-behind queue depth and throughput (admin)"""
+    if db.write_queue is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify(dict(db.write_queue.stats(), enabled=True)), 200
+
+
+@app.route("/api/admin/query-report", methods=["GET"])
+@require_auth(authority, admin=True)
+def get_query_report():
+    """Get per-statement timings and full-scan queries (admin)"""
+    try:
+        limit = request.args.get("limit", default=50, type=int)
+        return jsonify(db.tracer.report(max(1, min(limit, 500)))), 200
+    except Exception as e:
+        logger.error(f"Error building query report: {str(e)}")
+        return jsonify({"error": "Failed to build query report"}), 500
+
+
+@app.route("/api/admin/users/bulk-update", methods=["POST"])
+@require_auth(authority, admin=True)
+def bulk_update_users():
+    """
+    Change many users at once (admin). Body: {"changes": [{"user_id": 1,
+    "fields": {"role": "Admin", "is_active": false}}, ...]}; the response
+    has one result per change, in order.
+    """
+    try:
+        payload = request.get_json(silent=True) or {}
+        changes = payload.get("changes")
+        
+        if not isinstance(changes, list) or not changes:
+            return jsonify({"message": "changes must be a non-empty list"}), 400
+        if len(changes) > BULK_UPDATE_MAX:
+            return jsonify({"message": f"At most {BULK_UPDATE_MAX} changes per request"}), 400
+        
+        result = db.bulk_update_users([
+            (change.get("user_id"), change.get("fields")) if isinstance(change, dict)
+            else (None, None)
+            for change in changes
+        ])
+        if not result["success"]:
+            return jsonify(result), 500
+        
+        # Tokens carry the role, so a new role or a deactivation ends
+        # the user's current sessions
+        authority.revoke_users([
+            row["user_id"] for row, change in zip(result["results"], changes)
+            if row["success"] and ("role" in change["fields"] or "is_active" in change["fields"])
+        ])
+        return jsonify(result), 200
+    
+    except Exception as e:
+        logger.error(f"Error bulk updating users: {str(e)}")
+        return jsonify({"error": "Failed to update users"}), 500
+
+
 @app.route("/api/admin/questions/unanswered", methods=["GET"])
+@require_auth(authority, admin=True)
+@conditional(db.table_versions, "Change_Log", private=True)
 def get_unanswered_questions():
     """Get unanswered questions (admin)"""
     try:
-        questions = db.get_unanswered_questions()
-        return jsonify(questions), 200
+        return json_bytes(db.get_unanswered_questions(as_json=True))
     except Exception as e:
         logger.error(f"Error fetching unanswered questions: {str(e)}")
         return jsonify({"error": "Failed to fetch unanswered questions"}), 500
 
 
+@app.route("/api/admin/questions/claim", methods=["POST"])
+@require_auth(authority, admin=True)
+def claim_questions():
+    """Lease the next unanswered questions to the calling admin (admin)"""
+    try:
+        payload = request.get_json(silent=True) or {}
+        admin_id = g.auth.user_id
+        limit = payload.get("limit", 10)
+        lease_seconds = payload.get("lease_seconds", 300)
+        
+        if not isinstance(limit, int) or not isinstance(lease_seconds, int):
+            return jsonify({"message": "limit and lease_seconds must be integers"}), 400
+        
+        questions = db.claim_questions(
+            admin_id,
+            limit=max(1, min(limit, 100)),
+            lease_seconds=max(30, min(lease_seconds, 3600))
+        )
+        return jsonify(questions), 200
+    except Exception as e:
+        logger.error(f"Error claiming questions: {str(e)}")
+        return jsonify({"error": "Failed to claim questions"}), 500
+
+
+@app.route("/api/admin/questions/release", methods=["POST"])
+@require_auth(authority, admin=True)
+def release_questions():
+    """Give back the calling admin's leased questions (admin)"""
+    try:
+        payload = request.get_json(silent=True) or {}
+        
+        result = db.release_questions(g.auth.user_id, payload.get("question_ids"))
+        
+        if result["success"]:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 500
+    
+    except Exception as e:
+        logger.error(f"Error releasing questions: {str(e)}")
+        return jsonify({"error": "Failed to release questions"}), 500
+
+
 @app.route("/api/admin/questions/<int:question_id>/answer", methods=["POST"])
+@require_auth(authority, admin=True)
 def answer_question(question_id):
-    """Answer a question (admin)"""
+    """Answer a question as the calling admin (admin)"""
     try:
         payload = request.get_json(silent=True) or {}
         answer_text = (payload.get("answer") or "").strip()
-        admin_id = payload.get("admin_id")
         
-        if not (answer_text and admin_id):
-            return jsonify({"message": "answer and admin_id are required"}), 400
+        if not answer_text:
+            return jsonify({"message": "answer is required"}), 400
         
-        result = db.answer_question(question_id, answer_text, admin_id)
+        result = db.answer_question(question_id, answer_text, g.auth.user_id)
         
         if result["success"]:
+            question = db.get_question(question_id)
+            if question:
+                events.publish(f"question:{question_id}", question)
             return jsonify(result), 200
+        elif result.get("not_found"):
+            return jsonify(result), 404
+        elif result.get("conflict"):
+            return jsonify(result), 409
         else:
             return jsonify(result), 500
     
@@ -325,6 +874,43 @@ def answer_question(question_id):
         return jsonify({"error": "Failed to answer question"}), 500
 
 
+@app.route("/api/admin/locations/<int:location_id>/maintenance", methods=["GET"])
+@require_auth(authority, admin=True)
+def get_maintenance_queue(location_id):
+    """Get equipment at a location ordered by maintenance priority (admin)"""
+    try:
+        limit = request.args.get("limit", default=20, type=int)
+        queue = db.get_maintenance_queue(location_id, max(1, min(limit, 500)))
+        return jsonify(queue), 200
+    except Exception as e:
+        logger.error(f"Error fetching maintenance queue: {str(e)}")
+        return jsonify({"error": "Failed to fetch maintenance queue"}), 500
+
+
+@app.route("/api/admin/equipment/<int:equipment_id>/maintenance", methods=["POST"])
+@require_auth(authority, admin=True)
+def record_maintenance(equipment_id):
+    """Record maintenance on a piece of equipment (admin)"""
+    try:
+        payload = request.get_json(silent=True) or {}
+        maintenance_date = (payload.get("maintenance_date") or "").strip()
+        condition = (payload.get("condition") or "Good").strip()
+        
+        if not maintenance_date:
+            return jsonify({"message": "maintenance_date is required"}), 400
+        
+        result = db.record_equipment_maintenance(equipment_id, maintenance_date, condition)
+        
+        if result["success"]:
+            return jsonify(result), 200
+        else:
+            return jsonify(result), 404
+    
+    except Exception as e:
+        logger.error(f"Error recording maintenance: {str(e)}")
+        return jsonify({"error": "Failed to record maintenance"}), 500
+
+
 # ========== ORDER/CART ENDPOINTS ==========
 
 @app.route("/api/orders", methods=["POST"])
@@ -378,101 +964,6 @@ def create_order():
         return jsonify({"success": False, "message": "Failed to create order"}), 500
 
 
-@app.route("/api/products", methods=["GET"])
-def get_products():
-    """Get all products by category"""
-    try:
-        category = request.args.get('category', 'all')
-        
-        products = [
-            {
-                "product_id": 1,
-                "name": "Whey Protein Powder",
-                "category": "Protein",
-                "price": 49.99,
-                "description": "Premium whey protein isolate for muscle building",
-                "pack_size": "2.5 kg"
-            },
-            {
-                "product_id": 2,
-                "name": "Casein Protein",
-                "category": "Protein",
-                "price": 39.99,
-                "description": "Slow-release casein protein for overnight recovery",
-                "pack_size": "2 kg"
-            },
-            {
-                "product_id": 3,
-                "name": "Plant-Based Protein",
-                "category": "Protein",
-                "price": 44.99,
-                "description": "Vegan protein blend with all essential amino acids",
-                "pack_size": "1.5 kg"
-            },
-            {
-                "product_id": 4,
-                "name": "Chicken Breast Pack",
-                "category": "FoodDiet",
-                "price": 24.99,
-                "description": "Lean protein rich chicken breast - fresh daily",
-                "pack_size": "2 kg"
-            },
-            {
-                "product_id": 5,
-                "name": "Salmon Fillet",
-                "category": "FoodDiet",
-                "price": 34.99,
-                "description": "Wild-caught salmon rich in Omega-3 fatty acids",
-                "pack_size": "1.5 kg"
-            },
-            {
-                "product_id": 6,
-                "name": "Organic Quinoa",
-                "category": "FoodDiet",
-                "price": 19.99,
-                "description": "Complete protein with all amino acids - organic",
-                "pack_size": "1 kg"
-            },
-            {
-                "product_id": 7,
-                "name": "Muscle Building Plan",
-                "category": "NutritionPlan",
-                "price": 99.99,
-                "description": "12-week customized meal plan for muscle growth",
-                "pack_size": "Digital"
-            },
-            {
-                "product_id": 8,
-                "name": "Fat Loss Program",
-                "category": "NutritionPlan",
-                "price": 89.99,
-                "description": "8-week fat loss meal plan with grocery list",
-                "pack_size": "Digital"
-            },
-            {
-                "product_id": 9,
-                "name": "Maintenance Plan",
-                "category": "NutritionPlan",
-                "price": 79.99,
-                "description": "Balanced meal plan for weight maintenance",
-                "pack_size": "Digital"
-            }
-        ]
-        
-        if category != 'all':
-            products = [p for p in products if p['category'] == category]
-        
-        return jsonify({
-            "success": True,
-            "products": products,
-            "total": len(products)
-        }), 200
-    
-    except Exception as e:
-        logger.error(f"Error fetching products: {str(e)}")
-        return jsonify({"success": False, "message": "Failed to fetch products"}), 500
-
-
 if __name__ == "__main__":
     logger.info(f"Starting Power Physique Zone Backend")
     logger.info(f"Database initialized: {db.db_path}")
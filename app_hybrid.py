@@ -3,23 +3,42 @@ Flask App - Supporting both SQLite and MySQL (XAMPP)
 Switch between databases by changing USE_MYSQL flag
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, g, request, jsonify
 from flask_cors import CORS
 import json
 from pathlib import Path
 
 # Import the hybrid database module
+from auth import TokenAuthority, require_auth
 from database_hybrid import Database
+from http_cache import init_compression, serve_assets
+from replicas import read_session
 
 # ==================== CONFIGURATION ====================
 app = Flask(__name__)
 CORS(app)
 
+# gzip/brotli for larger responses
+init_compression(app)
+
+# Front end built by build_assets.py: fingerprinted, immutable assets
+serve_assets(app, Path(__file__).parent / "dist")
+
 # Switch to True to use MySQL (XAMPP), False to use SQLite
 USE_MYSQL = False
 
+# With MySQL, read through the stored procedures (results cached per process)
+USE_PROCEDURES = False
+
+# With MySQL, read-only queries go to these replicas, e.g.
+# [{'host': 'replica1.local'}, {'host': 'replica2.local', 'port': 3307}]
+MYSQL_REPLICAS = []
+
 # Initialize database
-db = Database(use_mysql=USE_MYSQL)
+db = Database(use_mysql=USE_MYSQL, use_procedures=USE_PROCEDURES, replicas=MYSQL_REPLICAS)
+
+# Signed session tokens (set PPZ_AUTH_SECRET so they survive restarts)
+authority = TokenAuthority(db)
 
 print(f"✓ Flask app initialized")
 print(f"✓ Using {'MySQL (XAMPP)' if USE_MYSQL else 'SQLite'} database")
@@ -32,6 +51,12 @@ def json_response(data, status_code=200):
     return jsonify(data), status_code
 
 
+@app.before_request
+def bind_read_session():
+    """Reads after a client's own write see that write"""
+    read_session.set(request.remote_addr)
+
+
 # ==================== AUTHENTICATION ROUTES ====================
 
 @app.route('/api/signup', methods=['POST'])
@@ -70,7 +95,13 @@ def login():
         user = db.authenticate_user(data['username'], data['password'])
         
         if user:
-            return json_response({"success": True, "user": dict(user)}, 200)
+            token, claims = authority.issue(user)
+            return json_response({
+                "success": True,
+                "user": dict(user),
+                "token": token,
+                "expires_at": claims.expires_at
+            }, 200)
         else:
             return json_response({"success": False, "message": "Invalid username or password"}, 401)
     
@@ -132,21 +163,48 @@ def get_questions():
 
 
 @app.route('/api/questions/<int:question_id>/answer', methods=['POST'])
+@require_auth(authority, admin=True)
 def answer_question(question_id):
-    """Answer a question (admin only)"""
+    """Answer a question as the calling admin (admin only)"""
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True) or {}
         
-        if not data.get('answer_text') or not data.get('admin_id'):
+        if not data.get('answer_text'):
             return json_response({"success": False, "message": "Missing required fields"}, 400)
         
         result = db.answer_question(
             question_id=question_id,
             answer_text=data['answer_text'],
-            admin_id=data['admin_id']
+            admin_id=g.auth.user_id
         )
         
-        return json_response(result, 200 if result['success'] else 400)
+        if result['success']:
+            return json_response(result, 200)
+        if result.get('not_found'):
+            return json_response(result, 404)
+        return json_response(result, 409 if result.get('conflict') else 400)
+    
+    except Exception as e:
+        return json_response({"success": False, "message": str(e)}, 500)
+
+
+@app.route('/api/admin/questions/claim', methods=['POST'])
+@require_auth(authority, admin=True)
+def claim_questions():
+    """Lease the next unanswered questions to the calling admin"""
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        questions = db.claim_questions(
+            admin_id=g.auth.user_id,
+            limit=max(1, min(int(data.get('limit', 10)), 100)),
+            lease_seconds=max(30, min(int(data.get('lease_seconds', 300)), 3600))
+        )
+        return json_response({
+            "success": True,
+            "questions": questions,
+            "total": len(questions)
+        }, 200)
     
     except Exception as e:
         return json_response({"success": False, "message": str(e)}, 500)
@@ -177,6 +235,7 @@ def post_contact():
 
 
 @app.route('/api/messages', methods=['GET'])
+@require_auth(authority, admin=True)
 def get_messages():
     """Get all contact messages (admin only)"""
     try:
@@ -194,6 +253,7 @@ def get_messages():
 # ==================== ADMIN ROUTES ====================
 
 @app.route('/api/admin/stats', methods=['GET'])
+@require_auth(authority, admin=True)
 def get_admin_stats():
     """Get admin dashboard statistics"""
     try:
@@ -218,6 +278,7 @@ def health_check():
             "success": True,
             "status": "healthy",
             "database": "MySQL (XAMPP)" if USE_MYSQL else "SQLite",
+            "replicas": db.router.status() if db.router else [],
             "stats": stats
         }, 200)
     
@@ -0,0 +1,257 @@
+"""
+Session tokens for Power Physique Zone
+HMAC-signed bearer tokens issued at login and checked in memory, with a
+revocation list kept in sync from the Revoked_Tokens table
+"""
+
+import base64
+import functools
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+TOKEN_TTL_SECONDS = 12 * 3600
+# How often each process picks up revocations made by other processes
+REVOCATION_SYNC_SECONDS = 5.0
+# Verified tokens remembered, so repeat requests skip the HMAC
+VERIFIED_CACHE_SIZE = 10000
+
+ADMIN_ROLES = ("Admin", "Co-Founder")
+
+
+class AuthError(Exception):
+    """A token is missing, malformed, expired or revoked"""
+
+
+class Claims:
+    """What a verified token says about its bearer"""
+
+    __slots__ = ("user_id", "role", "issued_ms", "expires_at", "token_id")
+
+    def __init__(self, user_id: int, role: str, issued_ms: int, expires_at: int, token_id: str):
+        self.user_id = user_id
+        self.role = role
+        self.issued_ms = issued_ms
+        self.expires_at = expires_at
+        self.token_id = token_id
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role in ADMIN_ROLES
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class TokenAuthority:
+    """
+    Issues and verifies tokens of the form payload.signature, where the
+    payload is "user_id:role:issued_ms:expires_at:token_id" and the
+    signature its HMAC-SHA256 under the server secret.
+
+    Verifying needs no database access: the signature and expiry are
+    checked in memory (and remembered per token in an LRU), and revocations
+    are looked up in dictionaries that are refreshed from the store at most
+    every `sync_interval` seconds.
+
+    `store` provides add_revocation, add_revocations, get_revocations
+    and purge_revocations (see Database).
+    """
+
+    def __init__(self, store, secret: Optional[bytes] = None,
+                 ttl: int = TOKEN_TTL_SECONDS,
+                 sync_interval: float = REVOCATION_SYNC_SECONDS,
+                 cache_size: int = VERIFIED_CACHE_SIZE,
+                 clock: Callable[[], float] = time.time):
+        if secret is None:
+            secret = os.environ.get("PPZ_AUTH_SECRET", "").encode()
+        if not secret:
+            logger.warning("PPZ_AUTH_SECRET is not set; tokens will not survive a restart "
+                           "or be accepted by other processes")
+            secret = secrets.token_bytes(32)
+        self.store = store
+        self.ttl = ttl
+        self.sync_interval = sync_interval
+        self.clock = clock
+        self._secret = secret
+        self._verified = LRUCache(cache_size)
+
+        # token_id -> expires_at, and user_id -> tokens issued up to this
+        # time (ms) are revoked
+        self._denied_tokens: Dict[str, int] = {}
+        self._user_cutoffs: Dict[int, int] = {}
+        self._last_revocation_id = 0
+        self._last_sync = float("-inf")
+        self._sync_lock = threading.Lock()
+
+    def _sign(self, payload: str) -> str:
+        return _b64encode(hmac.new(self._secret, payload.encode(), hashlib.sha256).digest())
+
+    # ========== ISSUING ==========
+
+    def issue(self, user: Dict) -> Tuple[str, Claims]:
+        """Token for a user row (needs user_id and role)"""
+        now = self.clock()
+        claims = Claims(int(user["user_id"]), user.get("role") or "Member",
+                        int(now * 1000), int(now) + self.ttl, secrets.token_hex(8))
+        payload = (f"{claims.user_id}:{claims.role}:{claims.issued_ms}:"
+                   f"{claims.expires_at}:{claims.token_id}")
+        encoded = _b64encode(payload.encode())
+        return f"{encoded}.{self._sign(encoded)}", claims
+
+    # ========== VERIFYING ==========
+
+    def verify(self, token: str) -> Claims:
+        """Claims of a valid token; raises AuthError otherwise"""
+        claims = self._verified.get(token)
+        if claims is None:
+            claims = self._decode(token)
+            self._verified.put(token, claims)
+
+        if claims.expires_at <= self.clock():
+            self._verified.pop(token)
+            raise AuthError("Token expired")
+
+        self.sync()
+        if claims.token_id in self._denied_tokens:
+            raise AuthError("Token revoked")
+        cutoff = self._user_cutoffs.get(claims.user_id)
+        if cutoff is not None and claims.issued_ms <= cutoff:
+            raise AuthError("Token revoked")
+        return claims
+
+    def _decode(self, token: str) -> Claims:
+        encoded, _, signature = token.partition(".")
+        if not signature or not hmac.compare_digest(signature, self._sign(encoded)):
+            raise AuthError("Invalid token")
+        try:
+            user_id, rest = _b64decode(encoded).decode().split(":", 1)
+            role, issued_ms, expires_at, token_id = rest.rsplit(":", 3)
+            return Claims(int(user_id), role, int(issued_ms), int(expires_at), token_id)
+        except ValueError:
+            raise AuthError("Invalid token") from None
+
+    # ========== REVOCATION ==========
+
+    def revoke(self, claims: Claims):
+        """Revoke one token (logout)"""
+        self._denied_tokens[claims.token_id] = claims.expires_at
+        self.store.add_revocation(claims.token_id, claims.user_id,
+                                  int(self.clock() * 1000), claims.expires_at)
+
+    def revoke_user(self, user_id: int):
+        """Revoke every token issued to a user so far"""
+        self.revoke_users([user_id])
+    
+    def revoke_users(self, user_ids: List[int]):
+        """revoke_user for many users, recorded in one write"""
+        if not user_ids:
+            return
+        now = self.clock()
+        revoked_ms = int(now * 1000)
+        for user_id in user_ids:
+            self._user_cutoffs[user_id] = max(self._user_cutoffs.get(user_id, 0), revoked_ms)
+        self.store.add_revocations([(None, user_id, revoked_ms, int(now) + self.ttl)
+                                    for user_id in user_ids])
+
+    def sync(self, force: bool = False):
+        """Pull revocations added since the last sync (by any process)"""
+        if not force and self.clock() - self._last_sync < self.sync_interval:
+            return
+        if not self._sync_lock.acquire(blocking=force):
+            return
+        try:
+            now = self.clock()
+            for row in self.store.get_revocations(self._last_revocation_id):
+                if row["token_id"] is None:
+                    user_id = row["user_id"]
+                    self._user_cutoffs[user_id] = max(self._user_cutoffs.get(user_id, 0),
+                                                      row["revoked_at"])
+                else:
+                    self._denied_tokens[row["token_id"]] = row["expires_at"]
+                self._last_revocation_id = max(self._last_revocation_id, row["revocation_id"])
+
+            # Revocations of tokens that have expired anyway can go
+            expired = [token_id for token_id, expires_at in self._denied_tokens.items()
+                       if expires_at <= now]
+            for token_id in expired:
+                del self._denied_tokens[token_id]
+            stale_ms = (now - self.ttl) * 1000
+            for user_id in [user_id for user_id, cutoff in self._user_cutoffs.items()
+                            if cutoff < stale_ms]:
+                del self._user_cutoffs[user_id]
+            if expired:
+                self.store.purge_revocations(int(now))
+            self._last_sync = now
+        except Exception as e:
+            # Keep serving with the lists we have; retry next interval
+            logger.error(f"Error syncing token revocations: {e}")
+            self._last_sync = self.clock()
+        finally:
+            self._sync_lock.release()
+
+    def stats(self) -> Dict:
+        return {
+            "verified_cache": self._verified.stats(),
+            "denied_tokens": len(self._denied_tokens),
+            "revoked_users": len(self._user_cutoffs)
+        }
+
+
+def bearer_token(header: Optional[str]) -> Optional[str]:
+    """Token from an Authorization: Bearer header"""
+    if header and header[:7].lower() == "bearer ":
+        return header[7:].strip() or None
+    return None
+
+
+def require_auth(authority: TokenAuthority, admin: bool = False,
+                 query_token: bool = False, optional: bool = False):
+    """
+    Flask view decorator: 401 without a valid bearer token, 403 when
+    `admin` is set and the bearer is not an admin. The claims are put on
+    flask.g.auth.
+    
+    `query_token` also accepts ?access_token=..., for clients that cannot
+    set headers (EventSource).
+    
+    `optional` lets requests without a token through with flask.g.auth
+    None; a token that is sent must still be valid.
+    """
+    from flask import g, jsonify, request
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            token = bearer_token(request.headers.get("Authorization"))
+            if token is None and query_token:
+                token = request.args.get("access_token") or None
+            if token is None:
+                if optional:
+                    g.auth = None
+                    return view(*args, **kwargs)
+                return jsonify({"message": "Authorization bearer token required"}), 401
+            try:
+                claims = authority.verify(token)
+            except AuthError as e:
+                return jsonify({"message": str(e)}), 401
+            if admin and not claims.is_admin:
+                return jsonify({"message": "Admin access required"}), 403
+            g.auth = claims
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,438 @@
+"""
+Micro-benchmarks for the Database classes
+Times every public method of database.Database and database_hybrid.Database
+at several table sizes, together with the building blocks they share
+(connection setup, row fetching, row-to-dict conversion, JSON encoding),
+and records the memory each call allocates
+
+Usage:
+    python benchmarks/bench_database.py
+    python benchmarks/bench_database.py --scales 1k,100k,1m --output bench.json
+    python benchmarks/bench_database.py --backends sqlite --filter questions
+    python benchmarks/bench_database.py --compare baseline.json
+
+MySQL is benchmarked when a server is reachable with the PPZ_MYSQL_HOST,
+PPZ_MYSQL_PORT, PPZ_MYSQL_USER and PPZ_MYSQL_PASSWORD settings (defaults
+match XAMPP); the PPZ_MYSQL_DATABASE schema (power_physique_bench) is
+dropped and recreated for every scale.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from load_test import APP_DIR, CATEGORIES, DIFFICULTIES, SEED_PASSWORD, WORKOUT_CATEGORIES, \
+    find_schema, git_commit
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Keep the module-level `db` instances away from the real database
+_scratch = tempfile.mkdtemp(prefix="ppz-bench-")
+os.environ["PPZ_DB_PATH"] = os.path.join(_scratch, "import.db")
+sys.path.insert(0, str(APP_DIR))
+
+import database  # noqa: E402
+
+try:
+    import database_hybrid
+except ImportError:
+    database_hybrid = None
+
+BACKENDS = ("sqlite", "hybrid-sqlite", "mysql")
+SEED_CHUNK = 10000
+
+Case = Tuple[str, Callable[[], object]]
+
+
+def parse_scale(text: str) -> int:
+    text = text.strip().lower()
+    multiplier = {"k": 1000, "m": 1000000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * multiplier)
+
+
+def table_sizes(scale: int) -> Dict[str, int]:
+    """Users, questions and messages get `scale` rows; catalog tables stay smaller"""
+    return {
+        "users": scale,
+        "questions": scale,
+        "messages": scale,
+        "products": max(50, min(scale // 10, 10000)),
+        "locations": max(20, min(scale // 100, 5000)),
+        "workouts": max(20, min(scale // 1000, 500)),
+    }
+
+
+# ==================== SEEDING ====================
+
+def _insert(cursor, placeholder: str, sql: str, rows):
+    """executemany in chunks so 1M-row tables never sit in memory at once"""
+    sql = sql.replace("?", placeholder)
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, SEED_CHUNK))
+        if not chunk:
+            return
+        cursor.executemany(sql, chunk)
+
+
+def seed(conn, placeholder: str, sizes: Dict[str, int], rng: random.Random, catalog_extras: bool):
+    """Fill the shared tables (and workouts/equipment when catalog_extras is set)"""
+    cursor = conn.cursor()
+    password_hash = database.Database.hash_password(SEED_PASSWORD)
+
+    _insert(cursor, placeholder,
+            "INSERT INTO Users (username, email, password_hash, full_name, role) VALUES (?, ?, ?, ?, ?)",
+            ((f"user{i}", f"user{i}@example.com", password_hash, f"User {i}",
+              "Admin" if i < 5 else "Member") for i in range(sizes["users"])))
+    _insert(cursor, placeholder,
+            "INSERT INTO Products (name, category, price, description, pack_size, stock_quantity) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            ((f"Product {i}", CATEGORIES[i % len(CATEGORIES)], round(rng.uniform(50, 5000), 2),
+              "Synthetic product", "1KG", rng.randint(0, 200)) for i in range(sizes["products"])))
+    _insert(cursor, placeholder,
+            "INSERT INTO Gym_Locations (city, area, address, phone, latitude, longitude) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            ((f"CITY{i % 10}", f"AREA {i}", f"{i} Main St", "040-0000000",
+              rng.uniform(8.0, 35.0), rng.uniform(68.0, 97.0)) for i in range(sizes["locations"])))
+    _insert(cursor, placeholder,
+            "INSERT INTO User_Questions (user_id, user_name, question_text, answer_text, is_answered) "
+            "VALUES (?, ?, ?, ?, ?)",
+            ((rng.randint(1, sizes["users"]), f"User {i}", f"Seeded question {i}?",
+              "Seeded answer" if i % 3 else None, 1 if i % 3 else 0) for i in range(sizes["questions"])))
+    _insert(cursor, placeholder,
+            "INSERT INTO Contact_Messages (name, email, subject, message_text, is_read) "
+            "VALUES (?, ?, ?, ?, ?)",
+            ((f"Sender {i}", f"sender{i}@example.com", "Inquiry", f"Seeded message {i}", i % 2)
+             for i in range(sizes["messages"])))
+
+    if catalog_extras:
+        _insert(cursor, placeholder,
+                "INSERT INTO Workouts (name, category, description, difficulty_level, duration_minutes) "
+                "VALUES (?, ?, ?, ?, ?)",
+                ((f"Workout {i}", WORKOUT_CATEGORIES[i % 4], "Synthetic workout", DIFFICULTIES[i % 3], 45)
+                 for i in range(sizes["workouts"])))
+        _insert(cursor, placeholder,
+                "INSERT INTO Exercises (workout_id, name, sets, reps, description, rest_seconds) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                ((w + 1, f"Exercise {w}-{e}", 3, 10, "", 60)
+                 for w in range(sizes["workouts"]) for e in range(5)))
+        _insert(cursor, placeholder,
+                "INSERT INTO Gym_Equipment (name, category, location_id, maintenance_date, condition) "
+                "VALUES (?, ?, ?, ?, ?)",
+                ((f"Machine {i}", "Cardio", i % sizes["locations"] + 1, "2024-01-01", "Good")
+                 for i in range(sizes["locations"] * 10)))
+    conn.commit()
+
+
+def seeded_sqlite_file(directory: Path, sizes: Dict[str, int], rng: random.Random) -> Path:
+    path = directory / f"bench_{sizes['users']}.db"
+    if path.exists():
+        path.unlink()
+    conn = sqlite3.connect(str(path))
+    conn.executescript(find_schema().read_text())
+    seed(conn, "?", sizes, rng, catalog_extras=True)
+    conn.close()
+    return path
+
+
+def mysql_config() -> Dict:
+    return {
+        "host": os.environ.get("PPZ_MYSQL_HOST", "localhost"),
+        "port": int(os.environ.get("PPZ_MYSQL_PORT", "3306")),
+        "user": os.environ.get("PPZ_MYSQL_USER", "root"),
+        "password": os.environ.get("PPZ_MYSQL_PASSWORD", ""),
+        "database": os.environ.get("PPZ_MYSQL_DATABASE", "power_physique_bench"),
+    }
+
+
+def mysql_available(config: Dict) -> bool:
+    if database_hybrid is None:
+        return False
+    try:
+        conn = database_hybrid.mysql.connector.connect(
+            host=config["host"], port=config["port"], user=config["user"],
+            password=config["password"], connection_timeout=2)
+    except database_hybrid.Error:
+        return False
+    conn.close()
+    return True
+
+
+def reset_mysql_database(config: Dict):
+    conn = database_hybrid.mysql.connector.connect(
+        host=config["host"], port=config["port"], user=config["user"], password=config["password"])
+    cursor = conn.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS `{config['database']}`")
+    cursor.execute(f"CREATE DATABASE `{config['database']}`")
+    conn.close()
+
+
+# ==================== CASES ====================
+
+def component_cases(connect: Callable, sql: str) -> List[Case]:
+    """The steps every list method repeats, timed one at a time"""
+    conn = connect()
+    rows = conn.execute(sql).fetchall()
+    conn.close()
+    dicts = [dict(row) for row in rows]
+
+    def fetch_tuples():
+        conn = connect()
+        conn.row_factory = None
+        try:
+            return conn.execute(sql).fetchall()
+        finally:
+            conn.close()
+
+    def fetch_rows():
+        conn = connect()
+        try:
+            return conn.execute(sql).fetchall()
+        finally:
+            conn.close()
+
+    cases = [
+        ("component.connection_setup", lambda: connect().close()),
+        ("component.fetch_tuples", fetch_tuples),
+        ("component.fetch_rows", fetch_rows),
+        ("component.rows_to_dict", lambda: [dict(row) for row in rows]),
+        ("component.json_dumps", lambda: json.dumps(dicts, default=str)),
+    ]
+    if orjson is not None:
+        cases.append(("component.orjson_dumps", lambda: orjson.dumps(dicts, default=str)))
+    return cases
+
+
+def sqlite_cases(db, sizes: Dict[str, int], workdir: Path) -> List[Case]:
+    seq = itertools.count()
+    users, questions, messages = sizes["users"], sizes["questions"], sizes["messages"]
+    locations = sizes["locations"]
+
+    def next_id(limit: int) -> int:
+        return next(seq) % limit + 1
+
+    cases = [
+        ("create_user", lambda: db.create_user(f"bench{next(seq)}", f"bench{next(seq)}@example.com", "pw")),
+        ("authenticate_user", lambda: db.authenticate_user("user0", SEED_PASSWORD)),
+        ("get_user", lambda: db.get_user(next_id(users))),
+        ("update_user", lambda: db.update_user(next_id(users), full_name=f"Renamed {next(seq)}")),
+        ("add_question", lambda: db.add_question("Bench", f"Question {next(seq)}?")),
+        ("get_all_questions", db.get_all_questions),
+        ("get_all_questions.as_json", lambda: db.get_all_questions(as_json=True)),
+        ("get_unanswered_questions", db.get_unanswered_questions),
+        ("claim_questions", lambda: db.claim_questions(1, 10)),
+        ("release_questions", lambda: db.release_questions(1)),
+        ("answer_question", lambda: db.answer_question(next_id(questions), "Answer", 1)),
+        ("add_contact_message", lambda: db.add_contact_message("Bench", "b@example.com", "Hi", "Body")),
+        ("get_all_messages", db.get_all_messages),
+        ("get_all_messages.as_json", lambda: db.get_all_messages(as_json=True)),
+        ("mark_message_as_read", lambda: db.mark_message_as_read(next_id(messages))),
+        ("add_product", lambda: db.add_product(f"Bench product {next(seq)}", "Protein", 99.0, stock=5)),
+        ("get_products_by_category", lambda: db.get_products_by_category("Protein")),
+        ("get_all_products", db.get_all_products),
+        ("get_all_products.as_json", lambda: db.get_all_products(as_json=True)),
+        ("add_gym_location", lambda: db.add_gym_location("BENCH", f"Bench area {next(seq)}")),
+        ("get_all_locations", db.get_all_locations),
+        ("get_locations_by_city", lambda: db.get_locations_by_city("CITY1")),
+        ("get_nearby_locations", lambda: db.get_nearby_locations(17.4, 78.4, 5)),
+        ("get_workouts", db.get_workouts),
+        ("add_workout", lambda: db.add_workout(f"Bench workout {next(seq)}", "Cardio")),
+        ("add_exercise", lambda: db.add_exercise(1, f"Bench exercise {next(seq)}")),
+        ("add_equipment", lambda: db.add_equipment("Bench machine", "Cardio", next_id(locations))),
+        ("add_equipment_rating", lambda: db.add_equipment_rating(next_id(locations * 10), 3)),
+        ("record_equipment_maintenance",
+         lambda: db.record_equipment_maintenance(next_id(locations * 10), "2025-01-01")),
+        ("get_maintenance_queue", lambda: db.get_maintenance_queue(next_id(locations))),
+        ("get_dashboard_stats", db.get_dashboard_stats),
+        ("export_to_json", lambda: db.export_to_json(str(workdir / "export.json"))),
+    ]
+    questions_sql = "SELECT * FROM User_Questions ORDER BY submitted_at DESC"
+    return cases + component_cases(db.get_connection, questions_sql)
+
+
+def hybrid_cases(db, sizes: Dict[str, int]) -> List[Case]:
+    seq = itertools.count()
+    users, questions = sizes["users"], sizes["questions"]
+    # Distinct from the sqlite backend's users, which may share the same file
+    cases = [
+        ("create_user", lambda: db.create_user(f"hybrid{next(seq)}", f"hybrid{next(seq)}@example.com", "pw")),
+        ("authenticate_user", lambda: db.authenticate_user("user0", SEED_PASSWORD)),
+        ("get_user", lambda: db.get_user(next(seq) % users + 1)),
+        ("add_question", lambda: db.add_question("Bench", f"Question {next(seq)}?")),
+        ("get_all_questions", db.get_all_questions),
+        ("claim_questions", lambda: db.claim_questions(1, 10)),
+        ("answer_question", lambda: db.answer_question(next(seq) % questions + 1, "Answer", 1)),
+        ("add_contact_message", lambda: db.add_contact_message("Bench", "b@example.com", "Hi", "Body")),
+        ("get_all_messages", db.get_all_messages),
+        ("get_nearby_locations", lambda: db.get_nearby_locations(17.4, 78.4, 5)),
+        ("get_dashboard_stats", db.get_dashboard_stats),
+    ]
+
+    def connection_setup():
+        conn = db.get_connection()
+        conn.close()
+
+    return cases + [("component.connection_setup", connection_setup)]
+
+
+# ==================== MEASUREMENT ====================
+
+def measure(fn: Callable[[], object], min_time: float, max_iterations: int) -> Dict:
+    """Time repeated calls, then one extra call under tracemalloc"""
+    fn()  # warm-up: caches, plans, first connection
+
+    timings: List[float] = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < max_iterations and (not timings or time.perf_counter() < deadline):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = fn()
+        after, peak = tracemalloc.get_traced_memory()
+        del result
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "iterations": len(timings),
+        "min_ms": round(min(timings) * 1000, 4),
+        "median_ms": round(statistics.median(timings) * 1000, 4),
+        "mean_ms": round(statistics.fmean(timings) * 1000, 4),
+        "stdev_ms": round(statistics.stdev(timings) * 1000, 4) if len(timings) > 1 else 0.0,
+        "ops_per_s": round(len(timings) / sum(timings), 1),
+        "alloc_peak_kib": round((peak - before) / 1024, 2),
+        "alloc_retained_kib": round((after - before) / 1024, 2),
+    }
+
+
+def run_cases(label: str, cases: List[Case], name_filter: Optional[str],
+              min_time: float, max_iterations: int) -> Dict[str, Dict]:
+    results = {}
+    for name, fn in cases:
+        if name_filter and name_filter not in name:
+            continue
+        result = measure(fn, min_time, max_iterations)
+        results[name] = result
+        print(f"  {label:<14}{name:<32}{result['median_ms']:>12} ms{result['ops_per_s']:>12} op/s"
+              f"{result['alloc_peak_kib']:>14} KiB peak")
+    return results
+
+
+def compare(baseline: Dict, current: Dict, tolerance_pct: float) -> bool:
+    """Print median deltas; False if any case slowed down past tolerance"""
+    ok = True
+    print(f"\n{'case':<60}{'base ms':>12}{'now ms':>12}{'delta':>9}")
+    for key, result in current["results"].items():
+        base = baseline.get("results", {}).get(key)
+        if not base or not base["median_ms"]:
+            continue
+        delta = (result["median_ms"] - base["median_ms"]) / base["median_ms"] * 100
+        flag = ""
+        if delta > tolerance_pct:
+            ok = False
+            flag = "  REGRESSION"
+        print(f"{key:<60}{base['median_ms']:>12}{result['median_ms']:>12}{delta:>8.1f}%{flag}")
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Power Physique Zone database micro-benchmarks")
+    parser.add_argument("--scales", default="1k,100k", help="comma-separated row counts, e.g. 1k,100k,1m")
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--filter", help="only run cases whose name contains this text")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds to spend timing each case")
+    parser.add_argument("--max-iterations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_database_results.json")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=20.0,
+                        help="allowed median increase in percent before failing")
+    args = parser.parse_args()
+
+    scales = [parse_scale(s) for s in args.scales.split(",") if s.strip()]
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    unknown = [b for b in backends if b not in BACKENDS]
+    if unknown:
+        parser.error(f"unknown backends: {', '.join(unknown)}")
+    if database_hybrid is None and any(b != "sqlite" for b in backends):
+        print("database_hybrid could not be imported (mysql-connector missing); hybrid backends skipped")
+        backends = [b for b in backends if b == "sqlite"]
+    config = mysql_config()
+    if "mysql" in backends and not mysql_available(config):
+        print(f"No MySQL server at {config['host']}:{config['port']}; mysql backend skipped")
+        backends.remove("mysql")
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "orjson": orjson is not None,
+        "results": {},
+    }
+
+    workdir = Path(_scratch)
+    for scale in scales:
+        sizes = table_sizes(scale)
+        print(f"\n== {scale} rows ==")
+        db_path = None
+        if "sqlite" in backends or "hybrid-sqlite" in backends:
+            started = time.perf_counter()
+            db_path = seeded_sqlite_file(workdir, sizes, random.Random(args.seed))
+            print(f"  seeded SQLite in {time.perf_counter() - started:.1f}s")
+
+        for backend in backends:
+            if backend == "sqlite":
+                db = database.Database(db_path)
+                cases = sqlite_cases(db, sizes, workdir)
+            elif backend == "hybrid-sqlite":
+                database_hybrid.DB_PATH = db_path
+                db = database_hybrid.Database(use_mysql=False)
+                cases = hybrid_cases(db, sizes)
+            else:
+                reset_mysql_database(config)
+                db = database_hybrid.Database(use_mysql=True, config=config)
+                conn = db.get_connection()
+                seed(conn, "%s", sizes, random.Random(args.seed), catalog_extras=False)
+                conn.close()
+                cases = hybrid_cases(db, sizes)
+
+            results = run_cases(backend, cases, args.filter, args.min_time, args.max_iterations)
+            for name, result in results.items():
+                report["results"][f"{backend}/{scale}/{name}"] = result
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(baseline, report, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,381 @@
+"""
+HTTP load test for the Power Physique Zone API
+Seeds a throwaway database, starts app.py (or app_hybrid.py) against it and
+drives mixed workloads, writing latency percentiles and throughput to JSON
+
+Usage:
+    python benchmarks/load_test.py --size medium --output results.json
+    python benchmarks/load_test.py --app app_hybrid --scenarios catalog,qa_burst
+    python benchmarks/load_test.py --compare baseline.json --output results.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+# Row counts per seed size
+SIZES = {
+    "small": {"users": 200, "products": 50, "locations": 20, "workouts": 20,
+              "questions": 500, "messages": 500},
+    "medium": {"users": 5000, "products": 500, "locations": 200, "workouts": 200,
+               "questions": 20000, "messages": 20000},
+    "large": {"users": 50000, "products": 2000, "locations": 1000, "workouts": 1000,
+              "questions": 200000, "messages": 200000},
+}
+
+CATEGORIES = ["Protein", "FoodDiet", "Equipment", "NutritionPlan"]
+WORKOUT_CATEGORIES = ["Muscle Building", "Fat Loss", "Strength", "Cardio"]
+DIFFICULTIES = ["Beginner", "Intermediate", "Advanced"]
+SEED_PASSWORD = "loadtest123"
+
+# Routes differ between the two Flask apps
+ROUTES = {
+    "app": {
+        "login": "/api/users/login",
+        "question_payload": lambda i: {"username": f"load_user_{i}", "question": f"Load test question {i}?"},
+        "catalog": ["/api/products", "/api/products?category=Protein", "/api/locations",
+                    "/api/locations?city=CITY1", "/api/workouts", "/api/questions",
+                    "/api/locations/nearby?lat=17.4&lon=78.4&k=5"],
+    },
+    "app_hybrid": {
+        "login": "/api/login",
+        "question_payload": lambda i: {"user_name": f"load_user_{i}", "question_text": f"Load test question {i}?"},
+        "catalog": ["/api/questions", "/api/admin/stats"],
+        # No order endpoint in the hybrid app
+        "unsupported": ("checkout",),
+    },
+}
+
+
+# ==================== SEEDING ====================
+
+def find_schema() -> Path:
+    """schema.sql lives in ../database in the deployed layout, next to the code otherwise"""
+    for candidate in (APP_DIR.parent / "database" / "schema.sql", APP_DIR / "schema.sql"):
+        if candidate.exists():
+            return candidate
+    raise FileNotFoundError("schema.sql not found")
+
+
+def seed_database(db_path: Path, sizes: Dict[str, int], rng: random.Random):
+    """Create the schema and bulk-insert synthetic rows"""
+    sys.path.insert(0, str(APP_DIR))
+    from database import Database
+
+    conn = sqlite3.connect(str(db_path))
+    conn.executescript(find_schema().read_text())
+    cursor = conn.cursor()
+    password_hash = Database.hash_password(SEED_PASSWORD)
+
+    cursor.executemany('''
+        INSERT INTO Users (username, email, password_hash, full_name, role)
+        VALUES (?, ?, ?, ?, ?)
+    ''', ((f"user{i}", f"user{i}@example.com", password_hash, f"User {i}",
+           "Admin" if i < 5 else "Member") for i in range(sizes["users"])))
+
+    cursor.executemany('''
+        INSERT INTO Products (name, category, price, description, pack_size, stock_quantity)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', ((f"Product {i}", CATEGORIES[i % len(CATEGORIES)], round(rng.uniform(50, 5000), 2),
+           "Synthetic product for load testing", "1KG", rng.randint(0, 200))
+          for i in range(sizes["products"])))
+
+    cursor.executemany('''
+        INSERT INTO Gym_Locations (city, area, address, phone, latitude, longitude)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', ((f"CITY{i % 10}", f"AREA {i}", f"{i} Main St", "040-0000000",
+           rng.uniform(8.0, 35.0), rng.uniform(68.0, 97.0)) for i in range(sizes["locations"])))
+
+    cursor.executemany('''
+        INSERT INTO Workouts (name, category, description, difficulty_level, duration_minutes)
+        VALUES (?, ?, ?, ?, ?)
+    ''', ((f"Workout {i}", WORKOUT_CATEGORIES[i % 4], "Synthetic workout", DIFFICULTIES[i % 3],
+           rng.choice([30, 45, 60])) for i in range(sizes["workouts"])))
+    cursor.executemany('''
+        INSERT INTO Exercises (workout_id, name, sets, reps, description, rest_seconds)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', ((w + 1, f"Exercise {w}-{e}", 3, 10, "", 60)
+          for w in range(sizes["workouts"]) for e in range(5)))
+
+    cursor.executemany('''
+        INSERT INTO User_Questions (user_id, user_name, question_text, answer_text, is_answered)
+        VALUES (?, ?, ?, ?, ?)
+    ''', ((rng.randint(1, sizes["users"]), f"User {i}", f"Seeded question {i}?",
+           "Seeded answer" if i % 3 else None, 1 if i % 3 else 0)
+          for i in range(sizes["questions"])))
+
+    cursor.executemany('''
+        INSERT INTO Contact_Messages (name, email, subject, message_text, is_read)
+        VALUES (?, ?, ?, ?, ?)
+    ''', ((f"Sender {i}", f"sender{i}@example.com", "Inquiry", f"Seeded message {i}", i % 2)
+          for i in range(sizes["messages"])))
+
+    conn.commit()
+    conn.close()
+
+
+# ==================== SERVER ====================
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(app_module: str, db_path: Path, port: int) -> subprocess.Popen:
+    """Run the Flask app threaded, without the debug reloader"""
+    env = dict(os.environ, PPZ_DB_PATH=str(db_path))
+    code = (f"import {app_module} as m; "
+            f"m.app.run(host='127.0.0.1', port={port}, debug=False, threaded=True)")
+    # Request logs go to a file; an unread pipe would fill up and stall the server
+    log_path = db_path.with_name("server.log")
+    with open(log_path, "wb") as log:
+        server = subprocess.Popen([sys.executable, "-c", code], cwd=str(APP_DIR), env=env,
+                                  stdout=log, stderr=subprocess.STDOUT)
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited: {log_path.read_text(errors='replace')}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/api/health")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Server did not become healthy within 30s")
+
+
+# ==================== WORKLOADS ====================
+
+Request = Tuple[str, str, Optional[Dict]]
+
+
+def catalog_requests(routes: Dict, sizes: Dict, rng: random.Random) -> Callable[[int], Request]:
+    def make(i: int) -> Request:
+        path = rng.choice(routes["catalog"])
+        return "GET", path, None
+    return make
+
+
+def qa_burst_requests(routes: Dict, sizes: Dict, rng: random.Random) -> Callable[[int], Request]:
+    def make(i: int) -> Request:
+        return "POST", "/api/questions", routes["question_payload"](i)
+    return make
+
+
+def login_storm_requests(routes: Dict, sizes: Dict, rng: random.Random) -> Callable[[int], Request]:
+    def make(i: int) -> Request:
+        user = rng.randrange(sizes["users"])
+        # One in five attempts uses a wrong password, like a stuffing wave
+        password = SEED_PASSWORD if i % 5 else "wrong-password"
+        return "POST", routes["login"], {"username": f"user{user}", "password": password}
+    return make
+
+
+def checkout_requests(routes: Dict, sizes: Dict, rng: random.Random) -> Callable[[int], Request]:
+    def make(i: int) -> Request:
+        items = [{"product_id": rng.randint(1, sizes["products"]), "price": 99.0,
+                  "quantity": rng.randint(1, 3)} for _ in range(rng.randint(1, 5))]
+        return "POST", "/api/orders", {
+            "customer_name": f"Customer {i}", "customer_email": f"c{i}@example.com",
+            "customer_phone": "9999999999", "delivery_address": "1 Load Test Rd",
+            "payment_method": "Card", "items": items}
+    return make
+
+
+SCENARIOS = {
+    "catalog": catalog_requests,
+    "qa_burst": qa_burst_requests,
+    "login_storm": login_storm_requests,
+    "checkout": checkout_requests,
+}
+
+
+def run_scenario(port: int, make_request: Callable[[int], Request],
+                 concurrency: int, total_requests: int) -> Dict:
+    """Issue total_requests over `concurrency` keep-alive connections"""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    lock = threading.Lock()
+    counter = iter(range(total_requests))
+
+    def worker():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        local_latencies = []
+        local_statuses: Dict[str, int] = {}
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            method, path, payload = make_request(i)
+            body = json.dumps(payload) if payload is not None else None
+            headers = {"Content-Type": "application/json"} if body else {}
+            started = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                status = str(response.status)
+            except (OSError, http.client.HTTPException):
+                status = "error"
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            local_latencies.append(time.perf_counter() - started)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+        conn.close()
+        with lock:
+            latencies.extend(local_latencies)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items()
+                 if status == "error" or status.startswith("5"))
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        "errors": errors,
+        "statuses": statuses,
+    }
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile in milliseconds"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return round(sorted_values[rank] * 1000, 3)
+
+
+# ==================== REPORTING ====================
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=str(APP_DIR),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: Dict, current: Dict, tolerance_pct: float) -> bool:
+    """Print p95/throughput deltas; False if any scenario regressed past tolerance"""
+    ok = True
+    print(f"\n{'scenario':<14}{'p95 base':>10}{'p95 now':>10}{'delta':>9}{'rps base':>10}{'rps now':>10}")
+    for name, result in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        delta = ((result["p95_ms"] - base["p95_ms"]) / base["p95_ms"] * 100) if base["p95_ms"] else 0.0
+        flag = ""
+        if delta > tolerance_pct:
+            ok = False
+            flag = "  REGRESSION"
+        print(f"{name:<14}{base['p95_ms']:>10}{result['p95_ms']:>10}{delta:>8.1f}%"
+              f"{base['throughput_rps']:>10}{result['throughput_rps']:>10}{flag}")
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Power Physique Zone HTTP load test")
+    parser.add_argument("--app", choices=sorted(ROUTES), default="app")
+    parser.add_argument("--size", choices=sorted(SIZES), default="small")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=2000, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="load_test_results.json")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=10.0,
+                        help="allowed p95 increase in percent before failing")
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    rng = random.Random(args.seed)
+    sizes = SIZES[args.size]
+    routes = ROUTES[args.app]
+    skipped = [s for s in scenarios if s in routes.get("unsupported", ())]
+    if skipped:
+        print(f"Skipping scenarios not served by {args.app}: {', '.join(skipped)}")
+        scenarios = [s for s in scenarios if s not in skipped]
+
+    with tempfile.TemporaryDirectory(prefix="ppz-load-") as tmp:
+        db_path = Path(tmp) / "power_physique.db"
+        print(f"Seeding {args.size} database at {db_path} ...")
+        seed_database(db_path, sizes, rng)
+
+        port = free_port()
+        server = start_server(args.app, db_path, port)
+        results = {
+            "app": args.app,
+            "size": args.size,
+            "rows": sizes,
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "scenarios": {},
+        }
+        try:
+            for name in scenarios:
+                # Same request sequence on every run for a given seed
+                make_request = SCENARIOS[name](routes, sizes, random.Random(f"{args.seed}-{name}"))
+                result = run_scenario(port, make_request, args.concurrency, args.requests)
+                results["scenarios"][name] = result
+                print(f"{name:<12} {result['throughput_rps']:>8} req/s  p50 {result['p50_ms']} ms  "
+                      f"p95 {result['p95_ms']} ms  p99 {result['p99_ms']} ms  errors {result['errors']}")
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=4)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(baseline, results, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
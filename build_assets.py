@@ -0,0 +1,198 @@
+"""
+Static asset build for Power Physique Zone
+Minifies Final.css / Final.js, fingerprints their file names, re-encodes
+the logo into responsive sizes (needs Pillow), rewrites the HTML pages to
+point at the results and precompresses everything into dist/.
+
+Run after changing any front-end file:  python build_assets.py
+The Flask app serves dist/ through http_cache.serve_assets.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import re
+import shutil
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+SOURCE_DIR = Path(__file__).parent
+DIST_DIR = SOURCE_DIR / "dist"
+ASSETS_DIR = "assets"
+MANIFEST = "manifest.json"
+
+PAGES = ("Final.html", "index.html", "subscribtion.html")
+STYLESHEETS = ("Final.css",)
+SCRIPTS = ("Final.js",)
+LOGO = "LOGO.img.jpg"
+
+# Logo widths in pixels: it is shown at LOGO_DISPLAY_WIDTH CSS pixels on
+# every page, and the larger files cover high-DPI screens
+LOGO_DISPLAY_WIDTH = 80
+LOGO_WIDTHS = (80, 160, 320)
+JPEG_QUALITY = 82
+
+# Text files are stored .gz/.br alongside when that saves at least this much
+PRECOMPRESS_MIN_SAVING = 0.1
+PRECOMPRESS_SUFFIXES = (".html", ".css", ".js", ".json", ".svg")
+
+
+# ========== MINIFYING ==========
+
+def minify_css(text: str) -> str:
+    """Drop comments and the whitespace CSS does not need"""
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.S)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s*([{};,>])\s*", r"\1", text)
+    text = re.sub(r":\s+", ":", text)
+    text = text.replace(";}", "}")
+    return text.strip()
+
+
+def minify_js(text: str) -> str:
+    """
+    Conservative: drop whole-line // comments, indentation and blank
+    lines. Nothing inside a line is touched, so strings and regex
+    literals are safe.
+    """
+    lines = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith("//"):
+            lines.append(line)
+    return "\n".join(lines) + "\n"
+
+
+# ========== FINGERPRINTING ==========
+
+def fingerprint(name: str, data: bytes) -> str:
+    """Final.css -> Final.1a2b3c4d5e.css"""
+    digest = hashlib.sha256(data).hexdigest()[:10]
+    stem, dot, suffix = name.rpartition(".")
+    return f"{stem}.{digest}.{suffix}" if dot else f"{name}.{digest}"
+
+
+def _write_asset(dist: Path, name: str, data: bytes) -> str:
+    """Write a fingerprinted asset; its URL path relative to the pages"""
+    hashed = fingerprint(name, data)
+    (dist / ASSETS_DIR / hashed).write_bytes(data)
+    return f"{ASSETS_DIR}/{hashed}"
+
+
+def build_logo(dist: Path, source: Path) -> Tuple[str, List[Tuple[str, int]]]:
+    """
+    (fallback src, [(url, width), ...]) for the logo. Without Pillow the
+    original is copied as is and there is no srcset.
+    """
+    if Image is None:
+        print("Pillow is not installed; logo copied without resizing")
+        return _write_asset(dist, source.name, source.read_bytes()), []
+
+    sizes = []
+    with Image.open(source) as image:
+        image = image.convert("RGB")
+        for width in LOGO_WIDTHS:
+            if width > image.width:
+                break
+            height = round(image.height * width / image.width)
+            resized = image.resize((width, height), Image.LANCZOS)
+            buffer = io.BytesIO()
+            resized.save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+            sizes.append((_write_asset(dist, f"logo-{width}.jpg", buffer.getvalue()), width))
+    if not sizes:
+        return _write_asset(dist, source.name, source.read_bytes()), []
+    # The middle size is a reasonable src for browsers without srcset
+    return sizes[len(sizes) // 2][0], sizes
+
+
+# ========== PAGES ==========
+
+def rewrite_page(html: str, urls: Dict[str, str], logo_src: str,
+                 logo_sizes: List[Tuple[str, int]]) -> str:
+    """Point href/src attributes at the built assets"""
+    for name, url in urls.items():
+        html = re.sub(rf'(\b(?:href|src)=["\']){re.escape(name)}(["\'])', rf"\g<1>{url}\g<2>", html)
+
+    def logo(match):
+        tag = match.group(0).replace(LOGO, logo_src)
+        if logo_sizes:
+            srcset = ", ".join(f"{url} {width}w" for url, width in logo_sizes)
+            width = re.search(r'\bwidth=["\']?(\d+)', tag)
+            sizes = width.group(1) if width else LOGO_DISPLAY_WIDTH
+            tag = tag.replace("<img", f'<img srcset="{srcset}" sizes="{sizes}px"', 1)
+        return tag
+
+    return re.sub(rf'<img\b[^>]*\bsrc=["\']{re.escape(LOGO)}["\'][^>]*>', logo, html)
+
+
+# ========== PRECOMPRESSING ==========
+
+def precompress(path: Path) -> List[Path]:
+    """Write path.gz (and path.br with brotli) when they are worth it"""
+    data = path.read_bytes()
+    written = []
+    variants = [(".gz", lambda body: gzip.compress(body, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", lambda body: brotli.compress(body, quality=11)))
+    for suffix, encode in variants:
+        encoded = encode(data)
+        if len(encoded) <= len(data) * (1 - PRECOMPRESS_MIN_SAVING):
+            target = path.with_name(path.name + suffix)
+            target.write_bytes(encoded)
+            written.append(target)
+    return written
+
+
+# ========== BUILD ==========
+
+def build(source_dir: Path = SOURCE_DIR, dist: Path = DIST_DIR) -> Dict:
+    """Build dist/ from scratch; returns the manifest"""
+    if dist.exists():
+        shutil.rmtree(dist)
+    (dist / ASSETS_DIR).mkdir(parents=True)
+
+    urls = {}
+    for name in STYLESHEETS:
+        text = (source_dir / name).read_text(encoding="utf-8")
+        urls[name] = _write_asset(dist, name, minify_css(text).encode("utf-8"))
+    for name in SCRIPTS:
+        text = (source_dir / name).read_text(encoding="utf-8")
+        urls[name] = _write_asset(dist, name, minify_js(text).encode("utf-8"))
+    logo_src, logo_sizes = build_logo(dist, source_dir / LOGO)
+
+    for page in PAGES:
+        html = (source_dir / page).read_text(encoding="utf-8")
+        (dist / page).write_text(rewrite_page(html, urls, logo_src, logo_sizes),
+                                 encoding="utf-8")
+
+    for path in sorted(dist.rglob("*")):
+        if path.is_file() and path.suffix in PRECOMPRESS_SUFFIXES:
+            precompress(path)
+
+    manifest = {
+        "assets": dict(urls, **{LOGO: logo_src}),
+        "logo_sizes": [url for url, _ in logo_sizes],
+        "pages": list(PAGES)
+    }
+    (dist / MANIFEST).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return manifest
+
+
+if __name__ == "__main__":
+    manifest = build()
+    for name, url in manifest["assets"].items():
+        source_size = (SOURCE_DIR / name).stat().st_size
+        built_size = (DIST_DIR / url).stat().st_size
+        print(f"{name:20} {source_size:>8} -> {built_size:>8}  {url}")
+    print(f"Built {len(manifest['pages'])} pages into {DIST_DIR}")
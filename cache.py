@@ -0,0 +1,145 @@
+"""
+In-process caches for Power Physique Zone
+A thread-safe LRU with an optional time-to-live per entry, and a watcher
+that tells caches when another process changed the tables behind them
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# How often Table_Versions is polled (at most once per interval, on demand)
+VERSION_POLL_SECONDS = 1.0
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Least-recently-used cache holding at most `max_entries` values.
+
+    With `ttl`, an entry older than `ttl` seconds counts as missing and is
+    dropped when next looked up.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= self.clock():
+                del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value):
+        expires_at = self.clock() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default=None):
+        with self._lock:
+            entry = self._entries.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+class VersionWatcher:
+    """
+    Polls per-table version counters (the Table_Versions table, bumped by
+    triggers on every write from any process) and calls the callbacks of
+    tables whose version moved.
+
+    check() is meant for hot paths: between polls it only compares the
+    clock, and while one thread polls the others carry on (except before
+    the first poll has finished, when there are no versions to go on).
+    """
+
+    def __init__(self, read_versions: Callable[[], Dict[str, int]],
+                 interval: float = VERSION_POLL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.read_versions = read_versions
+        self.interval = interval
+        self.clock = clock
+        self.polls = 0
+        self._versions: Optional[Dict[str, int]] = None
+        self._callbacks: Dict[str, List[Callable[[], None]]] = {}
+        self._next_poll = float("-inf")
+        self._lock = threading.Lock()
+
+    def on_change(self, table: str, callback: Callable[[], None]):
+        self._callbacks.setdefault(table, []).append(callback)
+
+    def check(self, force: bool = False):
+        if not force and self.clock() < self._next_poll:
+            return
+        if not self._lock.acquire(blocking=force or self._versions is None):
+            return
+        if not force and self.clock() < self._next_poll:
+            # Waited for the first poll, which another thread just made
+            self._lock.release()
+            return
+        try:
+            self.polls += 1
+            versions = self.read_versions()
+            previous, self._versions = self._versions, versions
+            if previous is not None:
+                for table, callbacks in self._callbacks.items():
+                    if versions.get(table) != previous.get(table):
+                        for callback in callbacks:
+                            callback()
+        except Exception as e:
+            logger.error(f"Error polling table versions: {e}")
+        finally:
+            self._next_poll = self.clock() + self.interval
+            self._lock.release()
+
+    def expire(self):
+        """Poll on the next check(), e.g. after this process wrote"""
+        self._next_poll = float("-inf")
+
+    def versions(self) -> Dict[str, int]:
+        """Versions seen at the last poll; empty if no poll has succeeded"""
+        return dict(self._versions or {})
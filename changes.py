@@ -0,0 +1,83 @@
+"""
+Change feed for Power Physique Zone
+Cursors over the Change_Log tables (one per database file) and the
+Server-Sent Events framing used to push changes to admin dashboards
+"""
+
+import json
+import time
+from typing import Callable, Dict, Iterator, Optional
+
+# Most Change_Log entries read by one feed call
+CHANGE_FEED_LIMIT = 500
+# Change_Log entries kept per database file; older ones are pruned, and a
+# cursor that points before them gets "reset" (reload the full lists)
+CHANGE_LOG_KEEP = 100000
+CHANGE_LOG_PRUNE_SECONDS = 3600.0
+
+# Event stream: how often it looks for changes, how long it stays quiet
+# before a keep-alive comment, and how long before the client is told to
+# reconnect (EventSource does so with Last-Event-ID)
+STREAM_POLL_SECONDS = 1.0
+STREAM_HEARTBEAT_SECONDS = 15.0
+STREAM_MAX_SECONDS = 300.0
+STREAM_RETRY_MS = 2000
+
+
+def parse_cursor(text: Optional[str]) -> Dict[str, int]:
+    """
+    Positions from a cursor such as "main:120,User_Questions.2026-10:4":
+    the last change_id seen in each database file. Raises ValueError.
+    """
+    positions = {}
+    if not text:
+        return positions
+    for part in text.split(","):
+        source, sep, position = part.rpartition(":")
+        if not sep or not source:
+            raise ValueError(f"Malformed cursor: {text}")
+        positions[source] = int(position)
+    return positions
+
+
+def format_cursor(positions: Dict[str, int]) -> str:
+    return ",".join(f"{source}:{position}" for source, position in positions.items())
+
+
+def sse_event(data: Dict, event: Optional[str] = None,
+              event_id: Optional[str] = None) -> str:
+    """One Server-Sent Events message"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    lines.append("data: " + json.dumps(data, default=str))
+    return "\n".join(lines) + "\n\n"
+
+
+def change_stream(fetch: Callable[[str], Dict], cursor: str,
+                  poll_interval: float = STREAM_POLL_SECONDS,
+                  heartbeat: float = STREAM_HEARTBEAT_SECONDS,
+                  max_seconds: float = STREAM_MAX_SECONDS,
+                  clock: Callable[[], float] = time.monotonic,
+                  sleep: Callable[[float], None] = time.sleep) -> Iterator[str]:
+    """
+    Event stream of `fetch(cursor)` results (see Database.get_changes).
+    Each "changes" event carries the new cursor as its id, so a client that
+    reconnects resumes where it left off.
+    """
+    started = last_sent = clock()
+    yield f"retry: {STREAM_RETRY_MS}\n\n"
+    while clock() - started < max_seconds:
+        changes = fetch(cursor)
+        cursor = changes["cursor"]
+        if changes["questions"] or changes["messages"] or changes["reset"]:
+            yield sse_event(changes, "changes", cursor)
+            last_sent = clock()
+            if changes["more"]:
+                continue
+        elif clock() - last_sent >= heartbeat:
+            yield ": keep-alive\n\n"
+            last_sent = clock()
+        sleep(poll_interval)
@@ -4,32 +4,303 @@ Handles all database operations with SQLite
 """
 
 import sqlite3
+import contextvars
 import json
 import hashlib
+import heapq
+from operator import itemgetter
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Tuple
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Tuple, Union
+import logging
 import os
+import queue
+import threading
+import time
 
-# Get the database path
-DB_PATH = Path(__file__).parent.parent / "database" / "power_physique.db"
+from cache import LRUCache, VersionWatcher
+from changes import (CHANGE_FEED_LIMIT, CHANGE_LOG_KEEP, CHANGE_LOG_PRUNE_SECONDS,
+                     format_cursor, parse_cursor)
+from geo import find_nearest
+from json_rows import encode_rows, encode_tuples
+from maintenance import MaintenanceScheduler
+from models import Location, Product, Record, UserSummary, encode_records
+from metrics import InstrumentedConnection
+from partitions import PartitionStore
+from query_log import QueryTracer
+from write_behind import WriteBehindQueue, DURABILITY_ASYNC
+
+logger = logging.getLogger(__name__)
+
+# Get the database path (PPZ_DB_PATH overrides it, e.g. for benchmarks)
+DB_PATH = Path(os.environ.get(
+    "PPZ_DB_PATH", Path(__file__).parent.parent / "database" / "power_physique.db"))
+
+# Columns added after tables were first released; databases created from an
+# older schema.sql get them through ALTER TABLE on startup
+SCHEMA_MIGRATIONS = {
+    'Gym_Locations': {'latitude': 'REAL', 'longitude': 'REAL'},
+    'User_Questions': {'claimed_by_user_id': 'INTEGER', 'claim_expires_at': 'TIMESTAMP'},
+}
+
+# Workout filters (category, difficulty) whose results get_workouts keeps;
+# bounded because the filters come straight from query strings
+WORKOUT_CACHE_SIZE = 256
+
+# User profiles kept per process for get_user
+PROFILE_CACHE_SIZE = 10000
+PROFILE_CACHE_TTL = 300.0
+
+# Columns bulk_update_users may change, and the roles it accepts
+BULK_USER_FIELDS = ('full_name', 'phone_number', 'address', 'email', 'role', 'is_active')
+USER_ROLES = ('Member', 'Admin', 'Co-Founder')
+
+# Bound parameters per IN (...) list, well under SQLite's limit
+SQL_PARAM_CHUNK = 500
+
+# Change feed: the columns sent for each changed question / message
+CHANGE_FEED_QUERIES = {
+    'User_Questions': '''
+        SELECT question_id, user_name, question_text, answer_text, is_answered,
+               submitted_at, claimed_by_user_id, claim_expires_at
+        FROM User_Questions WHERE question_id IN ({})
+        ORDER BY question_id
+    ''',
+    'Contact_Messages': '''
+        SELECT message_id, name, email, subject, message_text, sent_at, is_read
+        FROM Contact_Messages WHERE message_id IN ({})
+        ORDER BY message_id
+    ''',
+}
+
+
+class SharedConnection:
+    """
+    A view of the connection shared by a Database.snapshot() block. Code
+    that opens, closes or commits "its" connection leaves the shared one
+    alone, and row_factory is kept per view rather than on the connection.
+    """
+    
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+        self.row_factory = sqlite3.Row
+    
+    def cursor(self):
+        cursor = self._conn.cursor()
+        cursor.row_factory = self.row_factory
+        return cursor
+    
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+    
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+    
+    def commit(self):
+        pass
+    
+    def rollback(self):
+        pass
+    
+    def close(self):
+        pass
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
 
 
 class Database:
     """Main database class for Power Physique Zone"""
     
-    def __init__(self, db_path: Path = DB_PATH):
-        """Initialize database connection"""
+    def __init__(self, db_path: Path = DB_PATH, partitioning: Optional[str] = None):
+        """
+        Initialize database connection.
+        
+        partitioning ("file" or "monthly") moves new questions and contact
+        messages to separate SQLite files; see partitions.py.
+        """
         self.db_path = db_path
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Extra files for User_Questions and Contact_Messages, if enabled
+        self.partitions: Optional[PartitionStore] = None
+        if partitioning:
+            self.partitions = PartitionStore(db_path, partitioning, self._connect_path)
+        
+        # Workout catalog cache, keyed by (category, difficulty) filter
+        self._workout_cache = LRUCache(WORKOUT_CACHE_SIZE)
+        self._workout_cache_generation = 0
+        self._workout_cache_lock = threading.Lock()
+        
+        # Product and location catalog as compact records, loaded on first
+        # use, plus the JSON of each listing served from it
+        self._catalog: Dict[str, List[Record]] = {}
+        self._catalog_json: Dict[Tuple[str, Optional[str]], bytes] = {}
+        self._catalog_generation = 0
+        self._catalog_lock = threading.Lock()
+        
+        # get_user profiles as records, bounded and expiring
+        self._profiles = LRUCache(PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_TTL)
+        self._profile_generation = 0
+        self._profile_lock = threading.Lock()
+        
+        # Writes by other processes reach the caches above through
+        # Table_Versions, polled at most once a second
+        self.versions = VersionWatcher(self._read_table_versions)
+        self.versions.on_change('Users', self._invalidate_profiles)
+        self.versions.on_change('Products', self._invalidate_catalog_cache)
+        self.versions.on_change('Gym_Locations', self._invalidate_catalog_cache)
+        self.versions.on_change('Workouts', self._invalidate_workout_cache)
+        self.versions.on_change('Exercises', self._invalidate_workout_cache)
+        
+        # Per-location equipment maintenance queues, loaded on first use
+        self.maintenance = MaintenanceScheduler()
+        
+        # Opt-in batched writer for questions and contact messages
+        self.write_queue: Optional[WriteBehindQueue] = None
+        self._write_behind_settings: Dict = {}
+        self._partition_queues: Dict[Path, WriteBehindQueue] = {}
+        self._partition_queue_lock = threading.Lock()
+        
+        # Per-statement timings, slow-query log and full-scan report
+        self.tracer = QueryTracer("sqlite")
+        
+        # Change feed: Change_Log is trimmed at most once per interval
+        self._next_change_prune = 0.0
+        
+        # Connection to the main file shared inside snapshot() blocks
+        self._shared = contextvars.ContextVar(f"ppz_shared_connection_{id(self)}", default=None)
+        
         self.init_db()
     
     def get_connection(self):
-        """Get database connection"""
-        conn = sqlite3.connect(str(self.db_path))
+        """Get database connection (cursors report timings to metrics)"""
+        return self._connect_path(self.db_path)
+    
+    def _connect_path(self, path: Path):
+        """Connection to the main database or one of its partition files"""
+        shared = self._shared.get()
+        if shared is not None and path == self.db_path:
+            return SharedConnection(shared)
+        conn = sqlite3.connect(str(path), factory=InstrumentedConnection)
         conn.row_factory = sqlite3.Row
+        conn.tracer = self.tracer
         return conn
     
+    @contextmanager
+    def snapshot(self):
+        """
+        Run reads against one connection and one read transaction: inside
+        the block every connection to the main database file is that one,
+        so all reads see the same state. Yields the connection, which other
+        threads can use through joined_snapshot(). Partition files are not
+        included. For reads only; commits inside the block do nothing.
+        """
+        shared = self._shared.get()
+        if shared is not None:
+            yield shared
+            return
+        conn = sqlite3.connect(str(self.db_path), factory=InstrumentedConnection,
+                               check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.tracer = self.tracer
+        token = None
+        try:
+            conn.execute("BEGIN")
+            # The snapshot is taken at the first read
+            conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+            token = self._shared.set(conn)
+            yield conn
+        finally:
+            if token is not None:
+                self._shared.reset(token)
+            conn.rollback()
+            conn.close()
+    
+    def _in_snapshot(self) -> bool:
+        """
+        Inside snapshot(). The process-wide caches and table versions are
+        then bypassed: they may be older or newer than the snapshot, and
+        what it reads must not be put back into them.
+        """
+        return self._shared.get() is not None
+    
+    @contextmanager
+    def joined_snapshot(self, conn: sqlite3.Connection):
+        """Share a connection yielded by snapshot() in the current thread"""
+        token = self._shared.set(conn)
+        try:
+            yield
+        finally:
+            self._shared.reset(token)
+    
+    def _shards(self, table: str) -> List[Path]:
+        """Files holding rows of a table: the main database, then partitions"""
+        if self.partitions is None:
+            return [self.db_path]
+        return [partition.path for partition in self.partitions.partitions(table)]
+    
+    def _insert_path(self, table: str) -> Path:
+        """File new rows of a table are written to"""
+        if self.partitions is None:
+            return self.db_path
+        return self.partitions.current(table).path
+    
+    def _row_path(self, table: str, row_id: int) -> Path:
+        """File holding the row with this ID"""
+        if self.partitions is None:
+            return self.db_path
+        return self.partitions.locate(table, row_id).path
+    
+    def _select_merged(self, table: str, sql: str, sort_column: int, descending: bool,
+                       as_json: bool = False, params: Tuple = (),
+                       limit: Optional[int] = None) -> Union[List[Dict], bytes]:
+        """
+        _select over every shard of a partitioned table. Each shard's rows
+        come back ordered by `sort_column`; they are merged in that order.
+        With `limit`, the query must apply the same LIMIT to each shard.
+        """
+        shards = self._shards(table)
+        if len(shards) == 1:
+            return self._select(sql, params, as_json=as_json)
+        
+        columns, results = None, []
+        for path in shards:
+            conn = self._connect_path(path)
+            try:
+                conn.row_factory = None
+                cursor = conn.execute(sql, params)
+                columns = [column[0] for column in cursor.description]
+                results.append(cursor.fetchall())
+            finally:
+                conn.close()
+        rows = list(heapq.merge(*results, key=itemgetter(sort_column), reverse=descending))
+        if limit is not None:
+            rows = rows[:limit]
+        if as_json:
+            return encode_tuples(columns, rows)
+        return [dict(zip(columns, row)) for row in rows]
+    
+    def _select(self, sql: str, params: Tuple = (), 
+                as_json: bool = False) -> Union[List[Dict], bytes]:
+        """Run a query and return its rows as dicts, or as JSON bytes if as_json"""
+        with self.get_connection() as conn:
+            if as_json:
+                # Plain tuples; encode_rows takes column names from the cursor
+                conn.row_factory = None
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            if as_json:
+                return encode_rows(cursor)
+            return [dict(row) for row in cursor.fetchall()]
+    
     def init_db(self):
         """Initialize database schema"""
         schema_path = Path(__file__).parent.parent / "database" / "schema.sql"
@@ -41,11 +312,24 @@ class Database:
         
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            self._migrate_schema(cursor)
             with open(schema_path, 'r') as f:
                 sql_script = f.read()
                 cursor.executescript(sql_script)
             conn.commit()
     
+    def _migrate_schema(self, cursor):
+        """Add columns missing from tables created by an older schema"""
+        for table, columns in SCHEMA_MIGRATIONS.items():
+            cursor.execute(f"PRAGMA table_info({table})")
+            existing = {row[1] for row in cursor.fetchall()}
+            if not existing:
+                # Table does not exist yet; the schema script creates it
+                continue
+            for column, definition in columns.items():
+                if column not in existing:
+                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    
     def _create_default_schema(self):
         """Create default schema if SQL file not found"""
         with self.get_connection() as conn:
@@ -77,7 +361,9 @@ class Database:
                     submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     answer_text TEXT,
                     answered_by_user_id INTEGER,
-                    is_answered BOOLEAN DEFAULT 0
+                    is_answered BOOLEAN DEFAULT 0,
+                    claimed_by_user_id INTEGER,
+                    claim_expires_at TIMESTAMP
                 )
             ''')
             
@@ -94,8 +380,66 @@ class Database:
                 )
             ''')
             
+            # Cache invalidation counters (see schema.sql)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS Table_Versions (
+                    table_name VARCHAR(50) PRIMARY KEY,
+                    version INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            
             conn.commit()
     
+    def enable_write_behind(self, max_batch: int = 200, flush_interval: float = 0.05,
+                            durability: str = DURABILITY_ASYNC) -> WriteBehindQueue:
+        """
+        Route add_question and add_contact_message through a write-behind
+        queue that inserts rows in group commits from a background thread.
+        
+        With durability "async" a call returns as soon as the row is queued;
+        with "commit" it returns once the batch holding the row is committed.
+        """
+        if self.write_queue is None:
+            self._write_behind_settings = {
+                "max_batch": max_batch,
+                "flush_interval": flush_interval,
+                "durability": durability
+            }
+            self.write_queue = WriteBehindQueue(self.get_connection, **self._write_behind_settings)
+        return self.write_queue
+    
+    def _partition_write_queue(self, table: str) -> WriteBehindQueue:
+        """Write-behind queue for the partition file a table's rows go to"""
+        path = self._insert_path(table)
+        with self._partition_queue_lock:
+            write_queue = self._partition_queues.get(path)
+            if write_queue is None:
+                # Queues of past months stay open (idle) so a row racing the
+                # rollover is never handed a closed queue
+                write_queue = WriteBehindQueue(lambda: self._connect_path(path),
+                                               **self._write_behind_settings)
+                self._partition_queues[path] = write_queue
+            return write_queue
+    
+    def _submit_write_behind(self, table: str, id_column: str, 
+                             columns: Tuple[str, ...], values: Tuple) -> Optional[int]:
+        """Queue an INSERT; returns None when the caller should write directly"""
+        if self.write_queue is None:
+            return None
+        write_queue = self.write_queue
+        if self.partitions is not None and self.partitions.handles(table):
+            write_queue = self._partition_write_queue(table)
+        try:
+            return write_queue.submit(table, id_column, columns, values)
+        except queue.Full:
+            # Queue saturated: fall back to a synchronous insert
+            return None
+    
+    @staticmethod
+    def _utc_timestamp() -> str:
+        """Current time in the format SQLite uses for CURRENT_TIMESTAMP"""
+        return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    
     # ========== USER OPERATIONS ==========
     
     @staticmethod
@@ -141,7 +485,15 @@ class Database:
             return dict(user) if user else None
     
     def get_user(self, user_id: int) -> Optional[Dict]:
-        """Get user by ID"""
+        """Get user by ID (from the profile cache when possible)"""
+        cached = not self._in_snapshot()
+        if cached:
+            self.versions.check()
+            profile = self._profiles.get(user_id)
+            if profile is not None:
+                return profile.to_dict()
+        
+        generation = self._profile_generation
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
@@ -150,7 +502,15 @@ class Database:
             ''', (user_id,))
             
             user = cursor.fetchone()
-            return dict(user) if user else None
+            if not user:
+                return None
+        
+        profile = UserSummary.from_row(user)
+        with self._profile_lock:
+            # Not cached if the user was changed while we were reading
+            if cached and generation == self._profile_generation:
+                self._profiles.put(user_id, profile)
+        return profile.to_dict()
     
     def update_user(self, user_id: int, **kwargs) -> Dict:
         """Update user information"""
@@ -167,14 +527,209 @@ class Database:
             cursor = conn.cursor()
             cursor.execute(f'UPDATE Users SET {set_clause} WHERE user_id = ?', values)
             conn.commit()
-            return {"success": True, "message": "User updated successfully"}
+        
+        self._invalidate_profiles(user_id)
+        return {"success": True, "message": "User updated successfully"}
+    
+    def bulk_update_users(self, changes: List[Tuple[int, Dict]]) -> Dict:
+        """
+        Apply many (user_id, fields) changes in one transaction.
+        
+        Changes touching the same set of columns share one executemany.
+        Every change gets a result in input order; one that is invalid, names
+        a missing user or breaks a constraint (a taken email) is reported and
+        the others still go through.
+        """
+        results: List[Optional[Dict]] = [None] * len(changes)
+        groups: Dict[Tuple[str, ...], List[int]] = {}
+        seen = set()
+        for index, (user_id, fields) in enumerate(changes):
+            error = self._check_user_change(user_id, fields, seen)
+            if error:
+                results[index] = {"user_id": user_id, "success": False, "message": error}
+                continue
+            seen.add(user_id)
+            groups.setdefault(tuple(sorted(fields)), []).append(index)
+        
+        updated = []
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                
+                existing = set()
+                user_ids = list(seen)
+                for start in range(0, len(user_ids), SQL_PARAM_CHUNK):
+                    chunk = user_ids[start:start + SQL_PARAM_CHUNK]
+                    placeholders = ", ".join("?" * len(chunk))
+                    cursor.execute(f'SELECT user_id FROM Users WHERE user_id IN ({placeholders})',
+                                   chunk)
+                    existing.update(row[0] for row in cursor.fetchall())
+                
+                for columns, indexes in groups.items():
+                    rows = []
+                    for index in indexes:
+                        user_id, fields = changes[index]
+                        if user_id in existing:
+                            rows.append((index, [fields[c] for c in columns] + [user_id]))
+                        else:
+                            results[index] = {"user_id": user_id, "success": False,
+                                              "message": "User not found"}
+                    if not rows:
+                        continue
+                    
+                    # Column names come from BULK_USER_FIELDS only
+                    set_clause = ", ".join(f"{c} = ?" for c in columns)
+                    sql = f'UPDATE Users SET {set_clause} WHERE user_id = ?'
+                    failed = {}
+                    cursor.execute("SAVEPOINT user_group")
+                    try:
+                        cursor.executemany(sql, [params for _, params in rows])
+                    except sqlite3.IntegrityError:
+                        # Redo the group row by row to find the offending changes
+                        cursor.execute("ROLLBACK TO user_group")
+                        for index, params in rows:
+                            try:
+                                cursor.execute(sql, params)
+                            except sqlite3.IntegrityError as e:
+                                failed[index] = str(e)
+                    cursor.execute("RELEASE user_group")
+                    
+                    for index, _ in rows:
+                        user_id = changes[index][0]
+                        if index in failed:
+                            results[index] = {"user_id": user_id, "success": False,
+                                              "message": f"Error: {failed[index]}"}
+                        else:
+                            results[index] = {"user_id": user_id, "success": True,
+                                              "message": "User updated"}
+                            updated.append(user_id)
+                
+                conn.commit()
+        except Exception as e:
+            return {"success": False, "message": f"Error: {str(e)}"}
+        
+        if len(updated) > 1:
+            self._invalidate_profiles()
+        elif updated:
+            self._invalidate_profiles(updated[0])
+        return {
+            "success": True,
+            "message": f"Updated {len(updated)} of {len(changes)} users",
+            "updated": len(updated),
+            "results": results
+        }
+    
+    @staticmethod
+    def _check_user_change(user_id, fields, seen) -> Optional[str]:
+        """Why a bulk_update_users change is rejected, or None if it is valid"""
+        if not isinstance(user_id, int) or isinstance(user_id, bool):
+            return "user_id must be an integer"
+        if user_id in seen:
+            return "Duplicate user_id in batch"
+        if not isinstance(fields, dict) or not fields:
+            return "No fields to update"
+        unknown = [name for name in fields if name not in BULK_USER_FIELDS]
+        if unknown:
+            return f"Fields not allowed: {', '.join(map(str, unknown))}"
+        if 'role' in fields and fields['role'] not in USER_ROLES:
+            return f"role must be one of {', '.join(USER_ROLES)}"
+        if 'is_active' in fields and fields['is_active'] not in (True, False):
+            return "is_active must be true or false"
+        if 'email' in fields and not (isinstance(fields['email'], str) and fields['email'].strip()):
+            return "email must be a non-empty string"
+        for name in ('full_name', 'phone_number', 'address'):
+            if name in fields and not isinstance(fields[name], (str, type(None))):
+                return f"{name} must be a string"
+        return None
+    
+    def _invalidate_profiles(self, user_id: Optional[int] = None):
+        """Drop one cached profile, or all of them"""
+        with self._profile_lock:
+            self._profile_generation += 1
+            if user_id is None:
+                self._profiles.clear()
+            else:
+                self._profiles.pop(user_id)
+    
+    def _read_table_versions(self) -> Dict[str, int]:
+        """
+        Current Table_Versions counters, plus the latest change of each
+        Change_Log as "Change_Log.<file>" (questions and contact messages)
+        """
+        conn = self.get_connection()
+        try:
+            versions = dict(conn.execute('SELECT table_name, version FROM Table_Versions').fetchall())
+        finally:
+            conn.close()
+        for source, position in self._change_positions().items():
+            versions[f"Change_Log.{source}"] = position
+        return versions
+    
+    def table_versions(self) -> Dict[str, int]:
+        """
+        Versions as of the last poll (at most VERSION_POLL_SECONDS old, so
+        a write by another process can take that long to show); inside
+        snapshot(), the snapshot's own
+        """
+        if self._in_snapshot():
+            return self._read_table_versions()
+        self.versions.check()
+        return self.versions.versions()
+    
+    # ========== TOKEN REVOCATION ==========
+    
+    def add_revocation(self, token_id: Optional[str], user_id: int,
+                       revoked_at: int, expires_at: int):
+        """Record a revoked token (token_id None revokes all of the user's tokens)"""
+        with self.get_connection() as conn:
+            conn.execute('''
+                INSERT INTO Revoked_Tokens (token_id, user_id, revoked_at, expires_at)
+                VALUES (?, ?, ?, ?)
+            ''', (token_id, user_id, revoked_at, expires_at))
+            conn.commit()
+    
+    def add_revocations(self, revocations: List[Tuple[Optional[str], int, int, int]]):
+        """Record many (token_id, user_id, revoked_at, expires_at) revocations at once"""
+        with self.get_connection() as conn:
+            conn.executemany('''
+                INSERT INTO Revoked_Tokens (token_id, user_id, revoked_at, expires_at)
+                VALUES (?, ?, ?, ?)
+            ''', revocations)
+            conn.commit()
+    
+    def get_revocations(self, after_id: int = 0) -> List[Dict]:
+        """Revocations recorded after after_id (a rowid range scan)"""
+        return self._select('''
+            SELECT revocation_id, token_id, user_id, revoked_at, expires_at
+            FROM Revoked_Tokens WHERE revocation_id > ? ORDER BY revocation_id
+        ''', (after_id,))
+    
+    def purge_revocations(self, now: int):
+        """Delete revocations whose tokens have expired"""
+        with self.get_connection() as conn:
+            conn.execute('DELETE FROM Revoked_Tokens WHERE expires_at <= ?', (now,))
+            conn.commit()
     
     # ========== QUESTION OPERATIONS ==========
     
     def add_question(self, user_name: str, question_text: str, user_id: Optional[int] = None) -> Dict:
         """Add a new user question"""
         try:
-            with self.get_connection() as conn:
+            # Timestamp taken now so queued rows keep their submission time
+            question_id = self._submit_write_behind(
+                'User_Questions', 'question_id',
+                ('user_id', 'user_name', 'question_text', 'submitted_at'),
+                (user_id, user_name, question_text, self._utc_timestamp())
+            )
+            if question_id is not None:
+                return {
+                    "success": True,
+                    "question_id": question_id,
+                    "message": "Question submitted successfully"
+                }
+            
+            with self._connect_path(self._insert_path('User_Questions')) as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO User_Questions (user_id, user_name, question_text)
@@ -190,44 +745,160 @@ class Database:
         except Exception as e:
             return {"success": False, "message": f"Error: {str(e)}"}
     
-    def get_all_questions(self) -> List[Dict]:
-        """Get all questions"""
-        with self.get_connection() as conn:
+    def get_all_questions(self, as_json: bool = False) -> Union[List[Dict], bytes]:
+        """Get all questions (as JSON bytes if as_json)"""
+        return self._select_merged('User_Questions', '''
+            SELECT question_id, user_name, question_text, answer_text, 
+                   is_answered, submitted_at FROM User_Questions
+            ORDER BY submitted_at DESC
+        ''', 5, True, as_json=as_json)
+    
+    def get_question(self, question_id: int) -> Optional[Dict]:
+        """One question with its answer, looked up by ID"""
+        with self._connect_path(self._row_path('User_Questions', question_id)) as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT question_id, user_name, question_text, answer_text, 
                        is_answered, submitted_at FROM User_Questions
-                ORDER BY submitted_at DESC
-            ''')
-            
-            questions = cursor.fetchall()
-            return [dict(q) for q in questions]
+                WHERE question_id = ?
+            ''', (question_id,))
+            question = cursor.fetchone()
+            return dict(question) if question else None
     
-    def get_unanswered_questions(self) -> List[Dict]:
-        """Get unanswered questions"""
-        with self.get_connection() as conn:
+    def get_unanswered_questions(self, as_json: bool = False) -> Union[List[Dict], bytes]:
+        """Get unanswered questions (as JSON bytes if as_json)"""
+        return self._select_merged('User_Questions', '''
+            SELECT question_id, user_name, question_text, submitted_at 
+            FROM User_Questions WHERE is_answered = 0
+            ORDER BY submitted_at ASC
+        ''', 3, False, as_json=as_json)
+    
+    def claim_questions(self, admin_id: int, limit: int = 10, 
+                        lease_seconds: int = 300) -> List[Dict]:
+        """
+        Lease up to `limit` unanswered questions to an admin.
+        
+        Questions the admin already holds are returned first and their lease
+        is renewed; the rest are the oldest unanswered questions that nobody
+        holds or whose lease has expired. Other admins will not be handed a
+        leased question until it is answered, released or the lease expires.
+        
+        With partitioning, each file is claimed from in its own transaction,
+        oldest file first, until `limit` questions are held.
+        """
+        questions = []
+        for path in self._shards('User_Questions'):
+            if len(questions) >= limit:
+                break
+            questions += self._claim_questions_in(path, admin_id, limit - len(questions),
+                                                  lease_seconds)
+        return questions
+    
+    def _claim_questions_in(self, path: Path, admin_id: int, limit: int,
+                            lease_seconds: int) -> List[Dict]:
+        """claim_questions against one file"""
+        with self._connect_path(path) as conn:
             cursor = conn.cursor()
+            # Take the write lock up front so two admins cannot select the same rows
+            cursor.execute("BEGIN IMMEDIATE")
+            
             cursor.execute('''
-                SELECT question_id, user_name, question_text, submitted_at 
-                FROM User_Questions WHERE is_answered = 0
+                SELECT question_id FROM User_Questions
+                WHERE is_answered = 0 AND claimed_by_user_id = ?
+                  AND claim_expires_at > datetime('now')
+                ORDER BY submitted_at ASC LIMIT ?
+            ''', (admin_id, limit))
+            question_ids = [row[0] for row in cursor.fetchall()]
+            
+            if len(question_ids) < limit:
+                # Served by the partial index on unanswered questions
+                cursor.execute('''
+                    SELECT question_id FROM User_Questions
+                    WHERE is_answered = 0
+                      AND (claim_expires_at IS NULL OR claim_expires_at <= datetime('now'))
+                    ORDER BY submitted_at ASC LIMIT ?
+                ''', (limit - len(question_ids),))
+                question_ids += [row[0] for row in cursor.fetchall()]
+            
+            if not question_ids:
+                conn.commit()
+                return []
+            
+            placeholders = ", ".join("?" * len(question_ids))
+            cursor.execute(f'''
+                UPDATE User_Questions 
+                SET claimed_by_user_id = ?, claim_expires_at = datetime('now', ?)
+                WHERE question_id IN ({placeholders})
+            ''', [admin_id, f"+{int(lease_seconds)} seconds"] + question_ids)
+            
+            cursor.execute(f'''
+                SELECT question_id, user_name, question_text, submitted_at, 
+                       claim_expires_at FROM User_Questions
+                WHERE question_id IN ({placeholders})
                 ORDER BY submitted_at ASC
-            ''')
+            ''', question_ids)
+            questions = [dict(q) for q in cursor.fetchall()]
+            
+            conn.commit()
+            return questions
+    
+    def release_questions(self, admin_id: int, 
+                          question_ids: Optional[List[int]] = None) -> Dict:
+        """Give back leased questions (all of the admin's leases by default)"""
+        try:
+            query = '''
+                UPDATE User_Questions 
+                SET claimed_by_user_id = NULL, claim_expires_at = NULL
+                WHERE claimed_by_user_id = ? AND is_answered = 0
+            '''
+            params = [admin_id]
+            if question_ids:
+                query += f" AND question_id IN ({', '.join('?' * len(question_ids))})"
+                params += list(question_ids)
             
-            questions = cursor.fetchall()
-            return [dict(q) for q in questions]
+            # Every shard is updated; IDs held elsewhere simply match nothing
+            released = 0
+            for path in self._shards('User_Questions'):
+                with self._connect_path(path) as conn:
+                    cursor = conn.cursor()
+                    cursor.execute(query, params)
+                    conn.commit()
+                    released += cursor.rowcount
+            
+            return {
+                "success": True,
+                "released": released,
+                "message": "Questions released successfully"
+            }
+        except Exception as e:
+            return {"success": False, "message": f"Error: {str(e)}"}
     
     def answer_question(self, question_id: int, answer_text: str, admin_id: int) -> Dict:
-        """Answer a question"""
+        """Answer a question, unless it is answered or leased to another admin"""
         try:
-            with self.get_connection() as conn:
+            with self._connect_path(self._row_path('User_Questions', question_id)) as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     UPDATE User_Questions 
-                    SET answer_text = ?, is_answered = 1, answered_by_user_id = ?
-                    WHERE question_id = ?
-                ''', (answer_text, admin_id, question_id))
+                    SET answer_text = ?, is_answered = 1, answered_by_user_id = ?,
+                        claimed_by_user_id = NULL, claim_expires_at = NULL
+                    WHERE question_id = ? AND is_answered = 0
+                      AND (claimed_by_user_id IS NULL OR claimed_by_user_id = ?
+                           OR claim_expires_at <= datetime('now'))
+                ''', (answer_text, admin_id, question_id, admin_id))
                 
                 conn.commit()
+                if cursor.rowcount == 0:
+                    cursor.execute('SELECT 1 FROM User_Questions WHERE question_id = ?',
+                                   (question_id,))
+                    if cursor.fetchone() is None:
+                        return {"success": False, "not_found": True,
+                                "message": "Question not found"}
+                    return {
+                        "success": False,
+                        "conflict": True,
+                        "message": "Question already answered or claimed by another admin"
+                    }
                 return {"success": True, "message": "Answer added successfully"}
         except Exception as e:
             return {"success": False, "message": f"Error: {str(e)}"}
@@ -238,7 +909,19 @@ class Database:
                            message: str) -> Dict:
         """Add a contact message"""
         try:
-            with self.get_connection() as conn:
+            message_id = self._submit_write_behind(
+                'Contact_Messages', 'message_id',
+                ('name', 'email', 'subject', 'message_text', 'sent_at'),
+                (name, email, subject, message, self._utc_timestamp())
+            )
+            if message_id is not None:
+                return {
+                    "success": True,
+                    "message_id": message_id,
+                    "message": "Message sent successfully"
+                }
+            
+            with self._connect_path(self._insert_path('Contact_Messages')) as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO Contact_Messages (name, email, subject, message_text)
@@ -254,23 +937,18 @@ class Database:
         except Exception as e:
             return {"success": False, "message": f"Error: {str(e)}"}
     
-    def get_all_messages(self) -> List[Dict]:
-        """Get all contact messages"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT message_id, name, email, subject, message_text, 
-                       sent_at, is_read FROM Contact_Messages
-                ORDER BY sent_at DESC
-            ''')
-            
-            messages = cursor.fetchall()
-            return [dict(m) for m in messages]
+    def get_all_messages(self, as_json: bool = False) -> Union[List[Dict], bytes]:
+        """Get all contact messages (as JSON bytes if as_json)"""
+        return self._select_merged('Contact_Messages', '''
+            SELECT message_id, name, email, subject, message_text, 
+                   sent_at, is_read FROM Contact_Messages
+            ORDER BY sent_at DESC
+        ''', 5, True, as_json=as_json)
     
     def mark_message_as_read(self, message_id: int) -> Dict:
         """Mark message as read"""
         try:
-            with self.get_connection() as conn:
+            with self._connect_path(self._row_path('Contact_Messages', message_id)) as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     UPDATE Contact_Messages SET is_read = 1 WHERE message_id = ?
@@ -281,6 +959,66 @@ class Database:
         except Exception as e:
             return {"success": False, "message": f"Error: {str(e)}"}
     
+    def get_unread_messages(self, limit: int = 100,
+                            as_json: bool = False) -> Union[List[Dict], bytes]:
+        """Newest unread contact messages (served by idx_messages_unread)"""
+        return self._select_merged('Contact_Messages', '''
+            SELECT message_id, name, email, subject, message_text, 
+                   sent_at, is_read FROM Contact_Messages
+            WHERE is_read = 0
+            ORDER BY sent_at DESC LIMIT ?
+        ''', 5, True, as_json=as_json, params=(limit,), limit=limit)
+    
+    def mark_messages_as_read(self, message_ids: List[int] = (),
+                              ranges: List[Tuple[int, int]] = (),
+                              sent_before: Optional[str] = None) -> Dict:
+        """
+        Mark many messages as read: listed IDs, inclusive (first, last) ID
+        ranges, and/or everything sent before a timestamp. IDs are updated
+        SQL_PARAM_CHUNK at a time with one IN (...) each, all in a single
+        transaction per file. "marked" counts rows that were unread.
+        """
+        try:
+            by_path: Dict[Path, List[int]] = {}
+            for message_id in sorted(set(message_ids)):
+                by_path.setdefault(self._row_path('Contact_Messages', message_id),
+                                   []).append(message_id)
+            # Ranges and the cutoff can match rows in any file
+            paths = self._shards('Contact_Messages') if ranges or sent_before else list(by_path)
+            
+            marked = 0
+            for path in paths:
+                ids = by_path.get(path, [])
+                with self._connect_path(path) as conn:
+                    cursor = conn.cursor()
+                    cursor.execute("BEGIN IMMEDIATE")
+                    for start in range(0, len(ids), SQL_PARAM_CHUNK):
+                        chunk = ids[start:start + SQL_PARAM_CHUNK]
+                        placeholders = ", ".join("?" * len(chunk))
+                        cursor.execute(f'''
+                            UPDATE Contact_Messages SET is_read = 1
+                            WHERE message_id IN ({placeholders}) AND is_read = 0
+                        ''', chunk)
+                        marked += cursor.rowcount
+                    if ranges:
+                        cursor.executemany('''
+                            UPDATE Contact_Messages SET is_read = 1
+                            WHERE message_id BETWEEN ? AND ? AND is_read = 0
+                        ''', ranges)
+                        marked += cursor.rowcount
+                    if sent_before:
+                        cursor.execute('''
+                            UPDATE Contact_Messages SET is_read = 1
+                            WHERE is_read = 0 AND sent_at < ?
+                        ''', (sent_before,))
+                        marked += cursor.rowcount
+                    conn.commit()
+            
+            return {"success": True, "marked": marked,
+                    "message": f"{marked} messages marked as read"}
+        except Exception as e:
+            return {"success": False, "message": f"Error: {str(e)}"}
+    
     # ========== PRODUCT OPERATIONS ==========
     
     def add_product(self, name: str, category: str, price: float, 
@@ -297,6 +1035,7 @@ class Database:
                 ''', (name, category, price, description, pack_size, image_url, stock))
                 
                 conn.commit()
+                self._invalidate_catalog_cache()
                 return {
                     "success": True,
                     "product_id": cursor.lastrowid,
@@ -305,47 +1044,32 @@ class Database:
         except Exception as e:
             return {"success": False, "message": f"Error: {str(e)}"}
     
-    def get_products_by_category(self, category: str) -> List[Dict]:
-        """Get products by category"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT product_id, name, category, price, description, 
-                       pack_size, image_url, stock_quantity FROM Products
-                WHERE category = ? AND stock_quantity > 0
-                ORDER BY name ASC
-            ''', (category,))
-            
-            products = cursor.fetchall()
-            return [dict(p) for p in products]
+    def get_products_by_category(self, category: str, 
+                                 as_json: bool = False) -> Union[List[Dict], bytes]:
+        """Get in-stock products in a category by name (as JSON bytes if as_json)"""
+        return self._catalog_view("products", category, as_json)
     
-    def get_all_products(self) -> List[Dict]:
-        """Get all products"""
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT product_id, name, category, price, description, 
-                       pack_size, image_url, stock_quantity FROM Products
-                ORDER BY category, name
-            ''')
-            
-            products = cursor.fetchall()
-            return [dict(p) for p in products]
+    def get_all_products(self, as_json: bool = False) -> Union[List[Dict], bytes]:
+        """Get all products (as JSON bytes if as_json)"""
+        return self._catalog_view("products", None, as_json)
     
     # ========== GYM LOCATION OPERATIONS ==========
     
     def add_gym_location(self, city: str, area: str, address: str = "", 
-                        phone: str = "") -> Dict:
+                        phone: str = "", latitude: Optional[float] = None,
+                        longitude: Optional[float] = None) -> Dict:
         """Add a gym location"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                    INSERT INTO Gym_Locations (city, area, address, phone)
-                    VALUES (?, ?, ?, ?)
-                ''', (city, area, address, phone))
+                    INSERT INTO Gym_Locations (city, area, address, phone, 
+                                             latitude, longitude)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (city, area, address, phone, latitude, longitude))
                 
                 conn.commit()
+                self._invalidate_catalog_cache()
                 return {
                     "success": True,
                     "location_id": cursor.lastrowid,
@@ -354,29 +1078,471 @@ class Database:
         except sqlite3.IntegrityError:
             return {"success": False, "message": "Location already exists"}
     
-    def get_all_locations(self) -> List[Dict]:
-        """Get all gym locations"""
+    def get_all_locations(self, as_json: bool = False) -> Union[List[Dict], bytes]:
+        """Get all gym locations (as JSON bytes if as_json)"""
+        return self._catalog_view("locations", None, as_json)
+    
+    def get_locations_by_city(self, city: str, as_json: bool = False) -> Union[List[Dict], bytes]:
+        """Get locations in a city by area (as JSON bytes if as_json)"""
+        return self._catalog_view("locations", city, as_json)
+    
+    def get_nearby_locations(self, latitude: float, longitude: float, 
+                             k: int = 5) -> List[Dict]:
+        """Get the k gym locations nearest to a point, with distance_km"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT location_id, city, area, address, phone FROM Gym_Locations
-                ORDER BY city, area
-            ''')
             
-            locations = cursor.fetchall()
-            return [dict(l) for l in locations]
+            def fetch_box(min_lat, max_lat, min_lon, max_lon):
+                cursor.execute('''
+                    SELECT l.location_id, l.city, l.area, l.address, l.phone, 
+                           l.latitude, l.longitude
+                    FROM Gym_Locations_Geo g
+                    JOIN Gym_Locations l ON l.location_id = g.location_id
+                    WHERE g.max_lat >= ? AND g.min_lat <= ?
+                      AND g.max_lon >= ? AND g.min_lon <= ?
+                ''', (min_lat, max_lat, min_lon, max_lon))
+                return [dict(l) for l in cursor.fetchall()]
+            
+            return find_nearest(latitude, longitude, k, fetch_box)
     
-    def get_locations_by_city(self, city: str) -> List[Dict]:
-        """Get locations by city"""
+    # ========== CATALOG CACHE ==========
+    
+    def _catalog_records(self, kind: str) -> List[Record]:
+        """All products or locations as records, in listing order"""
+        cached = not self._in_snapshot()
+        with self._catalog_lock:
+            records = self._catalog.get(kind) if cached else None
+            generation = self._catalog_generation
+        if records is not None:
+            return records
+        
         with self.get_connection() as conn:
+            conn.row_factory = None
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT location_id, city, area, address, phone FROM Gym_Locations
-                WHERE city = ? ORDER BY area
-            ''', (city,))
+            if kind == "products":
+                cursor.execute('''
+                    SELECT product_id, name, category, price, description, 
+                           pack_size, image_url, stock_quantity FROM Products
+                    ORDER BY category, name
+                ''')
+                records = Product.from_rows(cursor.fetchall())
+            else:
+                cursor.execute('''
+                    SELECT location_id, city, area, address, phone, latitude, 
+                           longitude FROM Gym_Locations
+                    ORDER BY city, area
+                ''')
+                records = Location.from_rows(cursor.fetchall())
+        
+        with self._catalog_lock:
+            if cached and generation == self._catalog_generation:
+                self._catalog[kind] = records
+        return records
+    
+    def _catalog_view(self, kind: str, value: Optional[str], 
+                      as_json: bool) -> Union[List[Dict], bytes]:
+        """
+        One catalog listing, optionally filtered by category or city.
+        
+        Filtering keeps listing order, which is already by name/area within
+        a category/city. The JSON of non-empty listings is kept until the
+        next write (in any process, via Table_Versions), so a repeat request
+        does no query or encoding at all.
+        """
+        cached = not self._in_snapshot()
+        if cached:
+            self.versions.check()
+        key = (kind, value)
+        with self._catalog_lock:
+            encoded = self._catalog_json.get(key) if as_json and cached else None
+            generation = self._catalog_generation
+        if encoded is not None:
+            return encoded
+        
+        records = self._catalog_records(kind)
+        if value is not None and kind == "products":
+            records = [p for p in records if p.category == value and (p.stock_quantity or 0) > 0]
+        elif value is not None:
+            records = [l for l in records if l.city == value]
+        
+        if not as_json:
+            return [record.to_dict() for record in records]
+        
+        encoded = encode_records(records)
+        if records and cached:
+            with self._catalog_lock:
+                if generation == self._catalog_generation:
+                    self._catalog_json[key] = encoded
+        return encoded
+    
+    def _invalidate_catalog_cache(self):
+        """Drop cached products, locations and their JSON listings"""
+        with self._catalog_lock:
+            self._catalog.clear()
+            self._catalog_json.clear()
+            self._catalog_generation += 1
+    
+    # ========== WORKOUT OPERATIONS ==========
+    
+    def add_workout(self, name: str, category: str, description: str = "",
+                    difficulty_level: str = "", duration_minutes: int = 0) -> Dict:
+        """Add a new workout"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT INTO Workouts (name, category, description,
+                                        difficulty_level, duration_minutes)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (name, category, description, difficulty_level, duration_minutes))
+                
+                conn.commit()
+                self._invalidate_workout_cache()
+                return {
+                    "success": True,
+                    "workout_id": cursor.lastrowid,
+                    "message": "Workout added successfully"
+                }
+        except Exception as e:
+            return {"success": False, "message": f"Error: {str(e)}"}
+    
+    def add_exercise(self, workout_id: int, name: str, sets: Optional[int] = None,
+                     reps: Optional[int] = None, description: str = "",
+                     rest_seconds: Optional[int] = None) -> Dict:
+        """Add an exercise to a workout"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT INTO Exercises (workout_id, name, sets, reps, 
+                                         description, rest_seconds)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (workout_id, name, sets, reps, description, rest_seconds))
+                
+                conn.commit()
+                self._invalidate_workout_cache()
+                return {
+                    "success": True,
+                    "exercise_id": cursor.lastrowid,
+                    "message": "Exercise added successfully"
+                }
+        except Exception as e:
+            return {"success": False, "message": f"Error: {str(e)}"}
+    
+    def get_workouts(self, category: Optional[str] = None,
+                     difficulty: Optional[str] = None) -> List[Dict]:
+        """
+        Get workouts with their exercises embedded.
+        
+        Workouts and exercises are loaded with two queries (no per-workout
+        lookups) and the assembled result is cached per filter until a
+        workout or exercise changes (in any process, via Table_Versions).
+        """
+        use_cache = not self._in_snapshot()
+        if use_cache:
+            self.versions.check()
+        key = (category, difficulty)
+        with self._workout_cache_lock:
+            cached = self._workout_cache.get(key) if use_cache else None
+            generation = self._workout_cache_generation
+        if cached is not None:
+            return cached
+        
+        conditions = []
+        params: List = []
+        if category:
+            conditions.append("category = ?")
+            params.append(category)
+        if difficulty:
+            conditions.append("difficulty_level = ?")
+            params.append(difficulty)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT workout_id, name, category, description, 
+                       difficulty_level, duration_minutes FROM Workouts
+                {where} ORDER BY category, difficulty_level, name
+            ''', params)
+            
+            workouts = [dict(w) for w in cursor.fetchall()]
+            by_id = {}
+            for workout in workouts:
+                workout["exercises"] = []
+                by_id[workout["workout_id"]] = workout
             
-            locations = cursor.fetchall()
-            return [dict(l) for l in locations]
+            if by_id:
+                # Same filter as a subquery, so the IN list never hits the
+                # bound-parameter limit however many workouts match
+                cursor.execute(f'''
+                    SELECT exercise_id, workout_id, name, sets, reps, 
+                           description, rest_seconds FROM Exercises
+                    WHERE workout_id IN (SELECT workout_id FROM Workouts {where})
+                    ORDER BY workout_id, exercise_id
+                ''', params)
+                
+                for exercise in cursor.fetchall():
+                    by_id[exercise["workout_id"]]["exercises"].append(dict(exercise))
+        
+        with self._workout_cache_lock:
+            # Skip caching if a write invalidated the cache while we were
+            # reading, and don't let filters matching nothing take up entries
+            if use_cache and generation == self._workout_cache_generation and workouts:
+                self._workout_cache.put(key, workouts)
+        return workouts
+    
+    def _invalidate_workout_cache(self):
+        """Drop all cached workout listings"""
+        with self._workout_cache_lock:
+            self._workout_cache.clear()
+            self._workout_cache_generation += 1
+    
+    # ========== EQUIPMENT OPERATIONS ==========
+    
+    def add_equipment(self, name: str, category: str, location_id: int,
+                      purchase_date: Optional[str] = None,
+                      maintenance_date: Optional[str] = None,
+                      condition: str = "Good") -> Dict:
+        """Add a piece of gym equipment"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT INTO Gym_Equipment (name, category, location_id, 
+                                             purchase_date, maintenance_date, condition)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (name, category, location_id, purchase_date, maintenance_date, condition))
+                
+                conn.commit()
+                equipment_id = cursor.lastrowid
+            
+            self.maintenance.add_equipment(location_id, {
+                "equipment_id": equipment_id,
+                "name": name,
+                "category": category,
+                "maintenance_date": maintenance_date,
+                "condition": condition
+            })
+            return {
+                "success": True,
+                "equipment_id": equipment_id,
+                "message": "Equipment added successfully"
+            }
+        except Exception as e:
+            return {"success": False, "message": f"Error: {str(e)}"}
+    
+    def add_equipment_rating(self, equipment_id: int, rating: int,
+                             user_id: Optional[int] = None, review_text: str = "") -> Dict:
+        """Rate a piece of equipment"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT INTO Equipment_Ratings (equipment_id, user_id, rating, review_text)
+                    VALUES (?, ?, ?, ?)
+                ''', (equipment_id, user_id, rating, review_text))
+                
+                conn.commit()
+                rating_id = cursor.lastrowid
+            
+            self.maintenance.record_rating(equipment_id, rating)
+            return {
+                "success": True,
+                "rating_id": rating_id,
+                "message": "Rating added successfully"
+            }
+        except sqlite3.IntegrityError as e:
+            return {"success": False, "message": f"Invalid rating: {str(e)}"}
+        except Exception as e:
+            return {"success": False, "message": f"Error: {str(e)}"}
+    
+    def record_equipment_maintenance(self, equipment_id: int, maintenance_date: str,
+                                     condition: str = "Good") -> Dict:
+        """Set the next maintenance date and current condition of equipment"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    UPDATE Gym_Equipment SET maintenance_date = ?, condition = ?
+                    WHERE equipment_id = ?
+                ''', (maintenance_date, condition, equipment_id))
+                
+                conn.commit()
+                if cursor.rowcount == 0:
+                    return {"success": False, "message": "Equipment not found"}
+            
+            self.maintenance.record_maintenance(equipment_id, maintenance_date, condition)
+            return {"success": True, "message": "Maintenance recorded successfully"}
+        except Exception as e:
+            return {"success": False, "message": f"Error: {str(e)}"}
+    
+    def get_maintenance_queue(self, location_id: int, limit: int = 20) -> List[Dict]:
+        """
+        Get equipment at a location ordered by maintenance priority.
+        
+        The location is read from the database the first time it is
+        requested; afterwards the in-memory queue is kept current by
+        add_equipment_rating and record_equipment_maintenance.
+        """
+        if not self.maintenance.is_loaded(location_id):
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT equipment_id, name, category, maintenance_date, condition
+                    FROM Gym_Equipment WHERE location_id = ?
+                ''', (location_id,))
+                equipment = [dict(e) for e in cursor.fetchall()]
+                
+                # Only the most recent ratings per machine feed the rolling average
+                cursor.execute('''
+                    SELECT equipment_id, rating FROM (
+                        SELECT r.equipment_id, r.rating,
+                               ROW_NUMBER() OVER (
+                                   PARTITION BY r.equipment_id
+                                   ORDER BY r.rated_at DESC, r.rating_id DESC
+                               ) AS recency
+                        FROM Equipment_Ratings r
+                        JOIN Gym_Equipment e ON e.equipment_id = r.equipment_id
+                        WHERE e.location_id = ?
+                    ) WHERE recency <= ?
+                    ORDER BY equipment_id, recency DESC
+                ''', (location_id, self.maintenance.rating_window))
+                ratings = [dict(r) for r in cursor.fetchall()]
+            
+            self.maintenance.load_location(location_id, equipment, ratings)
+        
+        return self.maintenance.top(location_id, limit)
+    
+    # ========== CHANGE FEED ==========
+    
+    def _change_sources(self) -> List[Tuple[str, Path]]:
+        """(cursor name, path) of every file with a Change_Log"""
+        sources = [("main", self.db_path)]
+        if self.partitions is not None:
+            for table in CHANGE_FEED_QUERIES:
+                for partition in self.partitions.partitions(table)[1:]:
+                    sources.append((f"{table}.{partition.key}", partition.path))
+        return sources
+    
+    def change_cursor(self) -> str:
+        """Cursor positioned after the latest change (nothing before it is sent)"""
+        return format_cursor(self._change_positions())
+    
+    def _change_positions(self) -> Dict[str, int]:
+        """Latest change_id in each file's Change_Log"""
+        positions = {}
+        for source, path in self._change_sources():
+            conn = self._connect_path(path)
+            try:
+                positions[source] = conn.execute(
+                    'SELECT COALESCE(MAX(change_id), 0) FROM Change_Log').fetchone()[0]
+            except sqlite3.OperationalError as e:
+                # A partition file created before the change log existed
+                if "no such table" not in str(e):
+                    raise
+                positions[source] = 0
+            finally:
+                conn.close()
+        return positions
+    
+    def get_changes(self, since: Optional[str] = None,
+                    limit: int = CHANGE_FEED_LIMIT) -> Dict:
+        """
+        Questions and contact messages inserted or updated after a cursor,
+        as they are now, plus the cursor to pass next time.
+        
+        Without `since`, nothing is returned but the current cursor. "more"
+        means `limit` was reached; "reset" means changes were pruned since
+        the cursor and the client should reload the full lists.
+        Raises ValueError for a malformed cursor.
+        """
+        if since is None:
+            return {"cursor": self.change_cursor(), "questions": [], "messages": [],
+                    "more": False, "reset": False}
+        positions = parse_cursor(since)
+        self._prune_change_log()
+        
+        changed = {table: [] for table in CHANGE_FEED_QUERIES}
+        more = reset = False
+        remaining = limit
+        for source, path in self._change_sources():
+            position = positions.get(source, 0)
+            conn = self._connect_path(path)
+            try:
+                cursor = conn.cursor()
+                # Everything up to the floor has been pruned
+                cursor.execute('''
+                    SELECT COALESCE((SELECT MIN(change_id) - 1 FROM Change_Log),
+                                    (SELECT seq FROM sqlite_sequence WHERE name = 'Change_Log'),
+                                    0)
+                ''')
+                floor = cursor.fetchone()[0]
+                if position < floor:
+                    reset = True
+                    position = floor
+                
+                entries = []
+                if remaining > 0:
+                    cursor.execute('''
+                        SELECT change_id, table_name, row_id FROM Change_Log
+                        WHERE change_id > ? ORDER BY change_id LIMIT ?
+                    ''', (position, remaining))
+                    entries = cursor.fetchall()
+                    remaining -= len(entries)
+                    if remaining == 0:
+                        more = True
+                if entries:
+                    position = entries[-1][0]
+                
+                row_ids: Dict[str, set] = {}
+                for _, table, row_id in entries:
+                    row_ids.setdefault(table, set()).add(row_id)
+                for table, ids in row_ids.items():
+                    ids = sorted(ids)
+                    for start in range(0, len(ids), SQL_PARAM_CHUNK):
+                        chunk = ids[start:start + SQL_PARAM_CHUNK]
+                        sql = CHANGE_FEED_QUERIES[table].format(", ".join("?" * len(chunk)))
+                        cursor.execute(sql, chunk)
+                        changed[table] += [dict(row) for row in cursor.fetchall()]
+            except sqlite3.OperationalError as e:
+                # A partition file created before the change log existed
+                if "no such table" not in str(e):
+                    raise
+            finally:
+                conn.close()
+            positions[source] = position
+        
+        return {
+            "cursor": format_cursor(positions),
+            "questions": changed['User_Questions'],
+            "messages": changed['Contact_Messages'],
+            "more": more,
+            "reset": reset
+        }
+    
+    def _prune_change_log(self):
+        """Keep the newest CHANGE_LOG_KEEP entries of each Change_Log"""
+        now = time.monotonic()
+        # Not inside snapshot(): the delete would hold the write lock on the
+        # shared read connection and then be rolled back with it
+        if now < self._next_change_prune or self._shared.get() is not None:
+            return
+        self._next_change_prune = now + CHANGE_LOG_PRUNE_SECONDS
+        for _, path in self._change_sources():
+            conn = self._connect_path(path)
+            try:
+                # A rowid range delete; no scan of the kept entries
+                conn.execute('''
+                    DELETE FROM Change_Log
+                    WHERE change_id <= (SELECT MAX(change_id) FROM Change_Log) - ?
+                ''', (CHANGE_LOG_KEEP,))
+                conn.commit()
+            except sqlite3.OperationalError as e:
+                # Busy, or no change log in this file; try again next time
+                logger.warning(f"Change log not pruned in {path.name}: {e}")
+            finally:
+                conn.close()
     
     # ========== STATISTICS ==========
     
@@ -390,16 +1556,13 @@ class Database:
             user_count = cursor.fetchone()['count']
             
             # Get total questions
-            cursor.execute('SELECT COUNT(*) as count FROM User_Questions')
-            question_count = cursor.fetchone()['count']
+            question_count = self._count('User_Questions')
             
             # Get unanswered questions
-            cursor.execute('SELECT COUNT(*) as count FROM User_Questions WHERE is_answered = 0')
-            unanswered = cursor.fetchone()['count']
+            unanswered = self._count('User_Questions', 'is_answered = 0')
             
             # Get contact messages
-            cursor.execute('SELECT COUNT(*) as count FROM Contact_Messages')
-            message_count = cursor.fetchone()['count']
+            message_count = self._count('Contact_Messages')
             
             # Get product count
             cursor.execute('SELECT COUNT(*) as count FROM Products')
@@ -413,6 +1576,30 @@ class Database:
                 "total_products": product_count
             }
     
+    def _count(self, table: str, where: str = "") -> int:
+        """Row count of a table across its shards"""
+        sql = f"SELECT COUNT(*) FROM {table}" + (f" WHERE {where}" if where else "")
+        total = 0
+        for path in self._shards(table):
+            conn = self._connect_path(path)
+            try:
+                total += conn.execute(sql).fetchone()[0]
+            finally:
+                conn.close()
+        return total
+    
+    def archive_partitions(self, before: str, dest_dir: Path) -> Dict:
+        """Move monthly question/message partitions older than `before` (YYYY-MM)"""
+        try:
+            if self.partitions is None:
+                return {"success": False, "message": "Partitioning is not enabled"}
+            moved = []
+            for table in ('User_Questions', 'Contact_Messages'):
+                moved += [str(path) for path in self.partitions.archive(table, before, dest_dir)]
+            return {"success": True, "archived": moved, "message": f"{len(moved)} partitions archived"}
+        except Exception as e:
+            return {"success": False, "message": f"Archive failed: {str(e)}"}
+    
     # ========== EXPORT OPERATIONS ==========
     
     def export_to_json(self, output_file: str = "backup.json") -> Dict:
@@ -435,8 +1622,9 @@ class Database:
             return {"success": False, "message": f"Export failed: {str(e)}"}
 
 
-# Initialize database instance
-db = Database()
+# Initialize database instance (PPZ_PARTITIONING=file|monthly splits out
+# questions and contact messages)
+db = Database(partitioning=os.environ.get("PPZ_PARTITIONING") or None)
 
 
 if __name__ == "__main__":
@@ -8,12 +8,21 @@ from mysql.connector import Error
 import sqlite3
 import json
 import hashlib
+import os
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+
+from geo import find_nearest
+from metrics import InstrumentedConnection
+from procedures import Procedures
+from query_log import QueryTracer, TracedMySQLConnection
+from replicas import ReplicaRouter
+from statements import STATEMENTS, ConnectionPool, Executor
 
 # Database paths
-DB_PATH = Path(__file__).parent.parent / "database" / "power_physique.db"
+DB_PATH = Path(os.environ.get(
+    "PPZ_DB_PATH", Path(__file__).parent.parent / "database" / "power_physique.db"))
 XAMPP_CONFIG = {
     'host': 'localhost',
     'user': 'root',
@@ -22,22 +31,75 @@ XAMPP_CONFIG = {
     'port': 3306
 }
 
+# Columns added since tables were first created, as {table: {column:
+# (SQLite type, MySQL type)}}. CREATE TABLE IF NOT EXISTS leaves existing
+# tables alone, so these are added on startup when missing.
+SCHEMA_MIGRATIONS = {
+    'Gym_Locations': {'latitude': ('REAL', 'DECIMAL(9, 6)'),
+                      'longitude': ('REAL', 'DECIMAL(9, 6)')},
+    'User_Questions': {'claimed_by_user_id': ('INTEGER', 'INT'),
+                       'claim_expires_at': ('TIMESTAMP', 'TIMESTAMP NULL')},
+}
+
+# MySQL indexes on migrated columns, as {table: {index: columns}}
+# (SQLite's Gym_Locations_Geo R-tree is created by schema.sql)
+MYSQL_INDEX_MIGRATIONS = {
+    'Gym_Locations': {'idx_lat_lon': 'latitude, longitude'},
+}
+
 
 class Database:
     """Database class supporting both SQLite and MySQL"""
     
-    def __init__(self, use_mysql=False, config=None):
+    def __init__(self, use_mysql=False, config=None, pool_size=5, use_procedures=False,
+                 replicas=None, connect=None):
         """
         Initialize database
         
         Args:
             use_mysql (bool): Use MySQL (XAMPP) or SQLite
             config (dict): Custom MySQL configuration
+            pool_size (int): Idle connections kept for reuse
+            use_procedures (bool): On MySQL, go through the stored procedures
+                in xampp_plsql_procedures.sql, caching read results
+            replicas (list): MySQL configs of read replicas; keys not given
+                are taken from the primary's config
+            connect (callable): MySQL connect function (a fake in tests)
         """
+        if use_procedures and not use_mysql:
+            raise ValueError("use_procedures needs the MySQL backend")
+        
         self.use_mysql = use_mysql
         self.config = config or XAMPP_CONFIG
+        self.connect = connect or mysql.connector.connect
         self.db_path = DB_PATH
         
+        # Per-statement timings, slow-query log and full-scan report
+        self.tracer = QueryTracer("mysql" if use_mysql else "sqlite")
+        
+        # Queries from statements.py, run on pooled connections
+        if use_mysql:
+            pool = ConnectionPool(lambda: self._open_mysql_connection(self.config), pool_size)
+        else:
+            pool = ConnectionPool(lambda: self.get_sqlite_connection(check_same_thread=False), pool_size)
+        self.statements = Executor("mysql" if use_mysql else "sqlite", pool, self.tracer)
+        
+        # Stored procedure calls with a per-process result cache (MySQL only)
+        self.procedures = Procedures(self.statements) if use_procedures else None
+        
+        # Read-only methods go to the least-lagged replica that has the
+        # caller's own writes; everything else stays on the primary
+        self.router = None
+        if use_mysql and replicas:
+            executors = []
+            for replica in replicas:
+                replica = {**self.config, **replica}
+                name = replica.get('name', f"{replica['host']}:{replica['port']}")
+                replica_pool = ConnectionPool(
+                    lambda replica=replica: self._open_mysql_connection(replica), pool_size)
+                executors.append((name, Executor("mysql", replica_pool, self.tracer)))
+            self.router = ReplicaRouter(self.statements, executors)
+        
         if use_mysql:
             self.init_mysql_db()
         else:
@@ -45,17 +107,20 @@ class Database:
     
     # ==================== MYSQL FUNCTIONS ====================
     
+    def _open_mysql_connection(self, config):
+        """Open a plain (untraced) MySQL connection"""
+        return self.connect(
+            host=config['host'],
+            user=config['user'],
+            password=config['password'],
+            database=config['database'],
+            port=config['port']
+        )
+    
     def get_mysql_connection(self):
-        """Get MySQL connection"""
+        """Get MySQL (primary) connection"""
         try:
-            conn = mysql.connector.connect(
-                host=self.config['host'],
-                user=self.config['user'],
-                password=self.config['password'],
-                database=self.config['database'],
-                port=self.config['port']
-            )
-            return conn
+            return TracedMySQLConnection(self._open_mysql_connection(self.config), self.tracer)
         except Error as e:
             print(f"Error connecting to MySQL: {e}")
             return None
@@ -69,6 +134,7 @@ class Database:
                 return
             
             cursor = conn.cursor()
+            self._migrate_mysql_schema(cursor)
             
             # Read schema file
             schema_path = Path(__file__).parent.parent / "database" / "schema_mysql.sql"
@@ -94,6 +160,33 @@ class Database:
         except Error as e:
             print(f"Error initializing MySQL: {e}")
     
+    def _migrate_mysql_schema(self, cursor):
+        """Add columns and indexes missing from tables created by an older schema"""
+        for table, columns in SCHEMA_MIGRATIONS.items():
+            cursor.execute('''
+                SELECT COLUMN_NAME FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            ''', (table,))
+            existing = {row[0] for row in cursor.fetchall()}
+            if not existing:
+                # Table does not exist yet; the schema creates it
+                continue
+            for column, (_, definition) in columns.items():
+                if column not in existing:
+                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        
+        for table, indexes in MYSQL_INDEX_MIGRATIONS.items():
+            cursor.execute('''
+                SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+            ''', (table,))
+            existing = {row[0] for row in cursor.fetchall()}
+            if not existing:
+                continue
+            for index, columns in indexes.items():
+                if index not in existing:
+                    cursor.execute(f"ALTER TABLE {table} ADD INDEX {index} ({columns})")
+    
     def _create_mysql_tables(self, conn):
         """Create MySQL tables"""
         cursor = conn.cursor()
@@ -127,10 +220,14 @@ class Database:
                 answer_text LONGTEXT,
                 answered_by_user_id INT,
                 is_answered BOOLEAN DEFAULT FALSE,
+                claimed_by_user_id INT,
+                claim_expires_at TIMESTAMP NULL,
                 FOREIGN KEY (user_id) REFERENCES Users(user_id) ON DELETE SET NULL,
                 FOREIGN KEY (answered_by_user_id) REFERENCES Users(user_id) ON DELETE SET NULL,
                 INDEX idx_user_id (user_id),
-                INDEX idx_is_answered (is_answered)
+                INDEX idx_is_answered (is_answered),
+                INDEX idx_unanswered_queue (is_answered, submitted_at),
+                INDEX idx_submitted_at (submitted_at)
             )
         ''')
         
@@ -145,7 +242,8 @@ class Database:
                 sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 is_read BOOLEAN DEFAULT FALSE,
                 INDEX idx_email (email),
-                INDEX idx_sent_at (sent_at)
+                INDEX idx_sent_at (sent_at),
+                INDEX idx_unread_inbox (is_read, sent_at)
             )
         ''')
         
@@ -173,8 +271,23 @@ class Database:
                 area VARCHAR(100) NOT NULL UNIQUE,
                 address TEXT,
                 phone VARCHAR(15),
+                latitude DECIMAL(9, 6),
+                longitude DECIMAL(9, 6),
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                INDEX idx_city (city)
+                INDEX idx_city (city),
+                INDEX idx_lat_lon (latitude, longitude)
+            )
+        ''')
+        
+        # Revoked_Tokens table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS Revoked_Tokens (
+                revocation_id INT PRIMARY KEY AUTO_INCREMENT,
+                token_id VARCHAR(32),
+                user_id INT NOT NULL,
+                revoked_at BIGINT NOT NULL,
+                expires_at BIGINT NOT NULL,
+                INDEX idx_expires_at (expires_at)
             )
         ''')
         
@@ -183,10 +296,12 @@ class Database:
     
     # ==================== SQLITE FUNCTIONS ====================
     
-    def get_sqlite_connection(self):
+    def get_sqlite_connection(self, check_same_thread=True):
         """Get SQLite connection"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = sqlite3.connect(str(self.db_path), factory=InstrumentedConnection,
+                               check_same_thread=check_same_thread)
         conn.row_factory = sqlite3.Row
+        conn.tracer = self.tracer
         return conn
     
     def init_sqlite_db(self):
@@ -199,12 +314,25 @@ class Database:
         
         with self.get_sqlite_connection() as conn:
             cursor = conn.cursor()
+            self._migrate_sqlite_schema(cursor)
             with open(schema_path, 'r') as f:
                 sql_script = f.read()
                 cursor.executescript(sql_script)
             conn.commit()
             print("✓ SQLite database initialized successfully")
     
+    def _migrate_sqlite_schema(self, cursor):
+        """Add columns missing from tables created by an older schema"""
+        for table, columns in SCHEMA_MIGRATIONS.items():
+            cursor.execute(f"PRAGMA table_info({table})")
+            existing = {row[1] for row in cursor.fetchall()}
+            if not existing:
+                # Table does not exist yet; the schema script creates it
+                continue
+            for column, (definition, _) in columns.items():
+                if column not in existing:
+                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    
     # ==================== COMMON FUNCTIONS ====================
     
     def get_connection(self):
@@ -214,6 +342,26 @@ class Database:
         else:
             return self.get_sqlite_connection()
     
+    def _read(self, run):
+        """
+        Call run(executor, lag) for a read-only query on a replica when one
+        qualifies, otherwise (or when the replica fails) on the primary
+        """
+        if self.router:
+            executor, lag = self.router.for_read()
+            if executor is not self.statements:
+                try:
+                    return run(executor, lag)
+                except Exception as e:
+                    print(f"Replica read failed, using primary: {e}")
+                    self.router.mark_failed(executor, e)
+        return run(self.statements, 0.0)
+    
+    def _wrote(self):
+        """Keep the caller's reads on the primary until replicas catch up"""
+        if self.router:
+            self.router.note_write()
+    
     @staticmethod
     def hash_password(password: str) -> str:
         """Hash password using SHA256"""
@@ -226,32 +374,19 @@ class Database:
         """Create a new user"""
         try:
             password_hash = self.hash_password(password)
+            if self.procedures:
+                user_id, success, message = self.procedures.call(
+                    "sp_register_user",
+                    (username, email, password_hash, full_name, phone, address, None, None, None))[-3:]
+                if not success:
+                    return {"success": False, "message": f"User creation failed: {message}"}
+                self._wrote()
+                return {"success": True, "user_id": user_id, "message": "User created successfully"}
             
-            if self.use_mysql:
-                conn = self.get_mysql_connection()
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO Users (username, email, password_hash, full_name,
-                                     phone_number, address)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                ''', (username, email, password_hash, full_name, phone, address))
-                conn.commit()
-                user_id = cursor.lastrowid
-                cursor.close()
-                conn.close()
-            else:
-                conn = self.get_sqlite_connection()
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO Users (username, email, password_hash, full_name,
-                                     phone_number, address)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (username, email, password_hash, full_name, phone, address))
-                conn.commit()
-                user_id = cursor.lastrowid
-                conn.close()
-            
-            return {"success": True, "user_id": user_id, "message": "User created successfully"}
+            result = self.statements.execute(
+                "create_user", (username, email, password_hash, full_name, phone, address))
+            self._wrote()
+            return {"success": True, "user_id": result.lastrowid, "message": "User created successfully"}
         
         except Exception as e:
             return {"success": False, "message": f"User creation failed: {str(e)}"}
@@ -260,29 +395,8 @@ class Database:
         """Authenticate user"""
         try:
             password_hash = self.hash_password(password)
-            
-            if self.use_mysql:
-                conn = self.get_mysql_connection()
-                cursor = conn.cursor(dictionary=True)
-                cursor.execute('''
-                    SELECT user_id, username, email, full_name, role
-                    FROM Users
-                    WHERE username = %s AND password_hash = %s AND is_active = TRUE
-                ''', (username, password_hash))
-                user = cursor.fetchone()
-                cursor.close()
-                conn.close()
-                return user
-            else:
-                conn = self.get_sqlite_connection()
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT user_id, username, email, full_name, role FROM Users
-                    WHERE username = ? AND password_hash = ? AND is_active = 1
-                ''', (username, password_hash))
-                user = cursor.fetchone()
-                conn.close()
-                return dict(user) if user else None
+            return self._read(lambda executor, lag: executor.fetch_one(
+                "authenticate_user", (username, password_hash)))
         
         except Exception as e:
             print(f"Error authenticating user: {e}")
@@ -291,60 +405,58 @@ class Database:
     def get_user(self, user_id: int) -> Optional[Dict]:
         """Get user by ID"""
         try:
-            if self.use_mysql:
-                conn = self.get_mysql_connection()
-                cursor = conn.cursor(dictionary=True)
-                cursor.execute('''
-                    SELECT user_id, username, email, full_name, phone_number,
-                           address, role, created_at FROM Users WHERE user_id = %s
-                ''', (user_id,))
-                user = cursor.fetchone()
-                cursor.close()
-                conn.close()
+            if self.procedures:
+                user = self._read(lambda executor, lag: self.procedures.fetch_one(
+                    "sp_get_user_profile", (user_id,), executor, lag))
+                if user:
+                    user.pop('is_active', None)
                 return user
-            else:
-                conn = self.get_sqlite_connection()
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT user_id, username, email, full_name, phone_number,
-                           address, role, created_at FROM Users WHERE user_id = ?
-                ''', (user_id,))
-                user = cursor.fetchone()
-                conn.close()
-                return dict(user) if user else None
+            return self._read(lambda executor, lag: executor.fetch_one("get_user", (user_id,)))
         
         except Exception as e:
             print(f"Error getting user: {e}")
             return None
     
+    # ==================== SESSION TOKENS ====================
+    # The revocation store behind auth.TokenAuthority; always the primary,
+    # so a revocation takes effect without waiting for replicas
+    
+    def add_revocation(self, token_id: Optional[str], user_id: int,
+                       revoked_at: int, expires_at: int):
+        """Record a revoked token (token_id None revokes all of the user's tokens)"""
+        self.statements.execute("add_revocation", (token_id, user_id, revoked_at, expires_at))
+    
+    def add_revocations(self, revocations: List[Tuple[Optional[str], int, int, int]]):
+        """Record many (token_id, user_id, revoked_at, expires_at) revocations at once"""
+        statement = STATEMENTS.get("add_revocation")
+        with self.statements.session() as session:
+            for revocation in revocations:
+                session.execute(statement, revocation)
+    
+    def get_revocations(self, after_id: int = 0) -> List[Dict]:
+        """Revocations recorded after after_id"""
+        return self.statements.fetch_all("get_revocations", (after_id,))
+    
+    def purge_revocations(self, now: int):
+        """Delete revocations whose tokens have expired"""
+        self.statements.execute("purge_revocations", (now,))
+    
     # ==================== QUESTION OPERATIONS ====================
     
     def add_question(self, user_name: str, question_text: str, user_id: Optional[int] = None) -> Dict:
         """Add a question"""
         try:
-            if self.use_mysql:
-                conn = self.get_mysql_connection()
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO User_Questions (user_id, user_name, question_text)
-                    VALUES (%s, %s, %s)
-                ''', (user_id, user_name, question_text))
-                conn.commit()
-                question_id = cursor.lastrowid
-                cursor.close()
-                conn.close()
-            else:
-                conn = self.get_sqlite_connection()
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO User_Questions (user_id, user_name, question_text)
-                    VALUES (?, ?, ?)
-                ''', (user_id, user_name, question_text))
-                conn.commit()
-                question_id = cursor.lastrowid
-                conn.close()
+            if self.procedures:
+                question_id, success, message = self.procedures.call(
+                    "sp_submit_question", (user_id, user_name, question_text, None, None, None))[-3:]
+                if not success:
+                    return {"success": False, "message": f"Error: {message}"}
+                self._wrote()
+                return {"success": True, "question_id": question_id, "message": "Question submitted successfully"}
             
-            return {"success": True, "question_id": question_id, "message": "Question submitted successfully"}
+            result = self.statements.execute("add_question", (user_id, user_name, question_text))
+            self._wrote()
+            return {"success": True, "question_id": result.lastrowid, "message": "Question submitted successfully"}
         
         except Exception as e:
             return {"success": False, "message": f"Error: {str(e)}"}
@@ -352,59 +464,67 @@ class Database:
     def get_all_questions(self) -> List[Dict]:
         """Get all questions"""
         try:
-            if self.use_mysql:
-                conn = self.get_mysql_connection()
-                cursor = conn.cursor(dictionary=True)
-                cursor.execute('''
-                    SELECT question_id, user_name, question_text, answer_text,
-                           is_answered, submitted_at FROM User_Questions
-                    ORDER BY submitted_at DESC
-                ''')
-                questions = cursor.fetchall()
-                cursor.close()
-                conn.close()
-                return questions if questions else []
-            else:
-                conn = self.get_sqlite_connection()
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT question_id, user_name, question_text, answer_text,
-                           is_answered, submitted_at FROM User_Questions
-                    ORDER BY submitted_at DESC
-                ''')
-                questions = cursor.fetchall()
-                conn.close()
-                return [dict(q) for q in questions] if questions else []
+            if self.procedures:
+                return self._read(lambda executor, lag: self.procedures.fetch_all(
+                    "sp_get_all_questions", (), executor, lag))
+            return self._read(lambda executor, lag: executor.fetch_all("get_all_questions"))
         
         except Exception as e:
             print(f"Error getting questions: {e}")
             return []
     
+    def claim_questions(self, admin_id: int, limit: int = 10, lease_seconds: int = 300) -> List[Dict]:
+        """
+        Lease up to `limit` unanswered questions to an admin
+        
+        The admin's own unexpired leases come first (and are renewed), then
+        the oldest questions nobody holds. On MySQL the candidate rows are
+        locked with SKIP LOCKED so concurrent admins never wait on, or
+        receive, the same rows; SQLite takes the write lock up front.
+        """
+        try:
+            with self.statements.session(lock_for_write=True) as session:
+                question_ids = [row['question_id'] for row in session.fetch_all(
+                    STATEMENTS.get("claim_own_leases"), (admin_id, limit))]
+                
+                if len(question_ids) < limit:
+                    question_ids += [row['question_id'] for row in session.fetch_all(
+                        STATEMENTS.get("claim_free_questions"), (limit - len(question_ids),))]
+                
+                if not question_ids:
+                    return []
+                
+                session.execute(STATEMENTS.expand("lease_questions", len(question_ids)),
+                                [admin_id, int(lease_seconds)] + question_ids)
+                claimed = session.fetch_all(
+                    STATEMENTS.expand("get_leased_questions", len(question_ids)), question_ids)
+            
+            self._wrote()
+            return claimed
+        
+        except Exception as e:
+            print(f"Error claiming questions: {e}")
+            return []
+    
     def answer_question(self, question_id: int, answer_text: str, admin_id: int) -> Dict:
-        """Answer a question"""
+        """Answer a question, unless it is answered or leased to another admin"""
         try:
-            if self.use_mysql:
-                conn = self.get_mysql_connection()
-                cursor = conn.cursor()
-                cursor.execute('''
-                    UPDATE User_Questions
-                    SET answer_text = %s, is_answered = TRUE, answered_by_user_id = %s
-                    WHERE question_id = %s
-                ''', (answer_text, admin_id, question_id))
-                conn.commit()
-                cursor.close()
-                conn.close()
-            else:
-                conn = self.get_sqlite_connection()
-                cursor = conn.cursor()
-                cursor.execute('''
-                    UPDATE User_Questions
-                    SET answer_text = ?, is_answered = 1, answered_by_user_id = ?
-                    WHERE question_id = ?
-                ''', (answer_text, admin_id, question_id))
-                conn.commit()
-                conn.close()
+            # sp_answer_question has no lease check, so this stays a statement
+            result = self.statements.execute(
+                "answer_question", (answer_text, admin_id, question_id, admin_id))
+            if self.procedures:
+                self.procedures.invalidate_for("sp_answer_question")
             
+            if result.rowcount == 0:
+                if self.statements.fetch_one("question_exists", (question_id,)) is None:
+                    return {"success": False, "not_found": True,
+                            "message": "Question not found"}
+                return {
+                    "success": False,
+                    "conflict": True,
+                    "message": "Question already answered or claimed by another admin"
+                }
+            self._wrote()
             return {"success": True, "message": "Answer added successfully"}
         
         except Exception as e:
@@ -415,29 +535,17 @@ class Database:
     def add_contact_message(self, name: str, email: str, subject: str, message: str) -> Dict:
         """Add contact message"""
         try:
-            if self.use_mysql:
-                conn = self.get_mysql_connection()
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO Contact_Messages (name, email, subject, message_text)
-                    VALUES (%s, %s, %s, %s)
-                ''', (name, email, subject, message))
-                conn.commit()
-                message_id = cursor.lastrowid
-                cursor.close()
-                conn.close()
-            else:
-                conn = self.get_sqlite_connection()
-                cursor = conn.cursor()
-                cursor.execute('''
-                    INSERT INTO Contact_Messages (name, email, subject, message_text)
-                    VALUES (?, ?, ?, ?)
-                ''', (name, email, subject, message))
-                conn.commit()
-                message_id = cursor.lastrowid
-                conn.close()
+            if self.procedures:
+                message_id, success, status = self.procedures.call(
+                    "sp_submit_contact_message", (name, email, subject, message, None, None, None))[-3:]
+                if not success:
+                    return {"success": False, "message": f"Error: {status}"}
+                self._wrote()
+                return {"success": True, "message_id": message_id, "message": "Message sent successfully"}
             
-            return {"success": True, "message_id": message_id, "message": "Message sent successfully"}
+            result = self.statements.execute("add_contact_message", (name, email, subject, message))
+            self._wrote()
+            return {"success": True, "message_id": result.lastrowid, "message": "Message sent successfully"}
         
         except Exception as e:
             return {"success": False, "message": f"Error: {str(e)}"}
@@ -445,86 +553,46 @@ class Database:
     def get_all_messages(self) -> List[Dict]:
         """Get all contact messages"""
         try:
-            if self.use_mysql:
-                conn = self.get_mysql_connection()
-                cursor = conn.cursor(dictionary=True)
-                cursor.execute('''
-                    SELECT message_id, name, email, subject, message_text,
-                           sent_at, is_read FROM Contact_Messages
-                    ORDER BY sent_at DESC
-                ''')
-                messages = cursor.fetchall()
-                cursor.close()
-                conn.close()
-                return messages if messages else []
-            else:
-                conn = self.get_sqlite_connection()
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT message_id, name, email, subject, message_text,
-                           sent_at, is_read FROM Contact_Messages
-                    ORDER BY sent_at DESC
-                ''')
-                messages = cursor.fetchall()
-                conn.close()
-                return [dict(m) for m in messages] if messages else []
+            if self.procedures:
+                return self._read(lambda executor, lag: self.procedures.fetch_all(
+                    "sp_get_all_messages", (), executor, lag))
+            return self._read(lambda executor, lag: executor.fetch_all("get_all_messages"))
         
         except Exception as e:
             print(f"Error getting messages: {e}")
             return []
     
+    # ==================== GYM LOCATION OPERATIONS ====================
+    
+    def get_nearby_locations(self, latitude: float, longitude: float, k: int = 5) -> List[Dict]:
+        """Get the k gym locations nearest to a point, with distance_km"""
+        def nearest(executor, lag):
+            with executor.session() as session:
+                def fetch_box(min_lat, max_lat, min_lon, max_lon):
+                    # MySQL: range scan on idx_lat_lon; SQLite: R-tree lookup
+                    rows = session.fetch_all(STATEMENTS.get("locations_in_box"),
+                                             (min_lat, max_lat, min_lon, max_lon))
+                    for row in rows:
+                        row['latitude'] = float(row['latitude'])
+                        row['longitude'] = float(row['longitude'])
+                    return rows
+                
+                return find_nearest(latitude, longitude, k, fetch_box)
+        
+        try:
+            return self._read(nearest)
+        
+        except Exception as e:
+            print(f"Error getting nearby locations: {e}")
+            return []
+    
+    # ==================== STATISTICS ====================
+    
     def get_dashboard_stats(self) -> Dict:
         """Get dashboard statistics"""
         try:
-            if self.use_mysql:
-                conn = self.get_mysql_connection()
-                cursor = conn.cursor(dictionary=True)
-                
-                cursor.execute('SELECT COUNT(*) as count FROM Users')
-                user_count = cursor.fetchone()['count']
-                
-                cursor.execute('SELECT COUNT(*) as count FROM User_Questions')
-                question_count = cursor.fetchone()['count']
-                
-                cursor.execute('SELECT COUNT(*) as count FROM User_Questions WHERE is_answered = FALSE')
-                unanswered = cursor.fetchone()['count']
-                
-                cursor.execute('SELECT COUNT(*) as count FROM Contact_Messages')
-                message_count = cursor.fetchone()['count']
-                
-                cursor.execute('SELECT COUNT(*) as count FROM Products')
-                product_count = cursor.fetchone()['count']
-                
-                cursor.close()
-                conn.close()
-            else:
-                conn = self.get_sqlite_connection()
-                cursor = conn.cursor()
-                
-                cursor.execute('SELECT COUNT(*) as count FROM Users')
-                user_count = cursor.fetchone()[0]
-                
-                cursor.execute('SELECT COUNT(*) as count FROM User_Questions')
-                question_count = cursor.fetchone()[0]
-                
-                cursor.execute('SELECT COUNT(*) as count FROM User_Questions WHERE is_answered = 0')
-                unanswered = cursor.fetchone()[0]
-                
-                cursor.execute('SELECT COUNT(*) as count FROM Contact_Messages')
-                message_count = cursor.fetchone()[0]
-                
-                cursor.execute('SELECT COUNT(*) as count FROM Products')
-                product_count = cursor.fetchone()[0]
-                
-                conn.close()
-            
-            return {
-                "total_users": user_count,
-                "total_questions": question_count,
-                "unanswered_questions": unanswered,
-                "total_messages": message_count,
-                "total_products": product_count
-            }
+            stats = self._read(lambda executor, lag: executor.fetch_one("dashboard_stats"))
+            return {key: int(value) for key, value in stats.items()}
         
         except Exception as e:
             print(f"Error getting stats: {e}")
@@ -0,0 +1,164 @@
+"""
+In-process pub/sub for Power Physique Zone
+Topics with bounded per-subscriber queues, used to push notifications
+(such as a question being answered) to clients over Server-Sent Events.
+
+An open event stream is a request parked in Subscription.get(). Under a
+threaded server that costs a thread per client; to hold tens of thousands
+of idle connections, serve the app with gevent workers (e.g. gunicorn -k
+gevent), which turn the threads, locks and queues used here into
+greenlets.
+"""
+
+import logging
+import threading
+from collections import deque
+from typing import Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Open subscriptions per process; further subscribers are turned away
+MAX_SUBSCRIBERS = 20000
+# Undelivered events per subscriber before it is marked overflowed
+SUBSCRIBER_QUEUE_SIZE = 16
+# How often the relay looks for changes made by any process
+RELAY_POLL_SECONDS = 1.0
+
+
+class HubFull(Exception):
+    """The hub already has max_subscribers subscriptions"""
+
+
+class Subscription:
+    """
+    One subscriber's queue. A slow consumer never blocks publishers: once
+    its queue is full, further events are dropped and `overflowed` is set,
+    and the consumer should resynchronise (e.g. re-fetch) instead.
+    """
+
+    # A deque and an Event rather than a queue.Queue: about half the
+    # memory, which adds up over tens of thousands of idle subscribers
+    __slots__ = ("topic", "queue_size", "overflowed", "_events", "_ready")
+
+    def __init__(self, topic: str, queue_size: int):
+        self.topic = topic
+        self.queue_size = queue_size
+        self.overflowed = False
+        self._events: deque = deque()
+        self._ready = threading.Event()
+
+    def _offer(self, event) -> bool:
+        if len(self._events) >= self.queue_size:
+            self.overflowed = True
+            return False
+        self._events.append(event)
+        self._ready.set()
+        return True
+
+    def get(self, timeout: Optional[float] = None):
+        """Next event, or None after `timeout` seconds without one"""
+        if not self._events:
+            self._ready.wait(timeout)
+        self._ready.clear()
+        # Anything offered after the clear is still in the deque
+        return self._events.popleft() if self._events else None
+
+
+class EventHub:
+    """Topic-based fan-out to bounded subscriber queues"""
+
+    def __init__(self, max_subscribers: int = MAX_SUBSCRIBERS,
+                 queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self.published = 0
+        self.dropped = 0
+        self._topics: Dict[str, Set[Subscription]] = {}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, topic: str) -> Subscription:
+        """New subscription to a topic; raises HubFull at the limit"""
+        subscription = Subscription(topic, self.queue_size)
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                raise HubFull(f"{self.max_subscribers} subscribers already connected")
+            self._topics.setdefault(topic, set()).add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._topics.get(subscription.topic)
+            if subscribers is None or subscription not in subscribers:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._topics[subscription.topic]
+            self._count -= 1
+
+    def publish(self, topic: str, event) -> int:
+        """Queue an event for every subscriber of a topic; how many took it"""
+        with self._lock:
+            subscribers = list(self._topics.get(topic, ()))
+        delivered = sum(1 for subscription in subscribers if subscription._offer(event))
+        self.published += 1
+        self.dropped += len(subscribers) - delivered
+        return delivered
+
+    def __len__(self):
+        return self._count
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "subscribers": self._count,
+                "topics": len(self._topics),
+                "max_subscribers": self.max_subscribers,
+                "published": self.published,
+                "dropped": self.dropped
+            }
+
+
+class ChangeRelay:
+    """
+    Background thread that follows the change feed (Database.get_changes)
+    and hands each batch to `on_changes`, so events caused by other worker
+    processes reach this process's subscribers too. One database poll per
+    interval per process, however many clients are connected.
+    """
+
+    def __init__(self, fetch: Callable[[Optional[str]], Dict],
+                 on_changes: Callable[[Dict], None],
+                 interval: float = RELAY_POLL_SECONDS):
+        self.fetch = fetch
+        self.on_changes = on_changes
+        self.interval = interval
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start following from the current position (once; later calls do nothing)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            cursor = self.fetch(None)["cursor"]
+            self._thread = threading.Thread(target=self._run, args=(cursor,),
+                                            name="change-relay", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, cursor: str):
+        while not self._stop.wait(self.interval):
+            try:
+                while True:
+                    changes = self.fetch(cursor)
+                    cursor = changes["cursor"]
+                    self.on_changes(changes)
+                    if not changes["more"]:
+                        break
+            except Exception as e:
+                logger.error(f"Error relaying changes: {e}")
@@ -0,0 +1,67 @@
+"""
+Geographic helpers for Power Physique Zone
+Distance maths and nearest-neighbour search over bounding-box indexes
+"""
+
+import math
+from typing import Callable, Dict, List
+
+EARTH_RADIUS_KM = 6371.0
+
+# Search radius starts small and doubles until enough gyms are found
+INITIAL_RADIUS_KM = 5.0
+MAX_RADIUS_KM = math.pi * EARTH_RADIUS_KM
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat: float, lon: float, radius_km: float):
+    """
+    Box (min_lat, max_lat, min_lon, max_lon) containing every point within
+    radius_km. Boxes that would cross a pole or the antimeridian are widened
+    to the full longitude range.
+    """
+    d_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = lat - d_lat, lat + d_lat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0
+
+    d_lon = math.degrees(radius_km / (EARTH_RADIUS_KM * math.cos(math.radians(lat))))
+    min_lon, max_lon = lon - d_lon, lon + d_lon
+    if min_lon < -180 or max_lon > 180:
+        return min_lat, max_lat, -180.0, 180.0
+    return min_lat, max_lat, min_lon, max_lon
+
+
+def find_nearest(lat: float, lon: float, k: int,
+                 fetch_box: Callable[[float, float, float, float], List[Dict]]) -> List[Dict]:
+    """
+    Return the k rows nearest to (lat, lon), each with a distance_km key.
+
+    fetch_box(min_lat, max_lat, min_lon, max_lon) must return the rows
+    (with latitude/longitude keys) inside the box, ideally from a spatial
+    index. The box grows until it holds k rows that are also within the
+    search radius, so the work done depends on local density rather than
+    on the total number of rows.
+    """
+    radius = INITIAL_RADIUS_KM
+    while True:
+        rows = fetch_box(*bounding_box(lat, lon, radius))
+        for row in rows:
+            row["distance_km"] = round(
+                haversine_km(lat, lon, row["latitude"], row["longitude"]), 3)
+        rows.sort(key=lambda row: row["distance_km"])
+
+        # Rows in the box corners may be farther than rows just outside it,
+        # so only rows inside the radius are known to be final
+        within = [row for row in rows if row["distance_km"] <= radius]
+        if len(within) >= k or radius >= MAX_RADIUS_KM:
+            return rows[:k] if radius >= MAX_RADIUS_KM else within[:k]
+        radius *= 2
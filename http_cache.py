@@ -0,0 +1,224 @@
+"""
+HTTP caching and compression for Power Physique Zone
+Compresses responses (brotli when available, else gzip) and answers
+conditional GETs from ETags built out of table versions, so a client
+whose copy is current gets a 304 without the database being queried
+"""
+
+import functools
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this are sent as they are
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_TYPES = ("application/json", "application/javascript", "image/svg+xml")
+
+# Bump when the JSON a versioned route returns changes shape, so clients
+# holding responses from the previous release do not get a 304
+ETAG_FORMAT = "1"
+
+# Fingerprinted assets never change under their name
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Precompressed twins written by build_assets.py, in order of preference
+STATIC_VARIANTS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _accepted(header: Optional[str]) -> Dict[str, float]:
+    """Accept-Encoding as {coding: q}"""
+    accepted = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def choose_encoding(header: Optional[str]) -> Optional[str]:
+    """"br" or "gzip" if the client takes it (br preferred), else None"""
+    accepted = _accepted(header)
+    wildcard = accepted.get("*", 0.0)
+    for coding in ("br", "gzip"):
+        if coding == "br" and brotli is None:
+            continue
+        if accepted.get(coding, wildcard) > 0:
+            return coding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _compressible(mimetype: Optional[str]) -> bool:
+    return bool(mimetype) and (mimetype.startswith("text/") or mimetype in COMPRESSIBLE_TYPES)
+
+
+def init_compression(app, min_size: int = COMPRESS_MIN_BYTES):
+    """Compress every eligible response of a Flask app"""
+    from flask import request
+
+    @app.after_request
+    def _compress_response(response):
+        if (response.direct_passthrough or response.is_streamed
+                or response.status_code != 200
+                or "Content-Encoding" in response.headers
+                or not _compressible(response.mimetype)
+                or "no-transform" in (response.headers.get("Cache-Control") or "")):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        body = response.get_data()
+        if len(body) < min_size:
+            return response
+        encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+        if encoding is None:
+            return response
+
+        response.set_data(compress(body, encoding))
+        response.headers["Content-Encoding"] = encoding
+        # A strong ETag names exact bytes: the compressed variant gets its own
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(f"{etag}-{encoding}")
+        return response
+
+
+def version_etag(versions: Dict[str, object], tables: Iterable[str]) -> str:
+    """
+    ETag for data read from `tables`, from their versions (a name also
+    matches versions named "<name>.<part>", e.g. one per database file)
+    """
+    prefixes = tuple(f"{table}." for table in tables)
+    parts = sorted(f"{name}={value}" for name, value in versions.items()
+                   if name in tables or name.startswith(prefixes))
+    digest = hashlib.blake2b("|".join([ETAG_FORMAT] + parts).encode(), digest_size=8)
+    return digest.hexdigest()
+
+
+def _strip_encoding(etag: str) -> str:
+    for suffix in ("-br", "-gzip"):
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)]
+    return etag
+
+
+def conditional(versions: Callable[[], Dict[str, object]], *tables: str,
+                private: bool = False):
+    """
+    Flask view decorator for GET routes whose response depends only on the
+    URL and the given tables. Sends an ETag from the tables' versions and
+    answers a matching If-None-Match with 304 before calling the view.
+
+    Place it below require_auth so the token is checked first. While the
+    versions are unknown (empty), the view runs without an ETag.
+    """
+    from flask import make_response, request
+
+    cache_control = "private, no-cache" if private else "no-cache"
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            current = versions()
+            if not current:
+                # An ETag of no versions would match every data state
+                return view(*args, **kwargs)
+            etag = version_etag(current, tables)
+            matched = next((tag for tag in request.if_none_match.as_set()
+                            if _strip_encoding(tag) == etag), None)
+            if matched is not None:
+                # Echo the client's tag, which names the encoding it holds
+                response = make_response("", 304)
+                response.set_etag(matched)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                response.set_etag(etag)
+            response.headers["Cache-Control"] = cache_control
+            response.vary.add("Accept-Encoding")
+            return response
+        return wrapper
+    return decorator
+
+
+def _send_static(path: Path, cache_control: str):
+    """
+    send_file for a built file, using the first .br/.gz twin that the client
+    takes and the build wrote (either may be missing for any file)
+    """
+    from flask import request, send_file
+
+    accepted = _accepted(request.headers.get("Accept-Encoding"))
+    wildcard = accepted.get("*", 0.0)
+    mimetype = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    for encoding, suffix in STATIC_VARIANTS:
+        variant = path.with_name(path.name + suffix)
+        if accepted.get(encoding, wildcard) > 0 and variant.exists():
+            response = send_file(variant, mimetype=mimetype, conditional=True, etag=True)
+            response.headers["Content-Encoding"] = encoding
+            break
+    else:
+        response = send_file(path, mimetype=mimetype, conditional=True, etag=True)
+    response.vary.add("Accept-Encoding")
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+
+def serve_assets(app, dist_dir: Path):
+    """
+    Serve the output of build_assets.py: /assets/<fingerprinted name> as
+    immutable (a repeat visit requests none of them), and the pages at
+    /<page>.html revalidated on every load so new builds are picked up.
+    """
+    from flask import abort
+
+    dist_dir = Path(dist_dir)
+    manifest_path = dist_dir / "manifest.json"
+    if not manifest_path.exists():
+        logger.warning(f"{manifest_path} not found; run build_assets.py to serve the front end")
+        return
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    pages = set(manifest["pages"])
+    assets_dir = dist_dir / "assets"
+    assets = {path.name for path in assets_dir.iterdir()
+              if path.suffix not in (".gz", ".br")}
+
+    @app.route("/assets/<name>", methods=["GET"])
+    def static_asset(name):
+        if name not in assets:
+            abort(404)
+        return _send_static(assets_dir / name, IMMUTABLE)
+
+    @app.route("/<page>", methods=["GET"])
+    def static_page(page):
+        if page not in pages:
+            abort(404)
+        return _send_static(dist_dir / page, "no-cache")
@@ -66,15 +66,15 @@ def init_sample_data():
     # 2. Create sample gym locations
     print("\n📍 Creating gym locations...")
     locations = [
-        {"city": "HYD", "area": "AMERPET", "address": "123 Fort St, Amerpet", "phone": "040-23456789"},
-        {"city": "HYD", "area": "KUKATPALLY", "address": "456 Main St, Kukatpally", "phone": "040-23456790"},
-        {"city": "HYD", "area": "GACHIBOWLI", "address": "789 Tech Park, Gachibowli", "phone": "040-23456791"},
-        {"city": "WARANGAL", "area": "HUNTER ROAD", "address": "321 Hunter St, Warangal", "phone": "0870-2456789"},
-        {"city": "WARANGAL", "area": "ERRAGATA GUTA", "address": "654 Guta St, Warangal", "phone": "0870-2456790"},
-        {"city": "KHAMMAM", "area": "TANK BUND", "address": "111 Tank St, Khammam", "phone": "0870-3456789"},
-        {"city": "KHAMMAM", "area": "NTR CIRCLE", "address": "222 NTR Cir, Khammam", "phone": "0870-3456790"},
-        {"city": "NALGONDA", "area": "SRINDAR NAGAR", "address": "333 Srindar St, Nalgonda", "phone": "08631-456789"},
-        {"city": "MAHABADAD", "area": "SUBADARI", "address": "444 Subadari St, Mahabadad", "phone": "8761-456789"},
+        {"city": "HYD", "area": "AMERPET", "address": "123 Fort St, Amerpet", "phone": "040-23456789", "latitude": 17.4375, "longitude": 78.4483},
+        {"city": "HYD", "area": "KUKATPALLY", "address": "456 Main St, Kukatpally", "phone": "040-23456790", "latitude": 17.4849, "longitude": 78.4138},
+        {"city": "HYD", "area": "GACHIBOWLI", "address": "789 Tech Park, Gachibowli", "phone": "040-23456791", "latitude": 17.4401, "longitude": 78.3489},
+        {"city": "WARANGAL", "area": "HUNTER ROAD", "address": "321 Hunter St, Warangal", "phone": "0870-2456789", "latitude": 17.992, "longitude": 79.561},
+        {"city": "WARANGAL", "area": "ERRAGATA GUTA", "address": "654 Guta St, Warangal", "phone": "0870-2456790", "latitude": 17.9625, "longitude": 79.544},
+        {"city": "KHAMMAM", "area": "TANK BUND", "address": "111 Tank St, Khammam", "phone": "0870-3456789", "latitude": 17.2473, "longitude": 80.1514},
+        {"city": "KHAMMAM", "area": "NTR CIRCLE", "address": "222 NTR Cir, Khammam", "phone": "0870-3456790", "latitude": 17.253, "longitude": 80.146},
+        {"city": "NALGONDA", "area": "SRINDAR NAGAR", "address": "333 Srindar St, Nalgonda", "phone": "08631-456789", "latitude": 17.0575, "longitude": 79.2684},
+        {"city": "MAHABADAD", "area": "SUBADARI", "address": "444 Subadari St, Mahabadad", "phone": "8761-456789", "latitude": 17.598, "longitude": 80.002},
     ]
     
     for location in locations:
@@ -0,0 +1,86 @@
+"""
+JSON encoding for query results
+Encodes cursor rows straight to JSON bytes using the column names in
+cursor.description, without sqlite3.Row objects or a list of dicts
+"""
+
+import math
+import time
+from json.encoder import encode_basestring_ascii
+from typing import Callable, List, Sequence, Tuple
+
+import metrics
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Rows fetched and encoded per step; bounds the temporary objects alive at once
+CHUNK_SIZE = 1000
+
+
+def _encode_value(value) -> str:
+    if value is None:
+        return "null"
+    cls = value.__class__
+    if cls is str:
+        return encode_basestring_ascii(value)
+    if cls is int:
+        return int.__repr__(value)
+    if cls is float:
+        return float.__repr__(value) if math.isfinite(value) else "null"
+    # Same fallback as json.dumps(..., default=str)
+    return encode_basestring_ascii(str(value))
+
+
+def _encode_chunk_orjson(columns: List[str], rows) -> bytes:
+    # orjson has no tuple-to-object mode; the dicts live only for this chunk
+    return orjson.dumps([dict(zip(columns, row)) for row in rows])[1:-1]
+
+
+def _encode_chunk_template(template: str, rows) -> bytes:
+    return ",".join([template % tuple(map(_encode_value, row)) for row in rows]).encode()
+
+
+def _chunk_encoder(columns: List[str]) -> Callable[[Sequence[Tuple]], bytes]:
+    """Function encoding a list of row tuples as comma-separated JSON objects"""
+    columns = list(columns)
+    if orjson is not None:
+        return lambda rows: _encode_chunk_orjson(columns, rows)
+    template = "{" + ",".join(
+        encode_basestring_ascii(column).replace("%", "%%") + ":%s" for column in columns) + "}"
+    return lambda rows: _encode_chunk_template(template, rows)
+
+
+def encode_rows(cursor) -> bytes:
+    """
+    Encode the cursor's remaining rows as a JSON array of objects.
+
+    The cursor must return plain tuples (no row_factory). Uses orjson when it
+    is installed, otherwise a per-query template with the standard library's
+    C string escaper.
+    """
+    encode_chunk = _chunk_encoder([column[0] for column in cursor.description])
+
+    parts = []
+    encode_seconds = 0.0
+    while True:
+        rows = cursor.fetchmany(CHUNK_SIZE)
+        if not rows:
+            break
+        started = time.perf_counter()
+        parts.append(encode_chunk(rows))
+        encode_seconds += time.perf_counter() - started
+
+    metrics.record_json(encode_seconds)
+    return b"[" + b",".join(parts) + b"]"
+
+
+def encode_tuples(columns: Sequence[str], rows: Sequence[Tuple]) -> bytes:
+    """Encode in-memory row tuples as a JSON array of objects"""
+    encode_chunk = _chunk_encoder(columns)
+    started = time.perf_counter()
+    parts = [encode_chunk(rows[i:i + CHUNK_SIZE]) for i in range(0, len(rows), CHUNK_SIZE)]
+    metrics.record_json(time.perf_counter() - started)
+    return b"[" + b",".join(parts) + b"]"
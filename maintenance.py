@@ -0,0 +1,208 @@
+"""
+Equipment maintenance scheduling for Power Physique Zone
+Keeps a per-location priority queue of equipment that needs attention
+"""
+
+import heapq
+import threading
+from collections import deque
+from datetime import date
+from typing import Dict, List, Optional
+
+# Priority score weights
+OVERDUE_WEIGHT = 1.0          # per day past maintenance_date
+RATING_WEIGHT = 5.0           # per star the rolling average sits below 5
+CONDITION_WEIGHTS = {'Good': 0.0, 'Fair': 10.0, 'Poor': 30.0}
+
+# Number of most recent ratings in the rolling average
+RATING_WINDOW = 20
+
+
+def _parse_date(value) -> Optional[date]:
+    """Parse a DATE column value, ignoring empty or malformed dates"""
+    if not value:
+        return None
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+class _EquipmentState:
+    """Scoring inputs for one piece of equipment"""
+
+    def __init__(self, row: Dict, window: int):
+        self.equipment_id = row['equipment_id']
+        self.name = row['name']
+        self.category = row.get('category')
+        self.maintenance_date = _parse_date(row.get('maintenance_date'))
+        self.condition = row.get('condition') or 'Good'
+        self.ratings = deque(maxlen=window)
+        self.rating_sum = 0
+        self.version = 0
+
+    def add_rating(self, rating: int):
+        """Push a rating into the rolling window"""
+        if len(self.ratings) == self.ratings.maxlen:
+            self.rating_sum -= self.ratings[0]
+        self.ratings.append(rating)
+        self.rating_sum += rating
+
+    def average_rating(self) -> Optional[float]:
+        return self.rating_sum / len(self.ratings) if self.ratings else None
+
+    def overdue_days(self, today: date) -> int:
+        if not self.maintenance_date:
+            return 0
+        return max(0, (today - self.maintenance_date).days)
+
+    def score(self, today: date) -> float:
+        """Higher score means maintenance is more urgent"""
+        score = self.overdue_days(today) * OVERDUE_WEIGHT
+        score += CONDITION_WEIGHTS.get(self.condition, 0.0)
+        average = self.average_rating()
+        if average is not None:
+            score += (5 - average) * RATING_WEIGHT
+        return score
+
+    def to_dict(self, today: date, score: float) -> Dict:
+        average = self.average_rating()
+        return {
+            "equipment_id": self.equipment_id,
+            "name": self.name,
+            "category": self.category,
+            "condition": self.condition,
+            "maintenance_date": self.maintenance_date.isoformat() if self.maintenance_date else None,
+            "overdue_days": self.overdue_days(today),
+            "average_rating": round(average, 2) if average is not None else None,
+            "rating_count": len(self.ratings),
+            "priority_score": round(score, 2)
+        }
+
+
+class _LocationQueue:
+    """Max-heap of equipment at one location, with lazy deletion"""
+
+    def __init__(self):
+        self.equipment: Dict[int, _EquipmentState] = {}
+        self.heap: List = []
+        self.built_on: Optional[date] = None
+
+    def push(self, state: _EquipmentState, today: date):
+        """(Re)score equipment; older heap entries for it become stale"""
+        state.version += 1
+        heapq.heappush(self.heap, (-state.score(today), state.equipment_id, state.version))
+        # Compact once stale entries dominate the heap
+        if len(self.heap) > 2 * len(self.equipment) + 16:
+            self.rebuild(today)
+
+    def rebuild(self, today: date):
+        """Rescore everything, e.g. once per day as overdue counts grow"""
+        self.heap = []
+        for state in self.equipment.values():
+            state.version += 1
+            self.heap.append((-state.score(today), state.equipment_id, state.version))
+        heapq.heapify(self.heap)
+        self.built_on = today
+
+    def top(self, limit: int, today: date) -> List[Dict]:
+        if self.built_on != today:
+            self.rebuild(today)
+
+        popped = []
+        results = []
+        while self.heap and len(results) < limit:
+            entry = heapq.heappop(self.heap)
+            neg_score, equipment_id, version = entry
+            state = self.equipment.get(equipment_id)
+            if state is None or state.version != version:
+                continue
+            popped.append(entry)
+            results.append(state.to_dict(today, -neg_score))
+
+        for entry in popped:
+            heapq.heappush(self.heap, entry)
+        return results
+
+
+class MaintenanceScheduler:
+    """
+    Per-location maintenance queues, kept up to date incrementally.
+
+    A location is loaded from the database once; after that new ratings
+    and maintenance updates only rescore the affected equipment.
+    """
+
+    def __init__(self, rating_window: int = RATING_WINDOW):
+        self.rating_window = rating_window
+        self._locations: Dict[int, _LocationQueue] = {}
+        self._equipment_location: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def is_loaded(self, location_id: int) -> bool:
+        with self._lock:
+            return location_id in self._locations
+
+    def load_location(self, location_id: int, equipment_rows: List[Dict],
+                      rating_rows: List[Dict]):
+        """Build a location queue from equipment rows and their ratings (oldest first)"""
+        queue = _LocationQueue()
+        for row in equipment_rows:
+            queue.equipment[row['equipment_id']] = _EquipmentState(row, self.rating_window)
+        for row in rating_rows:
+            state = queue.equipment.get(row['equipment_id'])
+            if state is not None:
+                state.add_rating(row['rating'])
+        queue.rebuild(date.today())
+
+        with self._lock:
+            self._locations[location_id] = queue
+            for equipment_id in queue.equipment:
+                self._equipment_location[equipment_id] = location_id
+
+    def add_equipment(self, location_id: int, row: Dict):
+        """Track newly added equipment if its location is loaded"""
+        with self._lock:
+            queue = self._locations.get(location_id)
+            if queue is None:
+                return
+            state = _EquipmentState(row, self.rating_window)
+            queue.equipment[state.equipment_id] = state
+            self._equipment_location[state.equipment_id] = location_id
+            queue.push(state, date.today())
+
+    def record_rating(self, equipment_id: int, rating: int):
+        """Fold a new rating into the rolling average and rescore"""
+        with self._lock:
+            state, queue = self._find(equipment_id)
+            if state is None:
+                return
+            state.add_rating(rating)
+            queue.push(state, date.today())
+
+    def record_maintenance(self, equipment_id: int, maintenance_date, condition: str):
+        """Apply a new maintenance date and condition and rescore"""
+        with self._lock:
+            state, queue = self._find(equipment_id)
+            if state is None:
+                return
+            state.maintenance_date = _parse_date(maintenance_date)
+            state.condition = condition
+            queue.push(state, date.today())
+
+    def top(self, location_id: int, limit: int = 20) -> List[Dict]:
+        """Highest-priority equipment at a location"""
+        with self._lock:
+            queue = self._locations.get(location_id)
+            if queue is None:
+                return []
+            return queue.top(limit, date.today())
+
+    def _find(self, equipment_id: int):
+        location_id = self._equipment_location.get(equipment_id)
+        queue = self._locations.get(location_id)
+        if queue is None:
+            return None, None
+        return queue.equipment.get(equipment_id), queue
@@ -0,0 +1,277 @@
+"""
+Request and database metrics for Power Physique Zone
+Collects per-route latency and DB usage and renders them for Prometheus
+"""
+
+import bisect
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds (Prometheus defaults plus a sub-millisecond bucket)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+ROW_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 5000, 10000, 50000)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (last is +Inf), sum, count]
+        self._series: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += bucket_count
+                    le = f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labels, label_values, le)} {cumulative}")
+                labels = _format_labels(self.labels, label_values)
+                lines.append(f"{self.name}_sum{labels} {total}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+# ========== METRIC DEFINITIONS ==========
+
+REQUEST_LATENCY = Histogram(
+    "ppz_http_request_duration_seconds", "HTTP request latency by route",
+    ("route", "method", "status"))
+REQUEST_DB_QUERIES = Histogram(
+    "ppz_http_request_db_queries", "Database queries issued per request",
+    ("route",), COUNT_BUCKETS)
+REQUEST_DB_TIME = Histogram(
+    "ppz_http_request_db_seconds", "Time spent in the database per request",
+    ("route",))
+REQUEST_DB_ROWS = Histogram(
+    "ppz_http_request_db_rows", "Rows fetched from the database per request",
+    ("route",), ROW_BUCKETS)
+JSON_ENCODE_TIME = Histogram(
+    "ppz_http_json_encode_seconds", "Time spent encoding JSON responses",
+    ("route",))
+DB_QUERY_TIME = Histogram(
+    "ppz_db_query_duration_seconds", "Duration of individual database statements")
+
+ALL_METRICS = [REQUEST_LATENCY, REQUEST_DB_QUERIES, REQUEST_DB_TIME,
+               REQUEST_DB_ROWS, JSON_ENCODE_TIME, DB_QUERY_TIME]
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines: List[str] = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ========== PER-REQUEST TRACKING ==========
+
+class RequestStats:
+    """Database usage accumulated while serving one request"""
+
+    __slots__ = ("started", "queries", "db_seconds", "rows", "json_seconds")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.rows = 0
+        self.json_seconds = 0.0
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("ppz_request_stats", default=None)
+
+
+def start_request() -> RequestStats:
+    stats = RequestStats()
+    _current.set(stats)
+    return stats
+
+
+def finish_request(route: str, method: str, status: int):
+    stats = _current.get()
+    if stats is None:
+        return
+    _current.set(None)
+    REQUEST_LATENCY.observe(time.perf_counter() - stats.started, route, method, str(status))
+    REQUEST_DB_QUERIES.observe(stats.queries, route)
+    REQUEST_DB_TIME.observe(stats.db_seconds, route)
+    REQUEST_DB_ROWS.observe(stats.rows, route)
+    if stats.json_seconds:
+        JSON_ENCODE_TIME.observe(stats.json_seconds, route)
+
+
+def record_query(seconds: float):
+    DB_QUERY_TIME.observe(seconds)
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += seconds
+
+
+def record_fetch(seconds: float, rows: int):
+    stats = _current.get()
+    if stats is not None:
+        stats.db_seconds += seconds
+        stats.rows += rows
+
+
+def record_json(seconds: float):
+    stats = _current.get()
+    if stats is not None:
+        stats.json_seconds += seconds
+
+
+# ========== SQLITE INSTRUMENTATION ==========
+
+def _no_plan(sql, parameters):
+    return []
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    sqlite3 cursor that reports statement time and fetched rows, and feeds
+    the connection's query tracer when one is attached
+    """
+
+    def execute(self, sql, parameters=()):
+        tracer = getattr(self.connection, "tracer", None)
+        stats = tracer.prepare(sql, parameters, self._explain) if tracer else None
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            seconds = time.perf_counter() - started
+            record_query(seconds)
+            if stats is not None:
+                tracer.record(stats, seconds)
+
+    def executemany(self, sql, seq_of_parameters):
+        tracer = getattr(self.connection, "tracer", None)
+        # Parameters are consumed lazily, so batches are timed but not explained
+        stats = tracer.prepare(sql, None, _no_plan) if tracer else None
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            seconds = time.perf_counter() - started
+            record_query(seconds)
+            if stats is not None:
+                tracer.record(stats, seconds)
+
+    def executescript(self, sql_script):
+        started = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            record_query(time.perf_counter() - started)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        record_fetch(time.perf_counter() - started, 1 if row is not None else 0)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        record_fetch(time.perf_counter() - started, len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        record_fetch(time.perf_counter() - started, len(rows))
+        return rows
+
+    def _explain(self, sql, parameters) -> List[str]:
+        # Plain cursor, so explaining is neither timed nor traced itself
+        cursor = sqlite3.Connection.cursor(self.connection)
+        try:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", parameters)
+            return [row[3] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3 connection whose cursors are InstrumentedCursor"""
+
+    # Optional query_log.QueryTracer, set per connection
+    tracer = None
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+# ========== FLASK INTEGRATION ==========
+
+def init_app(app):
+    """Record per-route metrics for every request served by a Flask app"""
+    from flask import request
+    from flask.json.provider import DefaultJSONProvider
+
+    class TimedJSONProvider(DefaultJSONProvider):
+        """JSON provider that attributes encoding time to the request"""
+
+        def dumps(self, obj, **kwargs):
+            started = time.perf_counter()
+            try:
+                return super().dumps(obj, **kwargs)
+            finally:
+                record_json(time.perf_counter() - started)
+
+    app.json = TimedJSONProvider(app)
+
+    @app.before_request
+    def _start_request_metrics():
+        start_request()
+
+    @app.after_request
+    def _finish_request_metrics(response):
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        finish_request(route, request.method, response.status_code)
+        return response
@@ -0,0 +1,90 @@
+"""
+Compact record types for Power Physique Zone
+Fixed-field __slots__ classes for rows kept in memory, built from
+sqlite3.Row, MySQL dictionary rows or plain tuples
+"""
+
+from typing import Dict, Iterable, List, Tuple
+
+from json_rows import encode_tuples
+
+
+class Record:
+    """
+    Base for row records.
+
+    Subclasses list their columns in __slots__, in SELECT order. A record
+    with eight columns takes about a third of the memory of the equivalent
+    dict.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, *values):
+        if len(values) != len(self.__slots__):
+            raise TypeError(f"{type(self).__name__} takes {len(self.__slots__)} values, got {len(values)}")
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    @classmethod
+    def from_row(cls, row):
+        """Build from a tuple in column order or any row indexable by column name"""
+        if isinstance(row, tuple):
+            return cls(*row)
+        return cls(*(row[name] for name in cls.__slots__))
+
+    @classmethod
+    def from_rows(cls, rows: Iterable) -> List["Record"]:
+        """
+        Build records for a result set. Equal strings (categories, cities,
+        image paths, ...) come back from the driver as separate objects, so
+        they are collapsed to one shared object per distinct value.
+        """
+        seen: Dict[str, str] = {}
+        records = []
+        for row in rows:
+            if not isinstance(row, tuple):
+                row = tuple(row[name] for name in cls.__slots__)
+            records.append(cls(*[seen.setdefault(value, value) if value.__class__ is str else value
+                                 for value in row]))
+        return records
+
+    def to_tuple(self) -> Tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def to_json(self) -> bytes:
+        return encode_records([self])[1:-1]
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_tuple() == other.to_tuple()
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+def encode_records(records: List[Record]) -> bytes:
+    """JSON array of objects for records of one type"""
+    if not records:
+        return b"[]"
+    return encode_tuples(type(records[0]).__slots__, [record.to_tuple() for record in records])
+
+
+class Product(Record):
+    __slots__ = ("product_id", "name", "category", "price", "description",
+                 "pack_size", "image_url", "stock_quantity")
+
+
+class Location(Record):
+    __slots__ = ("location_id", "city", "area", "address", "phone",
+                 "latitude", "longitude")
+
+
+class UserSummary(Record):
+    """The user fields returned by get_user"""
+
+    __slots__ = ("user_id", "username", "email", "full_name", "phone_number",
+                 "address", "role", "created_at")
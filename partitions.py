@@ -0,0 +1,228 @@
+"""
+Partitioned storage for Power Physique Zone
+Keeps the append-heavy tables (User_Questions, Contact_Messages) in SQLite
+files of their own, one per table or one per table and month, so inserts
+into them take a different write lock from the main database
+"""
+
+import re
+import shutil
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# Partitioning modes
+PARTITION_FILE = "file"        # one extra file per table
+PARTITION_MONTHLY = "monthly"  # one extra file per table and calendar month (UTC)
+
+# Row IDs in a partition start at its index times this, so the ID alone
+# tells which file holds a row. Index 0 is the main database.
+ID_SPAN = 10 ** 7
+
+# Same columns, indexes and change-log triggers as schema.sql. Foreign keys
+# to Users are left out: they cannot reference a table in another file.
+PARTITIONED_TABLES: Dict[str, str] = {
+    'User_Questions': '''
+        CREATE TABLE IF NOT EXISTS User_Questions (
+            question_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            user_name VARCHAR(100) NOT NULL,
+            question_text TEXT NOT NULL,
+            submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            answer_text TEXT,
+            answered_by_user_id INTEGER,
+            is_answered BOOLEAN DEFAULT 0,
+            claimed_by_user_id INTEGER,
+            claim_expires_at TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_questions_user_id ON User_Questions(user_id);
+        CREATE INDEX IF NOT EXISTS idx_questions_unanswered ON User_Questions(submitted_at) WHERE is_answered = 0;
+        CREATE INDEX IF NOT EXISTS idx_questions_submitted_at ON User_Questions(submitted_at);
+        CREATE TABLE IF NOT EXISTS Change_Log (
+            change_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name VARCHAR(50) NOT NULL,
+            row_id INTEGER NOT NULL
+        );
+        
+        CREATE TRIGGER IF NOT EXISTS trg_questions_change_insert
+        AFTER INSERT ON User_Questions
+        BEGIN
+            INSERT INTO Change_Log (table_name, row_id) VALUES ('User_Questions', NEW.question_id);
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS trg_questions_change_update
+        AFTER UPDATE ON User_Questions
+        BEGIN
+            INSERT INTO Change_Log (table_name, row_id) VALUES ('User_Questions', NEW.question_id);
+        END;
+    ''',
+    'Contact_Messages': '''
+        CREATE TABLE IF NOT EXISTS Contact_Messages (
+            message_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name VARCHAR(100) NOT NULL,
+            email VARCHAR(100) NOT NULL,
+            subject VARCHAR(255),
+            message_text TEXT NOT NULL,
+            sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            is_read BOOLEAN DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_messages_sent_at ON Contact_Messages(sent_at);
+        CREATE INDEX IF NOT EXISTS idx_messages_unread ON Contact_Messages(is_read, sent_at);
+        CREATE TABLE IF NOT EXISTS Change_Log (
+            change_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name VARCHAR(50) NOT NULL,
+            row_id INTEGER NOT NULL
+        );
+        
+        CREATE TRIGGER IF NOT EXISTS trg_messages_change_insert
+        AFTER INSERT ON Contact_Messages
+        BEGIN
+            INSERT INTO Change_Log (table_name, row_id) VALUES ('Contact_Messages', NEW.message_id);
+        END;
+        
+        CREATE TRIGGER IF NOT EXISTS trg_messages_change_update
+        AFTER UPDATE ON Contact_Messages
+        BEGIN
+            INSERT INTO Change_Log (table_name, row_id) VALUES ('Contact_Messages', NEW.message_id);
+        END;
+    ''',
+}
+
+_MONTH = re.compile(r"^(\d{4})-(\d{2})$")
+
+
+class Partition:
+    """One file holding rows of a table"""
+
+    __slots__ = ("table", "key", "path", "index")
+
+    def __init__(self, table: str, key: str, path: Path, index: int):
+        self.table = table
+        self.key = key
+        self.path = path
+        self.index = index
+
+    def __repr__(self):
+        return f"Partition({self.table}, {self.key}, {self.path.name})"
+
+
+class PartitionStore:
+    """
+    Finds, creates and archives the partition files of a main database.
+
+    Files sit next to the main one: power_physique.User_Questions.db in
+    "file" mode, power_physique.User_Questions.2026-10.db in "monthly"
+    mode. Rows written before partitioning was enabled stay in the main
+    database, which is always read as partition 0.
+    """
+
+    def __init__(self, main_path: Path, mode: str,
+                 connect: Callable[[Path], object]):
+        if mode not in (PARTITION_FILE, PARTITION_MONTHLY):
+            raise ValueError(f"Unknown partitioning mode: {mode}")
+        self.main_path = Path(main_path)
+        self.mode = mode
+        self.connect = connect
+        self._created = set()
+        self._lock = threading.Lock()
+
+    def handles(self, table: str) -> bool:
+        return table in PARTITIONED_TABLES
+
+    # ========== NAMING ==========
+
+    def _path(self, table: str, key: Optional[str]) -> Path:
+        stem = self.main_path.stem
+        name = f"{stem}.{table}.db" if key is None else f"{stem}.{table}.{key}.db"
+        return self.main_path.with_name(name)
+
+    @staticmethod
+    def _month_index(key: str) -> int:
+        year, month = _MONTH.match(key).groups()
+        return int(year) * 12 + int(month)
+
+    def main(self, table: str) -> Partition:
+        return Partition(table, "main", self.main_path, 0)
+
+    # ========== LOOKUP ==========
+
+    def current(self, table: str, when: Optional[datetime] = None) -> Partition:
+        """The partition new rows go to, created on first use"""
+        if self.mode == PARTITION_FILE:
+            partition = Partition(table, "all", self._path(table, None), 1)
+        else:
+            key = (when or datetime.utcnow()).strftime("%Y-%m")
+            partition = Partition(table, key, self._path(table, key), self._month_index(key))
+        self._ensure(partition)
+        return partition
+
+    def partitions(self, table: str) -> List[Partition]:
+        """The main database, then every partition file, oldest first"""
+        found = [self.main(table)]
+        if self.mode == PARTITION_FILE:
+            path = self._path(table, None)
+            if path.exists():
+                found.append(Partition(table, "all", path, 1))
+            return found
+
+        prefix = f"{self.main_path.stem}.{table}."
+        months = []
+        for path in self.main_path.parent.glob(f"{prefix}*.db"):
+            key = path.name[len(prefix):-3]
+            if _MONTH.match(key):
+                months.append(Partition(table, key, path, self._month_index(key)))
+        return found + sorted(months, key=lambda partition: partition.index)
+
+    def locate(self, table: str, row_id: int) -> Partition:
+        """The partition holding a row ID (the main database for older rows)"""
+        index = int(row_id) // ID_SPAN
+        if index == 0:
+            return self.main(table)
+        if self.mode == PARTITION_FILE:
+            return Partition(table, "all", self._path(table, None), 1)
+        for partition in self.partitions(table)[1:]:
+            if partition.index == index:
+                return partition
+        return self.main(table)
+
+    # ========== FILES ==========
+
+    def _ensure(self, partition: Partition):
+        """Create the table in a new partition and start its IDs at index * ID_SPAN"""
+        if partition.path in self._created:
+            return
+        with self._lock:
+            if partition.path in self._created:
+                return
+            conn = self.connect(partition.path)
+            try:
+                conn.executescript(PARTITIONED_TABLES[partition.table])
+                conn.execute('''
+                    INSERT INTO sqlite_sequence (name, seq)
+                    SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = ?)
+                ''', (partition.table, partition.index * ID_SPAN, partition.table))
+                conn.commit()
+            finally:
+                conn.close()
+            self._created.add(partition.path)
+
+    def archive(self, table: str, before: str, dest_dir: Path) -> List[Path]:
+        """
+        Move monthly partitions older than `before` ("YYYY-MM") to
+        dest_dir. Their rows drop out of every read; moving a file back
+        brings them back.
+        """
+        if self.mode != PARTITION_MONTHLY:
+            raise ValueError("Only monthly partitions can be archived")
+        cutoff = self._month_index(before)
+        dest_dir = Path(dest_dir)
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        moved = []
+        for partition in self.partitions(table)[1:]:
+            if partition.index < cutoff:
+                target = dest_dir / partition.path.name
+                shutil.move(str(partition.path), str(target))
+                self._created.discard(partition.path)
+                moved.append(target)
+        return moved
@@ -0,0 +1,172 @@
+"""
+Stored procedure calls for Power Physique Zone
+Runs MySQL reads through the procedures in xampp_plsql_procedures.sql and
+keeps their result sets in a client-side cache keyed by procedure name and
+arguments, dropped whenever a matching write procedure runs
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Result sets kept per process, and how long one may be served
+CACHE_MAX_ENTRIES = 512
+CACHE_TTL_SECONDS = 30.0
+
+# Read procedures whose result sets are cached
+CACHED_PROCEDURES = frozenset({
+    "sp_get_user_profile",
+    "sp_get_all_questions",
+    "sp_get_unanswered_questions",
+    "sp_get_all_messages",
+    "sp_get_active_subscriptions",
+    "sp_get_products_by_category",
+    "sp_search_products",
+    "sp_get_user_orders",
+    "sp_get_product_reviews",
+    "sp_get_workouts_by_category",
+    "sp_get_workout_exercises",
+    "sp_get_competition_leaderboard",
+    "sp_get_all_locations",
+    "sp_get_location_details",
+})
+
+# Write procedure -> read procedures whose cached results it makes stale
+INVALIDATES: Dict[str, Tuple[str, ...]] = {
+    "sp_register_user": ("sp_get_user_profile",),
+    "sp_update_user_profile": ("sp_get_user_profile", "sp_get_competition_leaderboard"),
+    "sp_submit_question": ("sp_get_all_questions", "sp_get_unanswered_questions"),
+    "sp_answer_question": ("sp_get_all_questions", "sp_get_unanswered_questions"),
+    "sp_submit_contact_message": ("sp_get_all_messages",),
+    "sp_mark_message_read": ("sp_get_all_messages",),
+    "sp_create_subscription": ("sp_get_active_subscriptions",),
+    "sp_cancel_subscription": ("sp_get_active_subscriptions",),
+    "sp_add_product": ("sp_get_products_by_category", "sp_search_products"),
+    "sp_create_order": ("sp_get_user_orders",),
+    "sp_add_order_item": ("sp_get_user_orders", "sp_get_products_by_category",
+                          "sp_search_products"),
+    "sp_update_order_status": ("sp_get_user_orders",),
+    "sp_add_product_review": ("sp_get_product_reviews",),
+    "sp_add_workout": ("sp_get_workouts_by_category",),
+    "sp_create_competition": (),
+    "sp_register_competition": ("sp_get_competition_leaderboard",),
+}
+
+
+class ResultCache:
+    """
+    Thread-safe LRU of procedure result sets with a TTL.
+
+    Each read procedure has a generation that invalidation bumps; a result
+    fetched under an older generation is not stored, so a read racing a
+    write never caches what the write replaced. Likewise a result read
+    from a replica is not stored when its data predates the last
+    invalidation.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._invalidated_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def generation(self, procedure: str) -> int:
+        return self._generations.get(procedure, 0)
+
+    def get(self, procedure: str, args: tuple):
+        """(columns, rows) for a fresh entry, else None"""
+        key = (procedure, args)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, procedure: str, args: tuple, result, generation: int,
+            as_of: Optional[float] = None):
+        """Store a result fetched under `generation`, reflecting data as of `as_of`"""
+        with self._lock:
+            if self._generations.get(procedure, 0) != generation:
+                return
+            if as_of is not None and as_of < self._invalidated_at.get(procedure, float("-inf")):
+                return
+            self._entries[(procedure, args)] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end((procedure, args))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, procedures: Sequence[str]):
+        procedures = set(procedures)
+        if not procedures:
+            return
+        now = time.monotonic()
+        with self._lock:
+            for procedure in procedures:
+                self._generations[procedure] = self._generations.get(procedure, 0) + 1
+                self._invalidated_at[procedure] = now
+            for key in [key for key in self._entries if key[0] in procedures]:
+                del self._entries[key]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class Procedures:
+    """Stored procedure calls on an Executor's pooled MySQL connections"""
+
+    def __init__(self, executor, cache: Optional[ResultCache] = None):
+        if executor.dialect != "mysql":
+            raise ValueError("Stored procedures need the MySQL backend")
+        self.executor = executor
+        self.cache = cache if cache is not None else ResultCache()
+
+    def fetch_all(self, procedure: str, args: Sequence = (), executor=None,
+                  lag: float = 0.0) -> List[Dict]:
+        """
+        Rows of the procedure's first result set, from the cache when fresh.
+        `executor` and `lag` name a replica to read from instead.
+        """
+        args = tuple(args)
+        cached = procedure in CACHED_PROCEDURES
+        result = self.cache.get(procedure, args) if cached else None
+        if result is None:
+            generation = self.cache.generation(procedure)
+            as_of = time.monotonic() - lag
+            with (executor or self.executor).session() as session:
+                result_sets, _ = session.callproc(procedure, args)
+            result = result_sets[0] if result_sets else ((), [])
+            if cached:
+                self.cache.put(procedure, args, result, generation, as_of)
+        columns, rows = result
+        return [dict(zip(columns, row)) for row in rows]
+
+    def fetch_one(self, procedure: str, args: Sequence = (), executor=None,
+                  lag: float = 0.0) -> Optional[Dict]:
+        rows = self.fetch_all(procedure, args, executor, lag)
+        return rows[0] if rows else None
+
+    def call(self, procedure: str, args: Sequence = ()) -> tuple:
+        """
+        Run a write procedure and return its argument values after the
+        call (OUT parameters filled in). Pass None for each OUT slot.
+        """
+        try:
+            with self.executor.session() as session:
+                _, out_args = session.callproc(procedure, tuple(args))
+        finally:
+            # Also on failure: the procedure may have written before raising
+            self.invalidate_for(procedure)
+        return out_args
+
+    def invalidate_for(self, procedure: str):
+        """Drop results made stale by a write procedure (or its SQL equivalent)"""
+        self.cache.invalidate(INVALIDATES.get(procedure, ()))
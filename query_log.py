@@ -0,0 +1,220 @@
+"""
+Query tracing for Power Physique Zone
+Normalises SQL, times it, logs slow statements with their query plan and
+reports statements that scan whole tables
+"""
+
+import logging
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Statements slower than this are logged with their plan
+SLOW_QUERY_THRESHOLD_MS = 100.0
+
+# Only statements with a useful plan are explained
+_EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+_MAX_CACHED_SQL = 2048
+
+
+def normalise(sql: str) -> str:
+    """Collapse whitespace and replace literals so similar statements group together"""
+    sql = _WHITESPACE.sub(" ", sql).strip()
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    return _PLACEHOLDER_LIST.sub("(?, ...)", sql)
+
+
+def sqlite_full_scan(plan: List[str]) -> bool:
+    """True if an EXPLAIN QUERY PLAN reads a table without any index"""
+    for detail in plan:
+        if (detail.startswith("SCAN ") and "USING" not in detail
+                and "VIRTUAL TABLE" not in detail and "CONSTANT ROW" not in detail):
+            return True
+    return False
+
+
+def mysql_full_scan(plan: List[str]) -> bool:
+    """True if a MySQL EXPLAIN has an access type of ALL"""
+    return any(" type=ALL " in f" {line} " for line in plan)
+
+
+class _StatementStats:
+    __slots__ = ("sql", "count", "total_seconds", "max_seconds", "slow_count",
+                 "plan", "full_scan")
+
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.slow_count = 0
+        self.plan: Optional[List[str]] = None
+        self.full_scan = False
+
+    def to_dict(self) -> Dict:
+        return {
+            "sql": self.sql,
+            "count": self.count,
+            "total_ms": round(self.total_seconds * 1000, 3),
+            "avg_ms": round(self.total_seconds * 1000 / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 3),
+            "slow_count": self.slow_count,
+            "full_scan": self.full_scan,
+            "plan": self.plan or []
+        }
+
+
+class QueryTracer:
+    """
+    Aggregates timings per normalised statement.
+
+    Each distinct statement is explained once, the first time it is seen
+    (before it runs, so the connection has no pending result set). Runs
+    slower than the threshold are logged together with that plan.
+    """
+
+    def __init__(self, dialect: str, threshold_ms: float = SLOW_QUERY_THRESHOLD_MS):
+        if dialect not in ("sqlite", "mysql"):
+            raise ValueError(f"Unknown dialect: {dialect}")
+        self.dialect = dialect
+        self.threshold = threshold_ms / 1000.0
+        self._full_scan = sqlite_full_scan if dialect == "sqlite" else mysql_full_scan
+        self._normalised: Dict[str, str] = {}
+        self._statements: Dict[str, _StatementStats] = {}
+        self._lock = threading.Lock()
+        self._reporter: Optional[threading.Thread] = None
+
+    def prepare(self, sql: str, params, explain: Callable[[str, object], List[str]]) -> _StatementStats:
+        """Look up (or create and explain) the stats entry for a statement"""
+        key = self._normalised.get(sql)
+        if key is None:
+            key = normalise(sql)
+            if len(self._normalised) >= _MAX_CACHED_SQL:
+                self._normalised.clear()
+            self._normalised[sql] = key
+
+        with self._lock:
+            stats = self._statements.get(key)
+            if stats is None:
+                stats = self._statements[key] = _StatementStats(key)
+            needs_plan = stats.plan is None
+
+        if needs_plan and key.lstrip("( ").upper().startswith(_EXPLAINABLE):
+            try:
+                stats.plan = explain(sql, params)
+                stats.full_scan = self._full_scan(stats.plan)
+            except Exception as e:
+                stats.plan = [f"EXPLAIN failed: {e}"]
+        elif needs_plan:
+            stats.plan = []
+        return stats
+
+    def record(self, stats: _StatementStats, seconds: float):
+        """Add one execution's time and log it if it was slow"""
+        slow = seconds >= self.threshold
+        with self._lock:
+            stats.count += 1
+            stats.total_seconds += seconds
+            if seconds > stats.max_seconds:
+                stats.max_seconds = seconds
+            if slow:
+                stats.slow_count += 1
+        if slow:
+            logger.warning(
+                f"Slow query ({seconds * 1000:.1f} ms): {stats.sql}\n"
+                f"  plan: {' | '.join(stats.plan or []) or 'n/a'}")
+
+    def report(self, limit: int = 50) -> Dict:
+        """Full-scan statements and the statements with the most total time"""
+        with self._lock:
+            statements = [s.to_dict() for s in self._statements.values()]
+        statements.sort(key=lambda s: s["total_ms"], reverse=True)
+        return {
+            "dialect": self.dialect,
+            "threshold_ms": self.threshold * 1000,
+            "full_scans": [s for s in statements if s["full_scan"]][:limit],
+            "slowest": [s for s in statements if s["slow_count"]][:limit],
+            "top_by_total_time": statements[:limit]
+        }
+
+    def start_reporting(self, interval: float = 600.0):
+        """Log the full-scan report every `interval` seconds"""
+        if self._reporter is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                full_scans = self.report()["full_scans"]
+                if not full_scans:
+                    continue
+                lines = [f"  {s['count']}x {s['total_ms']} ms total: {s['sql']}" for s in full_scans]
+                logger.info("Full-scan queries since startup:\n" + "\n".join(lines))
+
+        self._reporter = threading.Thread(target=run, name="query-report", daemon=True)
+        self._reporter.start()
+
+
+# ========== MYSQL INSTRUMENTATION ==========
+
+class TracedMySQLCursor:
+    """Wraps a mysql.connector cursor to time and trace its statements"""
+
+    def __init__(self, cursor, connection, tracer: QueryTracer):
+        self._cursor = cursor
+        self._connection = connection
+        self._tracer = tracer
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        stats = self._tracer.prepare(operation, params, self._explain)
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, params, *args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - started
+            metrics.record_query(seconds)
+            self._tracer.record(stats, seconds)
+
+    def _explain(self, operation, params) -> List[str]:
+        cursor = self._connection.cursor(dictionary=True)
+        try:
+            cursor.execute(f"EXPLAIN {operation}", params)
+            return [
+                f"{row.get('table')}: type={row.get('type')} key={row.get('key')} rows={row.get('rows')}"
+                for row in cursor.fetchall()
+            ]
+        finally:
+            cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+class TracedMySQLConnection:
+    """Wraps a mysql.connector connection so its cursors are traced"""
+
+    def __init__(self, connection, tracer: QueryTracer):
+        self._connection = connection
+        self._tracer = tracer
+
+    def cursor(self, *args, **kwargs):
+        return TracedMySQLCursor(self._connection.cursor(*args, **kwargs),
+                                 self._connection, self._tracer)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
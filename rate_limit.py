@@ -0,0 +1,182 @@
+"""
+Rate limiting for Power Physique Zone
+Sliding-window counters per key (client IP, username, ...), kept in memory
+or in a small SQLite file shared by every worker process
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Shared store: expired counters are deleted every this many hits
+SWEEP_EVERY = 1000
+
+
+def _advance(state: Optional[Tuple[int, int, int]], window: int) -> Tuple[int, int]:
+    """(previous, current) window counts after one more hit in `window`"""
+    if state is None:
+        return 0, 1
+    stored, previous, current = state
+    if stored == window:
+        return previous, current + 1
+    if stored == window - 1:
+        return current, 1
+    return 0, 1
+
+
+class _Counter:
+    __slots__ = ("window", "previous", "current", "expires_at")
+
+    def __init__(self, window: int, previous: int, current: int, expires_at: float):
+        self.window = window
+        self.previous = previous
+        self.current = current
+        self.expires_at = expires_at
+
+
+class MemoryRateStore:
+    """Counters for one process; entries expire two windows after their last hit"""
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self._counters: Dict[str, _Counter] = {}
+        self._next_sweep = 0.0
+        self._lock = threading.Lock()
+
+    def increment(self, key: str, window: int, expires_at: float) -> Tuple[int, int]:
+        with self._lock:
+            now = self.clock()
+            if now >= self._next_sweep:
+                self._sweep(now)
+            counter = self._counters.get(key)
+            state = (counter.window, counter.previous, counter.current) if counter else None
+            previous, current = _advance(state, window)
+            if counter is None:
+                self._counters[key] = _Counter(window, previous, current, expires_at)
+            else:
+                counter.window, counter.previous, counter.current = window, previous, current
+                counter.expires_at = expires_at
+            return previous, current
+
+    def reset(self, key: str):
+        with self._lock:
+            self._counters.pop(key, None)
+
+    def _sweep(self, now: float):
+        expired = [key for key, counter in self._counters.items() if counter.expires_at <= now]
+        for key in expired:
+            del self._counters[key]
+        # Sweep about as often as the shortest-lived entries expire
+        self._next_sweep = now + 60.0
+
+    def __len__(self):
+        return len(self._counters)
+
+
+class SQLiteRateStore:
+    """
+    Counters in a SQLite file of their own, so every worker process sees
+    the same counts. Durability is switched off (a crash only forgets
+    counts) and the file never touches the main database's write lock.
+    """
+
+    def __init__(self, path: Path, clock: Callable[[], float] = time.time):
+        self.path = Path(path)
+        self.clock = clock
+        self._local = threading.local()
+        self._hits = 0
+        conn = self._connection()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS Rate_Limits (
+                key TEXT PRIMARY KEY,
+                window INTEGER NOT NULL,
+                previous_count INTEGER NOT NULL,
+                current_count INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = OFF")
+            self._local.conn = conn
+        return conn
+
+    def increment(self, key: str, window: int, expires_at: float) -> Tuple[int, int]:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            state = conn.execute(
+                "SELECT window, previous_count, current_count FROM Rate_Limits WHERE key = ?",
+                (key,)).fetchone()
+            previous, current = _advance(state, window)
+            conn.execute("INSERT OR REPLACE INTO Rate_Limits VALUES (?, ?, ?, ?, ?)",
+                         (key, window, previous, current, expires_at))
+            self._hits += 1
+            if self._hits % SWEEP_EVERY == 0:
+                conn.execute("DELETE FROM Rate_Limits WHERE expires_at <= ?", (self.clock(),))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return previous, current
+
+    def reset(self, key: str):
+        self._connection().execute("DELETE FROM Rate_Limits WHERE key = ?", (key,))
+
+
+class RateLimit:
+    """
+    At most `limit` hits per `window` seconds for each key.
+
+    The count is a sliding window estimated from two fixed windows: the
+    previous window's hits weighted by how much of it still overlaps the
+    last `window` seconds, plus the current window's hits. Every attempt
+    counts, including rejected ones, so a client that keeps hammering stays
+    blocked.
+    """
+
+    def __init__(self, name: str, limit: int, window: float, store=None,
+                 clock: Callable[[], float] = time.time):
+        self.name = name
+        self.limit = limit
+        self.window = window
+        self.clock = clock
+        self.store = store if store is not None else MemoryRateStore(clock)
+
+    def hit(self, key: str) -> float:
+        """Record an attempt; 0 if allowed, else seconds until the next one would be"""
+        now = self.clock()
+        window = int(now // self.window)
+        elapsed = now / self.window - window
+        try:
+            previous, current = self.store.increment(
+                f"{self.name}:{key}", window, (window + 2) * self.window)
+        except sqlite3.Error as e:
+            # A shared store that is busy or broken must not lock everyone out
+            logger.warning(f"Rate limit store unavailable, allowing request: {e}")
+            return 0.0
+
+        if previous * (1 - elapsed) + current <= self.limit:
+            return 0.0
+        if current > self.limit:
+            # Over the limit within this window alone: wait for the next one
+            return (1 - elapsed) * self.window
+        # Wait until enough of the previous window has slid out
+        needed = 1 - (self.limit - current) / previous
+        return max(needed - elapsed, 0.0) * self.window
+
+    def reset(self, key: str):
+        try:
+            self.store.reset(f"{self.name}:{key}")
+        except sqlite3.Error as e:
+            logger.warning(f"Rate limit store unavailable, not reset: {e}")
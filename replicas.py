@@ -0,0 +1,174 @@
+"""
+Read-replica routing for Power Physique Zone
+Sends read-only queries to the least-lagged MySQL replica, keeps a
+client's reads on the primary until replicas have caught up with its own
+writes, and falls back to the primary when no replica qualifies
+"""
+
+import contextvars
+import itertools
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Replicas further behind than this are not read from
+MAX_REPLICA_LAG_SECONDS = 5.0
+# How often replica lag is re-measured
+LAG_CHECK_INTERVAL_SECONDS = 2.0
+# Seconds_Behind_Source is whole seconds: 0 means "under a second"
+LAG_RESOLUTION_SECONDS = 1.0
+
+# Who is reading: set per request (e.g. to the client address) so reads
+# after that client's own write stay consistent with it
+read_session: contextvars.ContextVar = contextvars.ContextVar("ppz_read_session", default=None)
+
+_STICKY_PRUNE_SIZE = 1024
+
+
+def mysql_replica_lag(conn) -> Optional[float]:
+    """
+    Seconds the server is behind its source. None when replication is
+    broken (SQL thread stopped); 0 for a server that is not a replica.
+    """
+    cursor = conn.cursor(dictionary=True)
+    try:
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+        except Exception:
+            # MySQL before 8.0.22 and older MariaDB
+            cursor.execute("SHOW SLAVE STATUS")
+        status = cursor.fetchone()
+        cursor.fetchall()
+    finally:
+        cursor.close()
+    if not status:
+        return 0.0
+    lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+    return None if lag is None else float(lag)
+
+
+class Replica:
+    """One replica's executor and its last measured lag"""
+
+    __slots__ = ("name", "executor", "lag", "checked_at", "error")
+
+    def __init__(self, name: str, executor):
+        self.name = name
+        self.executor = executor
+        self.lag: Optional[float] = None
+        self.checked_at = float("-inf")
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return {"name": self.name, "lag_seconds": self.lag, "error": self.error}
+
+
+class ReplicaRouter:
+    """
+    Chooses the executor for each read.
+
+    A replica qualifies when its lag is known and at most `max_lag`, and
+    the reading session's last write is older than the replica's sticky
+    window (so the write has reached it). The least-lagged qualifying
+    replica wins, ties taken in turn; with none, reads go to the primary.
+    """
+
+    def __init__(self, primary, replicas: List[Tuple[str, object]],
+                 lag_probe: Callable = mysql_replica_lag,
+                 max_lag: float = MAX_REPLICA_LAG_SECONDS,
+                 check_interval: float = LAG_CHECK_INTERVAL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.primary = primary
+        self.replicas = [Replica(name, executor) for name, executor in replicas]
+        self.lag_probe = lag_probe
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.clock = clock
+        self._last_write: Dict = {}
+        self._turn = itertools.count()
+        self._check_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    # ========== LAG ==========
+
+    def _probe(self, replica: Replica):
+        pool = replica.executor.pool
+        pooled = None
+        try:
+            pooled = pool.acquire()
+            replica.lag = self.lag_probe(pooled.conn)
+            replica.error = None if replica.lag is not None else "replication stopped"
+        except Exception as e:
+            replica.lag = None
+            replica.error = str(e)
+            if pooled is not None:
+                pool.release(pooled, discard=True)
+                pooled = None
+        if pooled is not None:
+            pool.release(pooled)
+        replica.checked_at = self.clock()
+
+    def refresh(self, force: bool = False):
+        """Re-measure stale lags; one caller probes while the rest carry on"""
+        if not self._check_lock.acquire(blocking=force):
+            return
+        try:
+            now = self.clock()
+            for replica in self.replicas:
+                if force or now - replica.checked_at >= self.check_interval:
+                    self._probe(replica)
+        finally:
+            self._check_lock.release()
+
+    # ========== ROUTING ==========
+
+    def sticky_window(self, lag: float) -> float:
+        """
+        Seconds after a write before a replica measured `lag` behind may
+        serve it: the lag rounded up to the probe's resolution, plus the
+        time since that measurement (up to check_interval) for it to grow
+        """
+        return max(lag, LAG_RESOLUTION_SECONDS) + self.check_interval
+
+    def for_read(self) -> Tuple[object, float]:
+        """(executor, lag in seconds of the data it will return)"""
+        if not self.replicas:
+            return self.primary, 0.0
+        self.refresh()
+
+        since_write = float("inf")
+        last_write = self._last_write.get(read_session.get())
+        if last_write is not None:
+            since_write = self.clock() - last_write
+
+        candidates = [replica for replica in self.replicas
+                      if replica.lag is not None and replica.lag <= self.max_lag
+                      and self.sticky_window(replica.lag) < since_write]
+        if not candidates:
+            return self.primary, 0.0
+        best = min(replica.lag for replica in candidates)
+        candidates = [replica for replica in candidates if replica.lag == best]
+        replica = candidates[next(self._turn) % len(candidates)]
+        return replica.executor, replica.lag
+
+    def note_write(self):
+        """Record a write by the current read session"""
+        now = self.clock()
+        with self._lock:
+            self._last_write[read_session.get()] = now
+            if len(self._last_write) > _STICKY_PRUNE_SIZE:
+                # Past this every qualifying replica has the write
+                window = self.sticky_window(self.max_lag)
+                for key in [key for key, at in self._last_write.items() if now - at > window]:
+                    del self._last_write[key]
+
+    def mark_failed(self, executor, error: Exception):
+        """Stop reading from a replica until its next successful lag check"""
+        for replica in self.replicas:
+            if replica.executor is executor:
+                replica.lag = None
+                replica.error = str(error)
+                replica.checked_at = self.clock()
+
+    def status(self) -> List[Dict]:
+        return [replica.to_dict() for replica in self.replicas]
@@ -60,6 +60,8 @@ CREATE TABLE IF NOT EXISTS Gym_Locations (
     area VARCHAR(100) NOT NULL UNIQUE,
     address TEXT,
     phone VARCHAR(15),
+    latitude REAL,
+    longitude REAL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -73,6 +75,8 @@ CREATE TABLE IF NOT EXISTS User_Questions (
     answer_text TEXT,
     answered_by_user_id INTEGER,
     is_answered BOOLEAN DEFAULT 0,
+    claimed_by_user_id INTEGER, -- admin currently holding the question lease
+    claim_expires_at TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES Users(user_id) ON DELETE SET NULL,
     FOREIGN KEY (answered_by_user_id) REFERENCES Users(user_id) ON DELETE SET NULL
 );
@@ -197,13 +201,191 @@ CREATE TABLE IF NOT EXISTS Equipment_Ratings (
     FOREIGN KEY (user_id) REFERENCES Users(user_id) ON DELETE SET NULL
 );
 
+-- 17. Revoked session tokens (kept until the token would have expired)
+CREATE TABLE IF NOT EXISTS Revoked_Tokens (
+    revocation_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    token_id VARCHAR(32), -- NULL: every token of user_id issued up to revoked_at
+    user_id INTEGER NOT NULL,
+    revoked_at INTEGER NOT NULL, -- Unix time in milliseconds
+    expires_at INTEGER NOT NULL -- Unix time in seconds
+);
+
+-- 18. Table versions (bumped by the triggers below on every write, from
+-- any process; caches poll this to know when to reload). New users do not
+-- bump Users: no cached profile can be stale because of them.
+CREATE TABLE IF NOT EXISTS Table_Versions (
+    table_name VARCHAR(50) PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO Table_Versions (table_name, version) VALUES
+    ('Users', 0),
+    ('Products', 0),
+    ('Gym_Locations', 0),
+    ('Workouts', 0),
+    ('Exercises', 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_users_version_update
+AFTER UPDATE ON Users
+BEGIN
+    UPDATE Table_Versions SET version = version + 1 WHERE table_name = 'Users';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_users_version_delete
+AFTER DELETE ON Users
+BEGIN
+    UPDATE Table_Versions SET version = version + 1 WHERE table_name = 'Users';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_products_version_insert
+AFTER INSERT ON Products
+BEGIN
+    UPDATE Table_Versions SET version = version + 1 WHERE table_name = 'Products';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_products_version_update
+AFTER UPDATE ON Products
+BEGIN
+    UPDATE Table_Versions SET version = version + 1 WHERE table_name = 'Products';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_products_version_delete
+AFTER DELETE ON Products
+BEGIN
+    UPDATE Table_Versions SET version = version + 1 WHERE table_name = 'Products';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_gym_locations_version_insert
+AFTER INSERT ON Gym_Locations
+BEGIN
+    UPDATE Table_Versions SET version = version + 1 WHERE table_name = 'Gym_Locations';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_gym_locations_version_update
+AFTER UPDATE ON Gym_Locations
+BEGIN
+    UPDATE Table_Versions SET version = version + 1 WHERE table_name = 'Gym_Locations';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_gym_locations_version_delete
+AFTER DELETE ON Gym_Locations
+BEGIN
+    UPDATE Table_Versions SET version = version + 1 WHERE table_name = 'Gym_Locations';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_workouts_version_insert
+AFTER INSERT ON Workouts
+BEGIN
+    UPDATE Table_Versions SET version = version + 1 WHERE table_name = 'Workouts';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_workouts_version_update
+AFTER UPDATE ON Workouts
+BEGIN
+    UPDATE Table_Versions SET version = version + 1 WHERE table_name = 'Workouts';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_workouts_version_delete
+AFTER DELETE ON Workouts
+BEGIN
+    UPDATE Table_Versions SET version = version + 1 WHERE table_name = 'Workouts';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_exercises_version_insert
+AFTER INSERT ON Exercises
+BEGIN
+    UPDATE Table_Versions SET version = version + 1 WHERE table_name = 'Exercises';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_exercises_version_update
+AFTER UPDATE ON Exercises
+BEGIN
+    UPDATE Table_Versions SET version = version + 1 WHERE table_name = 'Exercises';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_exercises_version_delete
+AFTER DELETE ON Exercises
+BEGIN
+    UPDATE Table_Versions SET version = version + 1 WHERE table_name = 'Exercises';
+END;
+
+-- 19. Gym Locations spatial index (R-tree kept in sync by triggers)
+CREATE VIRTUAL TABLE IF NOT EXISTS Gym_Locations_Geo USING rtree(
+    location_id,
+    min_lat, max_lat,
+    min_lon, max_lon
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_locations_geo_insert
+AFTER INSERT ON Gym_Locations
+WHEN NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL
+BEGIN
+    INSERT INTO Gym_Locations_Geo
+    VALUES (NEW.location_id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_locations_geo_update
+AFTER UPDATE OF latitude, longitude ON Gym_Locations
+BEGIN
+    DELETE FROM Gym_Locations_Geo WHERE location_id = OLD.location_id;
+    INSERT INTO Gym_Locations_Geo
+    SELECT NEW.location_id, NEW.latitude, NEW.latitude, NEW.longitude, NEW.longitude
+    WHERE NEW.latitude IS NOT NULL AND NEW.longitude IS NOT NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_locations_geo_delete
+AFTER DELETE ON Gym_Locations
+BEGIN
+    DELETE FROM Gym_Locations_Geo WHERE location_id = OLD.location_id;
+END;
+
+-- 20. Change log (one entry per insert or update of a question or contact
+-- message; read by the admin change feed, oldest entries pruned)
+CREATE TABLE IF NOT EXISTS Change_Log (
+    change_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    table_name VARCHAR(50) NOT NULL,
+    row_id INTEGER NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_questions_change_insert
+AFTER INSERT ON User_Questions
+BEGIN
+    INSERT INTO Change_Log (table_name, row_id) VALUES ('User_Questions', NEW.question_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_questions_change_update
+AFTER UPDATE ON User_Questions
+BEGIN
+    INSERT INTO Change_Log (table_name, row_id) VALUES ('User_Questions', NEW.question_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_messages_change_insert
+AFTER INSERT ON Contact_Messages
+BEGIN
+    INSERT INTO Change_Log (table_name, row_id) VALUES ('Contact_Messages', NEW.message_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_messages_change_update
+AFTER UPDATE ON Contact_Messages
+BEGIN
+    INSERT INTO Change_Log (table_name, row_id) VALUES ('Contact_Messages', NEW.message_id);
+END;
+
 -- Create indexes for better query performance
 CREATE INDEX IF NOT EXISTS idx_users_username ON Users(username);
 CREATE INDEX IF NOT EXISTS idx_users_email ON Users(email);
 CREATE INDEX IF NOT EXISTS idx_subscriptions_user_id ON User_Subscriptions(user_id);
 CREATE INDEX IF NOT EXISTS idx_subscriptions_is_active ON User_Subscriptions(is_active);
 CREATE INDEX IF NOT EXISTS idx_questions_user_id ON User_Questions(user_id);
+CREATE INDEX IF NOT EXISTS idx_questions_unanswered ON User_Questions(submitted_at) WHERE is_answered = 0;
+CREATE INDEX IF NOT EXISTS idx_questions_submitted_at ON User_Questions(submitted_at);
+CREATE INDEX IF NOT EXISTS idx_messages_sent_at ON Contact_Messages(sent_at);
+CREATE INDEX IF NOT EXISTS idx_messages_unread ON Contact_Messages(is_read, sent_at);
 CREATE INDEX IF NOT EXISTS idx_reviews_product_id ON Customer_Reviews(product_id);
 CREATE INDEX IF NOT EXISTS idx_reviews_user_id ON Customer_Reviews(user_id);
 CREATE INDEX IF NOT EXISTS idx_orders_user_id ON User_Orders(user_id);
 CREATE INDEX IF NOT EXISTS idx_competitions_user_id ON Competition_Participants(user_id);
+CREATE INDEX IF NOT EXISTS idx_workouts_category_difficulty ON Workouts(category, difficulty_level);
+CREATE INDEX IF NOT EXISTS idx_exercises_workout_id ON Exercises(workout_id);
+CREATE INDEX IF NOT EXISTS idx_equipment_location_id ON Gym_Equipment(location_id);
+CREATE INDEX IF NOT EXISTS idx_equipment_ratings_equipment_id ON Equipment_Ratings(equipment_id, rated_at);
@@ -27,10 +27,14 @@ CREATE TABLE IF NOT EXISTS User_Questions (
     answer_text LONGTEXT,
     answered_by_user_id INT,
     is_answered BOOLEAN DEFAULT FALSE,
+    claimed_by_user_id INT,
+    claim_expires_at TIMESTAMP NULL,
     FOREIGN KEY (user_id) REFERENCES Users(user_id) ON DELETE SET NULL,
     FOREIGN KEY (answered_by_user_id) REFERENCES Users(user_id) ON DELETE SET NULL,
     INDEX idx_user_id (user_id),
-    INDEX idx_is_answered (is_answered)
+    INDEX idx_is_answered (is_answered),
+    INDEX idx_unanswered_queue (is_answered, submitted_at),
+    INDEX idx_submitted_at (submitted_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Contact Messages Table
@@ -43,7 +47,8 @@ CREATE TABLE IF NOT EXISTS Contact_Messages (
     sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     is_read BOOLEAN DEFAULT FALSE,
     INDEX idx_email (email),
-    INDEX idx_sent_at (sent_at)
+    INDEX idx_sent_at (sent_at),
+    INDEX idx_unread_inbox (is_read, sent_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Products Table
@@ -67,8 +72,11 @@ CREATE TABLE IF NOT EXISTS Gym_Locations (
     area VARCHAR(100) NOT NULL UNIQUE,
     address TEXT,
     phone VARCHAR(15),
+    latitude DECIMAL(9, 6),
+    longitude DECIMAL(9, 6),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    INDEX idx_city (city)
+    INDEX idx_city (city),
+    INDEX idx_lat_lon (latitude, longitude)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Membership Plans Table
@@ -190,6 +198,16 @@ CREATE TABLE IF NOT EXISTS Gym_Equipment (
     FOREIGN KEY (location_id) REFERENCES Gym_Locations(location_id) ON DELETE SET NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- Revoked Session Tokens Table (kept until the token would have expired)
+CREATE TABLE IF NOT EXISTS Revoked_Tokens (
+    revocation_id INT PRIMARY KEY AUTO_INCREMENT,
+    token_id VARCHAR(32),
+    user_id INT NOT NULL,
+    revoked_at BIGINT NOT NULL,
+    expires_at BIGINT NOT NULL,
+    INDEX idx_expires_at (expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- Equipment Ratings Table
 CREATE TABLE IF NOT EXISTS Equipment_Ratings (
     rating_id INT PRIMARY KEY AUTO_INCREMENT,
@@ -0,0 +1,386 @@
+"""
+Statement registry for Power Physique Zone
+Every hybrid-backend query is defined once here and run on pooled
+connections: as a server-side prepared statement on MySQL and from the
+connection's compiled-statement cache on SQLite
+"""
+
+import queue
+import re
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence
+
+from query_log import TracedMySQLCursor
+
+# Idle MySQL connections older than this are pinged before reuse
+MYSQL_IDLE_PING_SECONDS = 60.0
+
+_PLACEHOLDER = re.compile(r"'(?:[^']|'')*'|\?")
+
+
+def to_mysql(sql: str) -> str:
+    """Translate ? placeholders (outside string literals) to %s"""
+    if "%" in sql:
+        raise ValueError("Statements must not contain a literal %")
+    return _PLACEHOLDER.sub(lambda m: "%s" if m.group(0) == "?" else m.group(0), sql)
+
+
+class Statement:
+    """One query as SQLite and MySQL text"""
+
+    __slots__ = ("name", "sqlite", "mysql")
+
+    def __init__(self, name: str, sqlite: str, mysql: str):
+        self.name = name
+        self.sqlite = sqlite
+        self.mysql = mysql
+
+    def text(self, dialect: str) -> str:
+        return self.sqlite if dialect == "sqlite" else self.mysql
+
+
+class StatementRegistry:
+    """Named statements, written once with ? placeholders"""
+
+    def __init__(self):
+        self._statements: Dict[str, Statement] = {}
+        self._expanded: Dict[tuple, Statement] = {}
+
+    def define(self, name: str, sql: str, mysql: Optional[str] = None) -> Statement:
+        """
+        Register a statement. `mysql` is only needed where the dialects
+        differ in more than placeholders (and is also written with ?).
+        """
+        if name in self._statements:
+            raise ValueError(f"Statement already defined: {name}")
+        statement = Statement(name, sql, to_mysql(mysql if mysql is not None else sql))
+        self._statements[name] = statement
+        return statement
+
+    def get(self, name: str) -> Statement:
+        return self._statements[name]
+
+    def expand(self, name: str, count: int) -> Statement:
+        """
+        The statement with its {ids} slot replaced by `count` placeholders.
+        Each size is built once, so it is prepared and cached like any other.
+        """
+        key = (name, count)
+        statement = self._expanded.get(key)
+        if statement is None:
+            base = self._statements[name]
+            ids = ", ".join(["?"] * count)
+            statement = Statement(f"{name}[{count}]", base.sqlite.replace("{ids}", ids),
+                                  base.mysql.replace("{ids}", ", ".join(["%s"] * count)))
+            self._expanded[key] = statement
+        return statement
+
+
+STATEMENTS = StatementRegistry()
+define = STATEMENTS.define
+
+# ========== USERS ==========
+
+define("create_user", '''
+    INSERT INTO Users (username, email, password_hash, full_name, phone_number, address)
+    VALUES (?, ?, ?, ?, ?, ?)
+''')
+define("authenticate_user", '''
+    SELECT user_id, username, email, full_name, role FROM Users
+    WHERE username = ? AND password_hash = ? AND is_active = 1
+''')
+define("get_user", '''
+    SELECT user_id, username, email, full_name, phone_number,
+           address, role, created_at FROM Users WHERE user_id = ?
+''')
+
+# ========== SESSION TOKENS ==========
+
+define("add_revocation", '''
+    INSERT INTO Revoked_Tokens (token_id, user_id, revoked_at, expires_at) VALUES (?, ?, ?, ?)
+''')
+define("get_revocations", '''
+    SELECT revocation_id, token_id, user_id, revoked_at, expires_at
+    FROM Revoked_Tokens WHERE revocation_id > ? ORDER BY revocation_id
+''')
+define("purge_revocations", '''
+    DELETE FROM Revoked_Tokens WHERE expires_at <= ?
+''')
+
+# ========== QUESTIONS ==========
+
+define("add_question", '''
+    INSERT INTO User_Questions (user_id, user_name, question_text) VALUES (?, ?, ?)
+''')
+define("get_all_questions", '''
+    SELECT question_id, user_name, question_text, answer_text,
+           is_answered, submitted_at FROM User_Questions
+    ORDER BY submitted_at DESC
+''')
+define("claim_own_leases", '''
+    SELECT question_id FROM User_Questions
+    WHERE is_answered = 0 AND claimed_by_user_id = ?
+      AND claim_expires_at > CURRENT_TIMESTAMP
+    ORDER BY submitted_at ASC LIMIT ?
+''', mysql='''
+    SELECT question_id FROM User_Questions
+    WHERE is_answered = 0 AND claimed_by_user_id = ?
+      AND claim_expires_at > CURRENT_TIMESTAMP
+    ORDER BY submitted_at ASC LIMIT ?
+    FOR UPDATE SKIP LOCKED
+''')
+define("claim_free_questions", '''
+    SELECT question_id FROM User_Questions
+    WHERE is_answered = 0
+      AND (claim_expires_at IS NULL OR claim_expires_at <= CURRENT_TIMESTAMP)
+    ORDER BY submitted_at ASC LIMIT ?
+''', mysql='''
+    SELECT question_id FROM User_Questions
+    WHERE is_answered = 0
+      AND (claim_expires_at IS NULL OR claim_expires_at <= CURRENT_TIMESTAMP)
+    ORDER BY submitted_at ASC LIMIT ?
+    FOR UPDATE SKIP LOCKED
+''')
+define("lease_questions", '''
+    UPDATE User_Questions
+    SET claimed_by_user_id = ?, claim_expires_at = datetime('now', '+' || ? || ' seconds')
+    WHERE question_id IN ({ids})
+''', mysql='''
+    UPDATE User_Questions
+    SET claimed_by_user_id = ?, claim_expires_at = DATE_ADD(NOW(), INTERVAL ? SECOND)
+    WHERE question_id IN ({ids})
+''')
+define("get_leased_questions", '''
+    SELECT question_id, user_name, question_text, submitted_at, claim_expires_at
+    FROM User_Questions WHERE question_id IN ({ids})
+    ORDER BY submitted_at ASC
+''')
+define("answer_question", '''
+    UPDATE User_Questions
+    SET answer_text = ?, is_answered = 1, answered_by_user_id = ?,
+        claimed_by_user_id = NULL, claim_expires_at = NULL
+    WHERE question_id = ? AND is_answered = 0
+      AND (claimed_by_user_id IS NULL OR claimed_by_user_id = ?
+           OR claim_expires_at <= CURRENT_TIMESTAMP)
+''')
+define("question_exists", '''
+    SELECT 1 AS found FROM User_Questions WHERE question_id = ?
+''')
+
+# ========== CONTACT MESSAGES ==========
+
+define("add_contact_message", '''
+    INSERT INTO Contact_Messages (name, email, subject, message_text) VALUES (?, ?, ?, ?)
+''')
+define("get_all_messages", '''
+    SELECT message_id, name, email, subject, message_text,
+           sent_at, is_read FROM Contact_Messages
+    ORDER BY sent_at DESC
+''')
+
+# ========== LOCATIONS ==========
+
+define("locations_in_box", '''
+    SELECT l.location_id, l.city, l.area, l.address, l.phone,
+           l.latitude, l.longitude
+    FROM Gym_Locations_Geo g
+    JOIN Gym_Locations l ON l.location_id = g.location_id
+    WHERE g.max_lat >= ? AND g.min_lat <= ?
+      AND g.max_lon >= ? AND g.min_lon <= ?
+''', mysql='''
+    SELECT location_id, city, area, address, phone, latitude, longitude
+    FROM Gym_Locations
+    WHERE latitude BETWEEN ? AND ?
+      AND longitude BETWEEN ? AND ?
+''')
+
+# ========== STATISTICS ==========
+
+define("dashboard_stats", '''
+    SELECT (SELECT COUNT(*) FROM Users) AS total_users,
+           (SELECT COUNT(*) FROM User_Questions) AS total_questions,
+           (SELECT COUNT(*) FROM User_Questions WHERE is_answered = 0) AS unanswered_questions,
+           (SELECT COUNT(*) FROM Contact_Messages) AS total_messages,
+           (SELECT COUNT(*) FROM Products) AS total_products
+''')
+
+
+# ========== EXECUTION ==========
+
+class WriteResult:
+    __slots__ = ("rowcount", "lastrowid")
+
+    def __init__(self, rowcount: int, lastrowid: Optional[int]):
+        self.rowcount = rowcount
+        self.lastrowid = lastrowid
+
+
+class _PooledConnection:
+    __slots__ = ("conn", "cursors", "last_used")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.cursors: Dict = {}
+        self.last_used = time.monotonic()
+
+
+class ConnectionPool:
+    """
+    Idle connections kept for reuse, most recently used first so the
+    connections (and statement caches) that are warm get picked.
+    Connections beyond `size` are opened on demand and closed on release.
+    """
+
+    def __init__(self, connect: Callable, size: int = 5):
+        self.connect = connect
+        self.size = size
+        self._idle: "queue.LifoQueue[_PooledConnection]" = queue.LifoQueue()
+
+    def acquire(self) -> _PooledConnection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return _PooledConnection(self.connect())
+
+    def release(self, pooled: _PooledConnection, discard: bool = False):
+        if discard or self._idle.qsize() >= self.size:
+            try:
+                pooled.conn.close()
+            except Exception:
+                pass
+            return
+        pooled.last_used = time.monotonic()
+        self._idle.put(pooled)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().conn.close()
+            except queue.Empty:
+                return
+
+
+class Session(ABC):
+    """Statements run on one pooled connection inside one transaction"""
+
+    @abstractmethod
+    def fetch_all(self, statement: Statement, params: Sequence = ()) -> List[Dict]:
+        """Rows as dicts"""
+
+    def fetch_one(self, statement: Statement, params: Sequence = ()) -> Optional[Dict]:
+        rows = self.fetch_all(statement, params)
+        return rows[0] if rows else None
+
+    @abstractmethod
+    def execute(self, statement: Statement, params: Sequence = ()) -> WriteResult:
+        """Row count and last insert ID of a write"""
+
+
+class SQLiteSession(Session):
+    def __init__(self, pooled: _PooledConnection):
+        self.conn = pooled.conn
+
+    def fetch_all(self, statement, params=()):
+        cursor = self.conn.cursor()
+        cursor.execute(statement.sqlite, params)
+        return [dict(row) for row in cursor.fetchall()]
+
+    def execute(self, statement, params=()):
+        cursor = self.conn.cursor()
+        cursor.execute(statement.sqlite, params)
+        return WriteResult(cursor.rowcount, cursor.lastrowid)
+
+
+class MySQLSession(Session):
+    def __init__(self, pooled: _PooledConnection, tracer):
+        self.pooled = pooled
+        self.tracer = tracer
+
+    def _cursor(self, statement: Statement, dictionary: bool):
+        # One prepared cursor per statement and connection; the connector
+        # only re-prepares when handed a different SQL string object
+        key = (statement.name, dictionary)
+        cursor = self.pooled.cursors.get(key)
+        if cursor is None:
+            cursor = self.pooled.conn.cursor(prepared=True, dictionary=dictionary)
+            self.pooled.cursors[key] = cursor
+        return TracedMySQLCursor(cursor, self.pooled.conn, self.tracer)
+
+    def fetch_all(self, statement, params=()):
+        cursor = self._cursor(statement, dictionary=True)
+        cursor.execute(statement.mysql, tuple(params))
+        return cursor.fetchall()
+
+    def execute(self, statement, params=()):
+        cursor = self._cursor(statement, dictionary=False)
+        cursor.execute(statement.mysql, tuple(params))
+        return WriteResult(cursor.rowcount, cursor.lastrowid)
+
+    def callproc(self, procedure: str, args: Sequence = ()):
+        """([(columns, rows), ...] result sets, argument values after the call)"""
+        # Prepared cursors cannot CALL; a plain one is cheap to open
+        cursor = self.pooled.conn.cursor()
+        try:
+            out_args = cursor.callproc(procedure, tuple(args))
+            result_sets = [(tuple(column[0] for column in result.description), result.fetchall())
+                           for result in cursor.stored_results()]
+            return result_sets, tuple(out_args or ())
+        finally:
+            cursor.close()
+
+
+class Executor:
+    """Runs registered statements for one backend"""
+
+    def __init__(self, dialect: str, pool: ConnectionPool, tracer=None):
+        if dialect not in ("sqlite", "mysql"):
+            raise ValueError(f"Unknown dialect: {dialect}")
+        self.dialect = dialect
+        self.pool = pool
+        self.tracer = tracer
+
+    @contextmanager
+    def session(self, lock_for_write: bool = False):
+        """
+        A transaction on a pooled connection, committed on success. With
+        lock_for_write, SQLite takes the write lock up front (BEGIN
+        IMMEDIATE); MySQL starts an explicit transaction for locking reads.
+        """
+        pooled = self.pool.acquire()
+        conn = pooled.conn
+        broken = False
+        try:
+            if self.dialect == "mysql":
+                if time.monotonic() - pooled.last_used > MYSQL_IDLE_PING_SECONDS:
+                    conn.ping(reconnect=True)
+                    pooled.cursors.clear()
+                if lock_for_write:
+                    conn.start_transaction()
+                yield MySQLSession(pooled, self.tracer)
+            else:
+                if lock_for_write:
+                    conn.execute("BEGIN IMMEDIATE")
+                yield SQLiteSession(pooled)
+            conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+            raise
+        finally:
+            self.pool.release(pooled, discard=broken)
+
+    def fetch_all(self, name: str, params: Sequence = ()) -> List[Dict]:
+        with self.session() as session:
+            return session.fetch_all(STATEMENTS.get(name), params)
+
+    def fetch_one(self, name: str, params: Sequence = ()) -> Optional[Dict]:
+        with self.session() as session:
+            return session.fetch_one(STATEMENTS.get(name), params)
+
+    def execute(self, name: str, params: Sequence = ()) -> WriteResult:
+        with self.session() as session:
+            return session.execute(STATEMENTS.get(name), params)
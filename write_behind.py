@@ -0,0 +1,266 @@
+"""
+Write-behind batching for Power Physique Zone
+Buffers append-only INSERTs and writes them in group commits
+"""
+
+import atexit
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Durability modes
+DURABILITY_ASYNC = "async"    # return once the row is queued
+DURABILITY_COMMIT = "commit"  # return once the row's batch has committed
+
+_STOP = object()
+
+
+class WriteBehindError(Exception):
+    """A queued row could not be written"""
+
+
+class _PendingRow:
+    """One queued INSERT"""
+
+    __slots__ = ("table", "columns", "values", "done", "error")
+
+    def __init__(self, table: str, columns: Tuple[str, ...], values: Tuple,
+                 wait: bool):
+        self.table = table
+        self.columns = columns
+        self.values = values
+        self.done = threading.Event() if wait else None
+        self.error: Optional[str] = None
+
+
+class WriteBehindQueue:
+    """
+    Queue of INSERTs flushed by one background writer thread.
+
+    Rows are written with executemany in a single transaction once
+    `max_batch` rows are waiting or `flush_interval` seconds have passed
+    since the first one arrived (in "commit" mode, as soon as the previous
+    batch is done), so a burst of requests shares one commit instead of
+    queueing on SQLite's write lock one row at a time.
+
+    IDs are handed out when a row is queued. They come from blocks reserved
+    in sqlite_sequence, so AUTOINCREMENT inserts from other processes skip
+    over them.
+    """
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection],
+                 max_batch: int = 200, flush_interval: float = 0.05,
+                 max_queue: int = 10000, durability: str = DURABILITY_ASYNC,
+                 id_block: int = 100):
+        if durability not in (DURABILITY_ASYNC, DURABILITY_COMMIT):
+            raise ValueError(f"Unknown durability mode: {durability}")
+
+        self.connect = connect
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.durability = durability
+        self.id_block = id_block
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._id_blocks: Dict[str, List[int]] = {}
+        self._id_lock = threading.Lock()
+        self._pending = 0
+        self._pending_cond = threading.Condition()
+        self._closed = False
+
+        self._stats = {
+            "enqueued": 0,
+            "written": 0,
+            "failed": 0,
+            "batches": 0,
+            "last_batch_size": 0,
+            "last_flush_ms": 0.0,
+            "max_depth": 0
+        }
+
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # ========== PRODUCER SIDE ==========
+
+    def submit(self, table: str, id_column: str, columns: Tuple[str, ...],
+               values: Tuple, timeout: float = 1.0) -> int:
+        """
+        Queue an INSERT and return the ID the row will have.
+
+        Raises queue.Full if the queue stays full for `timeout` seconds, and
+        WriteBehindError if durability is "commit" and the write failed.
+        """
+        if self._closed:
+            raise WriteBehindError("Write-behind queue is closed")
+
+        row_id = self._next_id(table, id_column)
+        row = _PendingRow(table, (id_column,) + tuple(columns), (row_id,) + tuple(values),
+                          wait=self.durability == DURABILITY_COMMIT)
+
+        with self._pending_cond:
+            self._pending += 1
+        try:
+            self._queue.put(row, timeout=timeout)
+        except queue.Full:
+            self._row_finished(1)
+            raise
+
+        with self._pending_cond:
+            self._stats["enqueued"] += 1
+            self._stats["max_depth"] = max(self._stats["max_depth"], self._queue.qsize())
+
+        if row.done is not None:
+            row.done.wait()
+            if row.error:
+                raise WriteBehindError(row.error)
+        return row_id
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued row has been written"""
+        with self._pending_cond:
+            return self._pending_cond.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout: float = 10.0):
+        """Write out everything still queued and stop the writer"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict:
+        """Queue depth and throughput counters"""
+        return dict(self._stats, depth=self._queue.qsize(),
+                    durability=self.durability, closed=self._closed)
+
+    def _next_id(self, table: str, id_column: str) -> int:
+        with self._id_lock:
+            block = self._id_blocks.get(table)
+            if not block or block[0] > block[1]:
+                block = self._reserve_ids(table, id_column)
+                self._id_blocks[table] = block
+            row_id = block[0]
+            block[0] += 1
+            return row_id
+
+    def _reserve_ids(self, table: str, id_column: str) -> List[int]:
+        """Advance the table's AUTOINCREMENT counter past a block of IDs"""
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,))
+            row = cursor.fetchone()
+            cursor.execute(f"SELECT MAX({id_column}) FROM {table}")
+            max_id = cursor.fetchone()[0] or 0
+
+            start = max(row[0] if row else 0, max_id) + 1
+            end = start + self.id_block - 1
+            if row:
+                cursor.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = ?", (end, table))
+            else:
+                cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table, end))
+            conn.commit()
+            return [start, end]
+        finally:
+            conn.close()
+
+    # ========== WRITER SIDE ==========
+
+    def _run(self):
+        conn = self.connect()
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+
+            # Callers waiting on a commit should not also wait out the
+            # interval; their batch is whatever queued during the last write
+            linger = self.flush_interval if self.durability == DURABILITY_ASYNC else 0
+            deadline = time.monotonic() + linger
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._write(conn, batch)
+
+        # Drain rows queued after the stop marker
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftover.append(item)
+        if leftover:
+            self._write(conn, leftover)
+        conn.close()
+
+    def _write(self, conn: sqlite3.Connection, batch: List[_PendingRow]):
+        started = time.perf_counter()
+        groups: Dict[Tuple[str, Tuple[str, ...]], List[_PendingRow]] = {}
+        for row in batch:
+            groups.setdefault((row.table, row.columns), []).append(row)
+
+        try:
+            cursor = conn.cursor()
+            for (table, columns), rows in groups.items():
+                placeholders = ", ".join("?" * len(columns))
+                cursor.executemany(
+                    f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+                    [row.values for row in rows])
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            logger.warning(f"Write-behind batch failed, retrying row by row: {e}")
+            self._write_rows_individually(conn, batch)
+
+        failed = sum(1 for row in batch if row.error)
+        self._stats["written"] += len(batch) - failed
+        self._stats["failed"] += failed
+        self._stats["batches"] += 1
+        self._stats["last_batch_size"] = len(batch)
+        self._stats["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 3)
+
+        for row in batch:
+            if row.done is not None:
+                row.done.set()
+        self._row_finished(len(batch))
+
+    def _write_rows_individually(self, conn: sqlite3.Connection, batch: List[_PendingRow]):
+        """Isolate the rows that broke a batch so the rest still commit"""
+        cursor = conn.cursor()
+        for row in batch:
+            placeholders = ", ".join("?" * len(row.columns))
+            try:
+                cursor.execute(
+                    f"INSERT INTO {row.table} ({', '.join(row.columns)}) VALUES ({placeholders})",
+                    row.values)
+                conn.commit()
+            except sqlite3.Error as e:
+                conn.rollback()
+                row.error = str(e)
+                logger.error(f"Write-behind dropped row {row.values[0]} for {row.table}: {e}")
+
+    def _row_finished(self, count: int):
+        with self._pending_cond:
+            self._pending -= count
+            if self._pending == 0:
+                self._pending_cond.notify_all()